@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+async_download.py
+
+Download hundreds of files at once on one asyncio event loop.
+
+Each download is a coroutine streaming its body to a ``.part`` file with the
+same resume, verification and atomic rename as download_engine, so a
+connection costs a few kilobytes of buffers instead of a thread. Concurrency
+is capped overall and per server, and an optional bandwidth limit is shared
+by every download: a token bucket that each chunk waits on before it is
+written, which in turn slows the reads. Writes, hashing and verification
+run on worker threads (asyncio.to_thread), so re-hashing a large resumed
+``.part`` or checking a finished file never stalls the other downloads.
+Transient failures are retried with the download_scheduler RetryPolicy.
+
+Callers follow progress by subscribing to ProgressEvents (queued, started,
+progress, retry, finished, failed); a subscriber may be a plain function or
+a coroutine function. AsyncScheduler runs the engine on a background thread
+behind the submit()/join() interface of download_scheduler.DownloadScheduler,
+which is how the download scripts use it with ``--engine async``.
+
+Requires aiohttp.
+
+Usage:
+
+    python async_download.py <url> [<url> ...] [options]
+
+Options:
+    --output-dir <dir>    Where to save the files (default: .)
+    --concurrency <n>     Concurrent downloads (default: 100)
+    --per-host <n>        Concurrent downloads from one server (default: 16)
+    --bandwidth <MB/s>    Total bandwidth limit (default: none)
+    --chunk-size <MiB>    Read and write size (default: 0.25)
+    --retries <n>         Retries per URL after the first attempt (default: 4)
+"""
+
+import asyncio
+import inspect
+import os
+import random
+import threading
+import time
+
+import aiohttp
+
+from download_engine import (
+    DownloadError,
+    Transfer,
+    complete_file,
+    end_transfer,
+    filename_from_response,
+    open_part,
+    parse_checksum,
+    part_size,
+    request_headers,
+    start_transfer,
+)
+from download_scheduler import (
+    DownloadItem,
+    DownloadReport,
+    RetryPolicy,
+    ThroughputMeter,
+)
+
+CONCURRENCY = 100
+PER_HOST = 16
+
+# Smaller than download_engine's chunks so the bandwidth limit is smooth.
+CHUNK_SIZE = 256 * 1024
+
+# Seconds between progress events of one download
+PROGRESS_INTERVAL = 1.0
+
+# (connect, read) seconds
+TIMEOUT = (10, 120)
+
+EVENTS = ("queued", "started", "progress", "retry", "finished", "failed")
+
+
+def _write(f, hasher, chunk):
+    f.write(chunk)
+    if hasher:
+        hasher.update(chunk)
+
+
+class ProgressEvent:
+    """Something that happened to a download; ``kind`` is one of EVENTS.
+
+    ``item`` is the DownloadItem (url, attempts, transfer, error), and
+    ``transfer`` its Transfer once the response arrived. ``delay`` is the
+    wait before a retry.
+    """
+
+    def __init__(self, kind, item, transfer=None, error=None, delay=None):
+        self.kind = kind
+        self.item = item
+        self.transfer = transfer
+        self.error = error
+        self.delay = delay
+        self.time = time.monotonic()
+
+
+class RateLimiter:
+    """A token bucket of ``rate`` bytes per second shared by all downloads."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate / 4, CHUNK_SIZE)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, count):
+        # Waiting while holding the lock keeps the downloads in turn.
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= count
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+
+
+class AsyncDownloader:
+    """Concurrent streaming downloads over one aiohttp session.
+
+    Use as ``async with AsyncDownloader(...) as downloader`` and call
+    ``await downloader.run(urls)``, or ``await downloader.fetch(item)`` for
+    each DownloadItem. ``bandwidth`` is in bytes per second.
+    """
+
+    def __init__(
+        self,
+        output_dir=".",
+        concurrency=CONCURRENCY,
+        per_host=PER_HOST,
+        bandwidth=None,
+        policy=None,
+        chunk_size=CHUNK_SIZE,
+        timeout=TIMEOUT,
+        progress_interval=PROGRESS_INTERVAL,
+        rng=None,
+    ):
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.per_host = per_host or concurrency
+        self.bandwidth = bandwidth
+        self.policy = policy or RetryPolicy()
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.rng = rng or random.Random()
+        self.succeeded = []
+        self.failed = []
+        self.session = None
+        self._subscribers = []
+        self._started = None
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every ProgressEvent; returns it."""
+        self._subscribers.append(callback)
+        return callback
+
+    async def _emit(self, kind, item, **details):
+        event = ProgressEvent(kind, item, **details)
+        for callback in self._subscribers:
+            result = callback(event)
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self):
+        connect, read = self.timeout
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.per_host
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=None, sock_connect=connect, sock_read=read
+            ),
+            auto_decompress=False,
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._hosts = {}
+        self._limiter = RateLimiter(self.bandwidth) if self.bandwidth else None
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _host_slots(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def fetch(self, item):
+        """Download one DownloadItem, retrying per the policy."""
+        while True:
+            # The host's slot comes first, so items queued behind a busy host
+            # do not hold overall slots the other hosts could use.
+            async with self._host_slots(item.host), self._slots:
+                try:
+                    await self._emit("started", item)
+                    item.transfer = await self._download(item)
+                    error = None
+                except Exception as e:
+                    # Anything unexpected fails this item, not the others;
+                    # the policy only retries DownloadErrors.
+                    error = e
+            item.attempts += 1
+            item.error = error
+            if error is None:
+                self.succeeded.append(item)
+                await self._emit("finished", item, transfer=item.transfer)
+                return item
+            if not self.policy.should_retry(error, item.attempts):
+                self.failed.append(item)
+                await self._emit("failed", item, error=error)
+                return item
+            delay = self.policy.delay(item.attempts, self.rng)
+            await self._emit("retry", item, error=error, delay=delay)
+            await asyncio.sleep(delay)
+
+    async def _get(self, url, offset):
+        return await self.session.get(url, headers=request_headers(offset))
+
+    async def _probe(self, transfer, digest, expected_size):
+        """Check whether an existing file is complete without refetching it."""
+        size = os.path.getsize(transfer.path)
+        if not size:
+            return False
+        response = await self._get(transfer.url, size)
+        try:
+            if response.status != 416:
+                return False
+            # Read the empty body so the connection goes back to the pool.
+            await response.read()
+        finally:
+            response.release()
+        return await asyncio.to_thread(
+            complete_file,
+            transfer,
+            response.status,
+            response.headers,
+            digest,
+            expected_size,
+            self.chunk_size,
+        )
+
+    async def _download(self, item):
+        url = item.url
+        options = item.options
+        output_dir = item.output_dir or self.output_dir
+        checksum = options.get("checksum")
+        digest = parse_checksum(checksum) if checksum else None
+        transfer = Transfer(url)
+        path = (
+            os.path.join(output_dir, options["filename"])
+            if options.get("filename")
+            else None
+        )
+        offset = part_size(path) if path else 0
+        expected_size = options.get("expected_size")
+        try:
+            if path and not offset and os.path.isfile(path):
+                transfer.path = path
+                if await self._probe(transfer, digest, expected_size):
+                    return transfer
+            response = await self._get(url, offset)
+            try:
+                if path is None:
+                    path = os.path.join(
+                        output_dir, filename_from_response(response, url)
+                    )
+                    offset = part_size(path)
+                    if offset and response.status == 200:
+                        # The name came with this response; ask for the rest.
+                        response.close()
+                        response = await self._get(url, offset)
+                transfer.path = path
+                # May verify a complete file already on disk
+                if await asyncio.to_thread(
+                    start_transfer,
+                    transfer,
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    offset,
+                    digest,
+                    expected_size,
+                    self.chunk_size,
+                ):
+                    await self._stream(item, response, transfer, digest)
+            finally:
+                response.release()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise DownloadError(f"{transfer.name}: {e!r}") from e
+        return transfer
+
+    async def _stream(self, item, response, transfer, digest):
+        await self._emit("progress", item, transfer=transfer)
+        next_event = time.monotonic() + self.progress_interval
+        # Resuming with a checksum re-hashes the part file
+        f, hasher = await asyncio.to_thread(
+            open_part, transfer, digest, self.chunk_size
+        )
+        with f:
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                if self._limiter:
+                    await self._limiter.acquire(len(chunk))
+                await asyncio.to_thread(_write, f, hasher, chunk)
+                transfer.received += len(chunk)
+                if time.monotonic() >= next_event:
+                    await self._emit("progress", item, transfer=transfer)
+                    next_event = time.monotonic() + self.progress_interval
+        await asyncio.to_thread(end_transfer, transfer, digest, hasher, self.chunk_size)
+
+    async def run(self, urls):
+        """Download ``urls`` (or ``(url, options)`` pairs); returns the report."""
+        items = []
+        for url in urls:
+            url, options = (url, {}) if isinstance(url, str) else url
+            items.append(DownloadItem(url, options))
+        for item in items:
+            await self._emit("queued", item)
+        await asyncio.gather(*(self.fetch(item) for item in items))
+        return self.report()
+
+    def report(self):
+        seconds = time.monotonic() - self._started if self._started else 0.0
+        return DownloadReport(self.succeeded, self.failed, seconds)
+
+
+class ProgressPrinter:
+    """A subscriber printing retries, failures and a ThroughputMeter's lines."""
+
+    def __init__(self, interval=5.0):
+        self.meter = ThroughputMeter(interval)
+
+    def __call__(self, event):
+        kind = event.kind
+        if kind == "queued":
+            self.meter.add()
+        elif event.transfer is not None:
+            self.meter.update(event.transfer)
+        if kind == "retry":
+            print(
+                f"Failed to download {event.item.url} - {event.error}; retry "
+                f"{event.item.attempts} in {event.delay:.1f}s"
+            )
+        elif kind == "failed":
+            print(f"Giving up on {event.item.url} - {event.error}")
+            self.meter.fail(event.item.url)
+
+
+class AsyncScheduler:
+    """The submit()/join() interface of DownloadScheduler over the async engine.
+
+    The event loop runs on a background thread, so blocking callers can
+    submit URLs as they become available.
+    """
+
+    def __init__(self, output_dir=".", progress=True, **options):
+        self.downloader = AsyncDownloader(output_dir, **options)
+        self.printer = None
+        if progress:
+            self.printer = self.downloader.subscribe(ProgressPrinter())
+        self._futures = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._call(self.downloader.__aenter__())
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def subscribe(self, callback):
+        """Add a ProgressEvent subscriber; it runs on the event loop thread."""
+        return self.downloader.subscribe(callback)
+
+    def submit(self, url, output_dir=None, **options):
+        """Queue ``url``; ``options`` are filename, checksum, expected_size."""
+        item = DownloadItem(url, options, output_dir)
+        self._call(self.downloader._emit("queued", item))
+        self._futures.append(self._call(self.downloader.fetch(item)))
+
+    def join(self):
+        """Wait for every submitted URL and return the DownloadReport."""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._call(self.downloader.__aexit__(None, None, None)).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        return self.downloader.report()
+
+
+def download_all(urls, output_dir=".", progress=True, **options):
+    """Download ``urls`` with an AsyncDownloader; returns the DownloadReport."""
+
+    async def main():
+        async with AsyncDownloader(output_dir, **options) as downloader:
+            if progress:
+                downloader.subscribe(ProgressPrinter())
+            return await downloader.run(urls)
+
+    return asyncio.run(main())
+
+
+def scheduler_from_args(args, output_dir="."):
+    """Return an AsyncScheduler for download_scheduler.add_arguments() options."""
+    return AsyncScheduler(
+        output_dir,
+        concurrency=max(args.concurrency, 1),
+        per_host=max(args.per_host or PER_HOST, 1),
+        bandwidth=args.bandwidth * 1e6 if args.bandwidth else None,
+        policy=RetryPolicy(retries=max(args.retries, 0)),
+        chunk_size=(
+            max(int(args.chunk_size * 1024 * 1024), 1024)
+            if args.chunk_size
+            else CHUNK_SIZE
+        ),
+        timeout=(TIMEOUT[0], getattr(args, "timeout", TIMEOUT[1])),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Download URLs concurrently on an asyncio event loop."
+    )
+    parser.add_argument("urls", nargs="+", help="URLs to download")
+    parser.add_argument(
+        "--output-dir", default=".", help="Where to save the files (default: .)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"Concurrent downloads (default: {CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=PER_HOST,
+        help=f"Concurrent downloads from one server (default: {PER_HOST})",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help="Retries per URL after the first attempt (default: 4)",
+    )
+    parser.add_argument("--bandwidth", type=float, help="Total bandwidth limit in MB/s")
+    parser.add_argument(
+        "--chunk-size", type=float, help="Read and write size in MiB (default: 0.25)"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    scheduler = scheduler_from_args(args, args.output_dir)
+    for url in args.urls:
+        scheduler.submit(url)
+    report = scheduler.join()
+    print(report)
+    sys.exit(0 if report.ok else 1)
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+
+Offline benchmarks for the DTED tools.
+
+A synthetic tree is generated with generate_dted.py (raw DTED0, as unpacked
+from a hemisphere set, with zipped DTED2 tiles overlaid for a state), then each
+benchmark is run ``--repeat`` times. Results are written as JSON so runs can
+be compared with ``--compare``.
+
+Usage:
+
+    python benchmark.py [options]
+
+Options:
+    --scale {state,hemisphere,global}
+                          Size of the synthetic tree (default: state)
+    --posts N             Cap posts per axis of generated tiles (default: 121)
+    --repeat N            Runs per benchmark (default: 3)
+    --only NAME[,NAME]    Only run the named benchmarks
+    --workdir DIR         Where to generate the tree (default: temporary)
+    --output FILE         Write results as JSON
+    --compare FILE        Compare against an earlier results file
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import generate_dted
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# DTED0 coverage per scale, (min_lon, min_lat, max_lon, max_lat) of tile
+# corners; every scale also carries a California-sized DTED2 overlay.
+SCALES = {
+    "state": (-130, 25, -105, 50),
+    "hemisphere": (-180, 0, 0, 90),
+    "global": (-180, -90, 180, 90),
+}
+STATE_DTED2 = (-125, 32, -114, 42)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register ``func(context)``; it may return a callable to time instead."""
+
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def load_visualizer():
+    path = os.path.join(TOOLS_DIR, "dted-coverage-visualizer.py")
+    spec = importlib.util.spec_from_file_location("dted_coverage_visualizer", path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so its functions can be sent to worker processes.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class Context:
+    """Paths of the generated tree and lazily loaded tools."""
+
+    def __init__(self, workdir, scale, posts):
+        self.workdir = workdir
+        self.scale = scale
+        self.posts = posts
+        self.tree = os.path.join(workdir, "tree")
+        self._visualizer = None
+        self._coverage = None
+        self._server = None
+
+    @property
+    def visualizer(self):
+        if self._visualizer is None:
+            self._visualizer = load_visualizer()
+        return self._visualizer
+
+    @property
+    def coverage(self):
+        if self._coverage is None:
+            self._coverage = self.visualizer.scan_directory(self.tree)
+        return self._coverage
+
+    def scratch(self, name):
+        path = os.path.join(self.workdir, name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        return path
+
+    def serve(self, root, **faults):
+        """Start a download_test_server on ``root``, stopping the last one.
+
+        Setup runs once per repeat, so each run's server is stopped before
+        the next one starts rather than left serving on its thread.
+        """
+        import download_test_server
+
+        self.close()
+        self._server = download_test_server.serve(root, **faults)
+        return self._server
+
+    def close(self):
+        """Stop the running download_test_server, if any."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def generate(context):
+    if os.path.isdir(context.tree):
+        print(f"Reusing synthetic tree at {context.tree}")
+        return
+    start = time.perf_counter()
+    dted0 = generate_dted.tiles_in_bbox(*SCALES[context.scale])
+    written = generate_dted.generate_tree(context.tree, dted0, 0, context.posts)
+    dted2 = generate_dted.tiles_in_bbox(*STATE_DTED2)
+    written += generate_dted.generate_tree(
+        context.tree, dted2, 2, context.posts, zip_tiles=True
+    )
+    print(
+        f"Generated {len(written)} tiles at {context.tree} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+def _build_index(context, jobs):
+    import create_index
+
+    output = context.scratch(f"index-j{jobs}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_index.main(context.tree, output, jobs=jobs, progress_interval=0)
+
+
+@benchmark("index_build")
+def bench_index_build(context):
+    _build_index(context, 1)
+
+
+@benchmark("index_build_parallel")
+def bench_index_build_parallel(context):
+    _build_index(context, os.cpu_count() or 1)
+
+
+@benchmark("index_build_validate")
+def bench_index_build_validate(context):
+    import create_index
+
+    output = context.scratch("index-validate")
+    report_file = os.path.join(context.workdir, "index-validate.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_index.main(
+            context.tree,
+            output,
+            report_file=report_file,
+            progress_interval=0,
+            validate=True,
+        )
+    # Every generated tile is valid DTED, whatever --posts is.
+    with open(report_file, "r") as f:
+        invalid = json.load(f)["counters"].get("tiles_invalid", 0)
+    if invalid:
+        raise RuntimeError(f"{invalid} generated tiles failed --validate")
+
+
+@benchmark("scan_directory")
+def bench_scan_directory(context):
+    context.visualizer.scan_directory(context.tree)
+
+
+@benchmark("scan_directory_serial")
+def bench_scan_directory_serial(context):
+    context.visualizer.scan_directory(context.tree, threads=1)
+
+
+@benchmark("scan_directory_cached")
+def bench_scan_directory_cached(context):
+    from coverage_scan import ScanCache
+
+    cache_file = os.path.join(context.workdir, "scan-cache.json")
+    context.visualizer.scan_directory(context.tree, cache=ScanCache(cache_file))
+
+    def run():
+        context.visualizer.scan_directory(
+            context.tree, cache=ScanCache(cache_file).load()
+        )
+
+    return run
+
+
+@benchmark("load_index")
+def bench_load_index(context):
+    import coverage_loader
+
+    index_zip = os.path.join(context.workdir, "index-j1", "index.zip")
+    if not os.path.exists(index_zip):
+        _build_index(context, 1)
+
+    def run():
+        coverage_loader.load_coverage(index_zip)
+
+    return run
+
+
+@benchmark("filter_region")
+def bench_filter_region(context):
+    coverage = context.coverage
+    visualizer = context.visualizer
+
+    def run():
+        for region in ("N", "S", "E", "W", "NW", "NE", "SW", "SE"):
+            visualizer.filter_by_region(coverage, region)
+
+    return run
+
+
+def _render_map(context, render):
+    coverage = context.coverage
+    visualizer = context.visualizer
+    output = os.path.join(context.workdir, f"coverage-{render}.png")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            visualizer.plot_coverage(coverage, output, render=render)
+        visualizer.plt.close("all")
+
+    return run
+
+
+@benchmark("render_map")
+def bench_render_map(context):
+    return _render_map(context, "raster")
+
+
+@benchmark("render_map_patches")
+def bench_render_map_patches(context):
+    return _render_map(context, "patches")
+
+
+BATCH_REGIONS = ("all", "N", "S", "E", "W", "NW", "NE", "SW", "SE")
+
+
+@benchmark("render_batch")
+def bench_render_batch(context):
+    coverage = context.coverage
+    visualizer = context.visualizer
+    output_dir = context.scratch("batch")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            visualizer.render_batch(coverage, BATCH_REGIONS, output_dir, ("png", "svg"))
+
+    return run
+
+
+@benchmark("elevation_preview")
+def bench_elevation_preview(context):
+    import elevation_preview
+
+    output = os.path.join(context.workdir, "elevation-preview.png")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            elevation_preview.render_preview(context.tree, output, max_size=2048)
+
+    return run
+
+
+def _run_visualizer(*args):
+    command = [
+        sys.executable,
+        os.path.join(TOOLS_DIR, "dted-coverage-visualizer.py"),
+        *args,
+    ]
+
+    def run():
+        subprocess.run(
+            command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    return run
+
+
+@benchmark("startup_help")
+def bench_startup_help(context):
+    # Interpreter start, imports and argument parsing only.
+    return _run_visualizer("--help")
+
+
+@benchmark("startup_summary")
+def bench_startup_summary(context):
+    return _run_visualizer(context.tree, "--summary", "--no-cache")
+
+
+@benchmark("startup_json")
+def bench_startup_json(context):
+    return _run_visualizer(context.tree, "--json", "--no-cache")
+
+
+@benchmark("download_stream")
+def bench_download_stream(context):
+    import download_engine
+    import download_test_server
+
+    served = context.scratch("served")
+    os.makedirs(served)
+    with open(os.path.join(served, "archive.zip"), "wb") as f:
+        for _ in range(64):
+            f.write(os.urandom(1024 * 1024))
+    server = context.serve(served)
+    url = download_test_server.url_for(server, "archive.zip")
+
+    def run():
+        output = context.scratch("downloads")
+        os.makedirs(output)
+        download_engine.download_file(url, output, progress=None)
+
+    return run
+
+
+def _download_many(context, session):
+    import download_engine
+    import download_test_server
+
+    served = context.scratch("served-many")
+    os.makedirs(served)
+    names = [f"n{lat:02d}.dt2.zip" for lat in range(200)]
+    for name in names:
+        with open(os.path.join(served, name), "wb") as f:
+            f.write(os.urandom(64 * 1024))
+    server = context.serve(served)
+
+    def run():
+        output = context.scratch("downloads-many")
+        os.makedirs(output)
+        for name in names:
+            download_engine.download_file(
+                download_test_server.url_for(server, name),
+                output,
+                session=session,
+                progress=None,
+            )
+
+    return run
+
+
+@benchmark("download_many_pooled")
+def bench_download_many_pooled(context):
+    import m2m_client
+
+    return _download_many(context, m2m_client.create_session())
+
+
+@benchmark("download_many_fresh")
+def bench_download_many_fresh(context):
+    # A new connection per file, as with bare requests.get
+    return _download_many(context, None)
+
+
+def _download_throttled(context, engine):
+    import download_scheduler
+    import download_test_server
+
+    # A slow server: each response is sent at 128 KiB/s, so the run time is
+    # set by how many downloads are in flight at once.
+    served = context.scratch(f"served-{engine}")
+    os.makedirs(served)
+    names = [f"n{lat:02d}.dt2.zip" for lat in range(32)]
+    for name in names:
+        with open(os.path.join(served, name), "wb") as f:
+            f.write(os.urandom(128 * 1024))
+    server = context.serve(served, rate=128 * 1024)
+    args = argparse.Namespace(
+        engine=engine,
+        workers=5,
+        concurrency=100,
+        per_host=None,
+        threads_per_host=2,
+        bandwidth=None,
+        retries=0,
+        chunk_size=None,
+    )
+
+    def run():
+        output = context.scratch(f"downloads-{engine}")
+        os.makedirs(output)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler = download_scheduler.scheduler_from_args(args, output)
+            for name in names:
+                scheduler.submit(download_test_server.url_for(server, name))
+            scheduler.join()
+
+    return run
+
+
+@benchmark("download_throttled_threads")
+def bench_download_throttled_threads(context):
+    return _download_throttled(context, "threads")
+
+
+@benchmark("download_throttled_async")
+def bench_download_throttled_async(context):
+    return _download_throttled(context, "async")
+
+
+def run_benchmark(func, context, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        timed = func(context)
+        if callable(timed):
+            start = time.perf_counter()
+            timed()
+        runs.append(time.perf_counter() - start)
+    return {
+        "runs": [round(r, 6) for r in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+    }
+
+
+def compare(results, baseline_file):
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nCompared to {baseline_file} (median):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["median"]
+        new = result["median"]
+        ratio = old / new if new else float("inf")
+        print(f"  {name}: {old:.3f}s -> {new:.3f}s ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline DTED tools benchmarks.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="state")
+    parser.add_argument(
+        "--posts", type=int, default=121, help="Cap posts per axis (0 for full size)"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="Comma-separated benchmark names")
+    parser.add_argument("--workdir", help="Directory for the generated tree")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    names = list(BENCHMARKS)
+    if args.only:
+        names = args.only.split(",")
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dted-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    context = Context(workdir, args.scale, args.posts or None)
+    try:
+        generate(context)
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(BENCHMARKS[name], context, args.repeat)
+            print(f"{name}: median {results[name]['median']:.3f}s")
+    finally:
+        context.close()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "scale": args.scale,
+            "posts": args.posts,
+            "repeat": args.repeat,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Results saved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+binary_index.py
+
+Compact binary form of the DTED coverage index and a memory-mapped reader.
+
+create_index.py writes ``index.bin`` next to ``index.zip``. The file is a
+fixed 32 byte little-endian header followed by the coverage grid packed as
+one 4-bit level bitmask per 1x1 degree cell, two cells per byte (low nibble
+first), in the same ``[lon + 180, lat + 90]`` order as the text index:
+
+    offset  size  field
+    0       8     magic, b"DTEDIDX\\0"
+    8       2     binary format version
+    10      2     index version (same as the text index)
+    12      2     longitude cells (360)
+    14      2     latitude cells (180)
+    16      8     timestamp, milliseconds since the epoch
+    24      8     reserved, zero
+
+The reader only maps the file; a lookup reads a single byte, so it needs
+neither NumPy nor a parse of the whole index.
+
+Usage:
+
+    python binary_index.py <index.bin> [lon lat]
+"""
+
+import math
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"DTEDIDX\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHHHQ8x")
+LON_CELLS = 360
+LAT_CELLS = 180
+DATA_SIZE = LON_CELLS * LAT_CELLS // 2
+
+
+def pack_grid(grid):
+    """Pack a CoverageGrid (or 360x180 rows) into the nibble layout."""
+    import numpy as np
+    from coverage_grid import CoverageGrid
+
+    flat = CoverageGrid.from_rows(grid).cells.ravel()
+    return ((flat[0::2] & 0x0F) | (flat[1::2] << 4)).astype(np.uint8).tobytes()
+
+
+def unpack_grid(data):
+    """Unpack the nibble layout into a CoverageGrid."""
+    import numpy as np
+    from coverage_grid import CoverageGrid
+
+    packed = np.frombuffer(data, dtype=np.uint8, count=DATA_SIZE)
+    cells = np.empty(LON_CELLS * LAT_CELLS, dtype=np.uint8)
+    cells[0::2] = packed & 0x0F
+    cells[1::2] = packed >> 4
+    return CoverageGrid(cells.reshape(LON_CELLS, LAT_CELLS))
+
+
+def write_binary_index(filename, version, grid, timestamp=None):
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, int(version), LON_CELLS, LAT_CELLS, int(timestamp)
+    )
+    try:
+        with open(filename, "wb") as f:
+            f.write(header)
+            f.write(pack_grid(grid))
+    except Exception as e:
+        print(f"Error writing binary index file {filename} - {e}")
+        return False
+    return True
+
+
+class BinaryIndex:
+    """Memory-mapped, read-only view of an ``index.bin`` file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) != HEADER.size + DATA_SIZE:
+                raise ValueError(
+                    f"Invalid binary index size {len(self._map)}, "
+                    f"expected {HEADER.size + DATA_SIZE}"
+                )
+            magic, fmt, version, lon_cells, lat_cells, timestamp = HEADER.unpack_from(
+                self._map
+            )
+            if magic != MAGIC:
+                raise ValueError(f"Not a binary DTED index: {filename}")
+            if fmt != FORMAT_VERSION:
+                raise ValueError(f"Unsupported binary index format version: {fmt}")
+            if (lon_cells, lat_cells) != (LON_CELLS, LAT_CELLS):
+                raise ValueError(
+                    f"Unsupported grid size {lon_cells}x{lat_cells} in {filename}"
+                )
+        except Exception:
+            self._map.close()
+            raise
+        self.version = version
+        self.timestamp = timestamp
+
+    def levels(self, lon, lat):
+        """Return the level bitmask of the cell containing ``lon``, ``lat``.
+
+        Degrees may be fractional; the cell is the one whose south-west
+        corner is ``floor(lon)``, ``floor(lat)``, as with tile names.
+        """
+        lon_idx = math.floor(lon) + 180
+        lat_idx = math.floor(lat) + 90
+        if not (0 <= lon_idx < LON_CELLS and 0 <= lat_idx < LAT_CELLS):
+            raise ValueError(f"Coordinates out of range: lon={lon}, lat={lat}")
+        idx = lon_idx * LAT_CELLS + lat_idx
+        byte = self._map[HEADER.size + (idx >> 1)]
+        return (byte >> ((idx & 1) * 4)) & 0x0F
+
+    def has_level(self, lon, lat, level):
+        """Return True if DTED ``level`` (1-3) is available for the cell."""
+        return bool(self.levels(lon, lat) & (1 << (level - 1)))
+
+    def to_grid(self):
+        """Decode the whole index into a CoverageGrid."""
+        return unpack_grid(self._map[HEADER.size :])
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) not in (2, 4):
+        print("Usage:\n  python binary_index.py <index.bin> [lon lat]")
+        sys.exit(1)
+
+    with BinaryIndex(sys.argv[1]) as index:
+        print(f"Index File Version: {index.version}")
+        print(f"Timestamp: {index.timestamp}")
+        print(f"Size: {os.path.getsize(sys.argv[1])} bytes")
+        if len(sys.argv) == 4:
+            lon, lat = float(sys.argv[2]), float(sys.argv[3])
+            print(f"Levels at lon={lon}, lat={lat}: {index.levels(lon, lat)}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+build_stats.py
+
+Counters, per-stage timings and progress reporting for the index build.
+
+A BuildStats object is plain data so it can be returned from worker
+processes and merged into the run total. Stage timings are summed across
+workers, so with ``--jobs`` they can exceed the wall-clock time of the run.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+COUNTERS = (
+    "tiles_seen",
+    "tiles_zipped",
+    "tiles_copied",
+    "tiles_skipped",
+    "tiles_invalid",
+    "tiles_unchanged",
+    "tiles_removed",
+    "zips_reused",
+    "bytes_in",
+    "bytes_out",
+    "compress_bytes_in",
+    "compress_bytes_out",
+)
+
+
+class BuildStats:
+    """Run counters and accumulated seconds per stage."""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timings = {}
+
+    def add(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def merge(self, other):
+        for counter, value in other.counters.items():
+            self.add(counter, value)
+        for stage, seconds in other.timings.items():
+            self.add_time(stage, seconds)
+        return self
+
+    def compression(self):
+        """Return the compression ratio and per-thread throughput in MB/s."""
+        raw = self.counters["compress_bytes_in"]
+        zipped = self.counters["compress_bytes_out"]
+        seconds = self.timings.get("compress", 0.0)
+        return {
+            "ratio": round(raw / zipped, 3) if zipped else None,
+            "throughput_mb_s": round(raw / seconds / 1e6, 3) if seconds else None,
+        }
+
+    def to_dict(self):
+        return {
+            "counters": dict(self.counters),
+            "timings": {stage: round(s, 6) for stage, s in self.timings.items()},
+            "compression": self.compression(),
+        }
+
+    def summary(self):
+        c = self.counters
+        stages = ", ".join(f"{stage} {s:.2f}s" for stage, s in self.timings.items())
+        return (
+            f"{c['tiles_seen']} tiles seen, {c['tiles_zipped']} zipped, "
+            f"{c['tiles_copied']} copied, {c['tiles_skipped']} skipped, "
+            f"{c['tiles_invalid']} invalid, "
+            f"{c['tiles_unchanged']} unchanged, {c['tiles_removed']} removed, "
+            f"{c['zips_reused']} zips reused, "
+            f"{format_bytes(c['bytes_out'])} written"
+            + (f" ({stages})" if stages else "")
+        )
+
+    def compression_summary(self):
+        compression = self.compression()
+        ratio = compression["ratio"]
+        throughput = compression["throughput_mb_s"]
+        return (
+            f"Compressed {format_bytes(self.counters['compress_bytes_in'])} to "
+            f"{format_bytes(self.counters['compress_bytes_out'])}"
+            + (f", ratio {ratio:.2f}x" if ratio else "")
+            + (f", {throughput:.1f} MB/s per thread" if throughput else "")
+            + f", {self.counters['zips_reused']} up to date"
+        )
+
+
+class ProgressReporter:
+    """Print a progress line at most every ``interval`` seconds."""
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._last = self.start
+
+    def update(self, stats, done, total, force=False):
+        now = time.perf_counter()
+        if not force and (self.interval <= 0 or now - self._last < self.interval):
+            return
+        self._last = now
+        elapsed = now - self.start
+        tiles = stats.counters["tiles_zipped"] + stats.counters["tiles_copied"]
+        rate = tiles / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Progress: {done}/{total} directories, {tiles} tiles staged, "
+            f"{format_bytes(stats.counters['bytes_out'])} written, "
+            f"{rate:.0f} tiles/s, {elapsed:.1f}s elapsed"
+        )
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.1f} {unit}" if unit != "B" else f"{count} B"
+        count /= 1024
+
+
+def write_report(report_file, stats, wall_time, **details):
+    """Write a JSON run report; ``details`` are added at the top level."""
+    report = dict(details)
+    report.update(stats.to_dict())
+    report["wall_time"] = round(wall_time, 6)
+    try:
+        with open(report_file, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    except Exception as e:
+        print(f"Error writing run report {report_file} - {e}")
+        return False
+    return True
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+coverage_filter.py
+
+Restrict DTED coverage to a region: a hemisphere or quadrant name, any
+longitude/latitude bounding box, or a GeoJSON polygon such as a state
+boundary.
+
+Cells are 1x1 degree tiles named by their south-west corner. A bounding box
+keeps every cell its extent overlaps (touching a cell's edge does not
+count, as in coverage_query), so the quadrants are just boxes: "N" keeps
+latitudes >= 0 and "W" longitudes < 0. A polygon keeps the cells whose
+center lies inside it; holes and MultiPolygons are honored.
+
+Each level's cells are tested as one NumPy array. A polygon's edges are
+broadcast against the cells as an (edges, cells) crossing matrix, in blocks
+of cells to bound its memory, so no Python loop runs per edge or cell.
+
+Usage:
+
+    python coverage_filter.py <coverage source> <region>
+
+where the region is a quadrant name (N, S, E, W, NW, NE, SW, SE), a box
+"min_lon,min_lat,max_lon,max_lat" or a GeoJSON file. Tools taking the
+region as ``-r``/``--region`` need a box with a negative longitude attached
+with "=", as in ``--region=-125,32,-114,42``, or ``--bbox -125 32 -114 42``.
+"""
+
+import json
+import os
+
+import numpy as np
+
+# Quadrant name: (label, (min_lon, min_lat, max_lon, max_lat))
+QUADRANTS = {
+    "N": ("Northern Hemisphere", (-180, 0, 180, 90)),
+    "S": ("Southern Hemisphere", (-180, -90, 180, 0)),
+    "E": ("Eastern Hemisphere", (0, -90, 180, 90)),
+    "W": ("Western Hemisphere", (-180, -90, 0, 90)),
+    "NW": ("Northwest Quadrant", (-180, 0, 0, 90)),
+    "NE": ("Northeast Quadrant", (0, 0, 180, 90)),
+    "SW": ("Southwest Quadrant", (-180, -90, 0, 0)),
+    "SE": ("Southeast Quadrant", (0, -90, 180, 0)),
+}
+
+# Largest (edges, cells) crossing matrix PolygonRegion.contains() builds
+MAX_CROSSINGS = 1 << 22
+
+
+class BBoxRegion:
+    """Cells overlapping a longitude/latitude box."""
+
+    def __init__(self, min_lon, min_lat, max_lon, max_lat, label=None):
+        if min_lon >= max_lon or min_lat >= max_lat:
+            raise ValueError(
+                f"Invalid bounding box: ({min_lon}, {min_lat}, {max_lon}, {max_lat})"
+            )
+        self.bounds = (min_lon, min_lat, max_lon, max_lat)
+        self.label = label or f"{min_lon}, {min_lat} to {max_lon}, {max_lat}"
+
+    def contains(self, lons, lats):
+        """Return a boolean mask of the cells (south-west corners) kept."""
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        return (
+            (lons < max_lon)
+            & (lons + 1 > min_lon)
+            & (lats < max_lat)
+            & (lats + 1 > min_lat)
+        )
+
+
+class PolygonRegion:
+    """Cells whose center lies inside a GeoJSON (Multi)Polygon."""
+
+    def __init__(self, polygons, label=None):
+        """``polygons`` is a list of polygons, each a list of [lon, lat] rings."""
+        self.polygons = [
+            [np.asarray(ring, dtype=float)[:, :2] for ring in rings if len(ring) >= 3]
+            for rings in polygons
+        ]
+        self.polygons = [rings for rings in self.polygons if rings]
+        if not self.polygons:
+            raise ValueError("Polygon region has no rings")
+        # Each polygon's non-horizontal edges as (ax, ay, bx, by) columns
+        self.edges = []
+        for rings in self.polygons:
+            edges = np.concatenate(
+                [np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings]
+            )
+            self.edges.append(edges[edges[:, 1] != edges[:, 3]])
+        points = np.concatenate([ring for rings in self.polygons for ring in rings])
+        self.bounds = (
+            float(points[:, 0].min()),
+            float(points[:, 1].min()),
+            float(points[:, 0].max()),
+            float(points[:, 1].max()),
+        )
+        self.label = label or "Polygon"
+
+    @classmethod
+    def from_geojson(cls, data, label=None):
+        """Build from a GeoJSON geometry, Feature or FeatureCollection."""
+        polygons = []
+        _collect_polygons(data, polygons)
+        if not polygons:
+            raise ValueError("GeoJSON contains no Polygon or MultiPolygon")
+        return cls(polygons, label)
+
+    def contains(self, lons, lats):
+        """Return a boolean mask of the cells (south-west corners) kept."""
+        x = np.asarray(lons, dtype=float).ravel() + 0.5
+        y = np.asarray(lats, dtype=float).ravel() + 0.5
+        keep = np.zeros(x.shape, dtype=bool)
+        # Only centers inside the bounds can be inside a polygon
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        candidates = np.flatnonzero(
+            (x >= min_lon) & (x <= max_lon) & (y >= min_lat) & (y <= max_lat)
+        )
+        x, y = x[candidates], y[candidates]
+        inside = np.zeros(x.shape, dtype=bool)
+        for edges in self.edges:
+            # Even-odd crossing test over all rings, so holes cut themselves out.
+            ax, ay, bx, by = (column[:, None] for column in edges.T)
+            slope = (bx - ax) / (by - ay)
+            step = max(MAX_CROSSINGS // max(len(edges), 1), 1)
+            for start in range(0, len(x), step):
+                px, py = x[start : start + step], y[start : start + step]
+                crossings = ((ay > py) != (by > py)) & (px < ax + (py - ay) * slope)
+                inside[start : start + step] |= crossings.sum(axis=0) % 2 == 1
+        keep[candidates] = inside
+        return keep.reshape(np.shape(lons))
+
+
+def _collect_polygons(data, polygons):
+    kind = data.get("type")
+    if kind == "FeatureCollection":
+        for feature in data.get("features", []):
+            _collect_polygons(feature, polygons)
+    elif kind == "Feature":
+        if data.get("geometry"):
+            _collect_polygons(data["geometry"], polygons)
+    elif kind == "GeometryCollection":
+        for geometry in data.get("geometries", []):
+            _collect_polygons(geometry, polygons)
+    elif kind == "Polygon":
+        polygons.append(data["coordinates"])
+    elif kind == "MultiPolygon":
+        polygons.extend(data["coordinates"])
+
+
+def quadrant(name):
+    """Return the BBoxRegion of a hemisphere or quadrant name such as "NW"."""
+    try:
+        label, bounds = QUADRANTS[name.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown region: {name}") from None
+    return BBoxRegion(*bounds, label=label)
+
+
+def load_geojson(path):
+    """Return the PolygonRegion of a GeoJSON file."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    label = os.path.splitext(os.path.basename(path))[0]
+    return PolygonRegion.from_geojson(data, label)
+
+
+def parse_region(text):
+    """Return the region named by a command line argument.
+
+    ``text`` is a quadrant name, a "min_lon,min_lat,max_lon,max_lat" box or
+    a GeoJSON file path; anything else raises ValueError.
+    """
+    if text.upper() in QUADRANTS:
+        return quadrant(text)
+    if os.path.isfile(text):
+        return load_geojson(text)
+    parts = text.split(",")
+    if len(parts) == 4:
+        try:
+            return BBoxRegion(*(float(part) for part in parts))
+        except ValueError as e:
+            raise ValueError(f"Invalid bounding box {text!r} - {e}") from None
+    raise ValueError(f"Unknown region: {text}")
+
+
+def filter_coverage(coverage, region):
+    """Return the cells of ``coverage`` inside ``region``.
+
+    Levels without cells in the region are dropped.
+    """
+    filtered = {}
+    for level, points in coverage.items():
+        if not points:
+            continue
+        cells = np.array(list(points), dtype=np.int32)
+        kept = cells[region.contains(cells[:, 0], cells[:, 1])]
+        if kept.size:
+            filtered[level] = set(zip(kept[:, 0].tolist(), kept[:, 1].tolist()))
+    return filtered
+
+
+if __name__ == "__main__":
+    import sys
+
+    from coverage_loader import load_coverage
+
+    if len(sys.argv) != 3:
+        print("Usage:\n  python coverage_filter.py <coverage source> <region>")
+        sys.exit(1)
+
+    try:
+        region = parse_region(sys.argv[2])
+        coverage = load_coverage(sys.argv[1])
+    except (ValueError, OSError) as e:
+        print(e)
+        sys.exit(1)
+    filtered = filter_coverage(coverage, region)
+    print(f"Coverage in {region.label}:")
+    for level in sorted(filtered):
+        print(f"  Level {level}: {len(filtered[level])} cells")
+    print(f"  Total: {sum(len(cells) for cells in filtered.values())} cells")
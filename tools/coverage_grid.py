@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+coverage_grid.py
+
+World DTED coverage grid backed by a NumPy array.
+
+The grid holds one cell per 1x1 degree tile, indexed ``[lon + 180, lat + 90]``,
+and each cell is a bitmask of the DTED levels available for that tile
+(1 = DTED1, 2 = DTED2, 4 = DTED3; DTED0 tiles leave the cell at 0).
+This is the layout of the text index written by create_index.py: a version
+line, a timestamp line, then 360 rows (one per longitude) of 180 digits (one
+per latitude).
+"""
+
+import numpy as np
+
+LON_CELLS = 360
+LAT_CELLS = 180
+
+_ZERO = ord("0")
+_NEWLINE = ord("\n")
+
+
+class CoverageGrid:
+    """360x180 grid of DTED level bitmasks."""
+
+    def __init__(self, cells=None):
+        if cells is None:
+            cells = np.zeros((LON_CELLS, LAT_CELLS), dtype=np.uint8)
+        else:
+            cells = np.asarray(cells, dtype=np.uint8)
+            if cells.shape != (LON_CELLS, LAT_CELLS):
+                raise ValueError(
+                    f"Coverage grid must be {LON_CELLS}x{LAT_CELLS}, got {cells.shape}"
+                )
+        self.cells = cells
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from a list of lists of ints, or return a grid as-is."""
+        if isinstance(rows, cls):
+            return rows
+        return cls(rows)
+
+    @classmethod
+    def from_text(cls, body):
+        """Parse the grid rows of a text index (without the header lines)."""
+        if isinstance(body, str):
+            body = body.encode("ascii")
+        raw = np.frombuffer(body, dtype=np.uint8)
+        if raw.size == LON_CELLS * (LAT_CELLS + 1) - 1:
+            # Tolerate a missing newline after the last row.
+            raw = np.append(raw, np.uint8(_NEWLINE))
+        if raw.size != LON_CELLS * (LAT_CELLS + 1):
+            raise ValueError(
+                f"Expected {LON_CELLS} rows of {LAT_CELLS} digits, "
+                f"got {raw.size} bytes"
+            )
+        raw = raw.reshape(LON_CELLS, LAT_CELLS + 1)
+        if np.any(raw[:, LAT_CELLS] != _NEWLINE):
+            raise ValueError(f"Invalid row length, rows must be {LAT_CELLS} digits")
+        cells = raw[:, :LAT_CELLS] - np.uint8(_ZERO)
+        if np.any(cells > 9):
+            raise ValueError("Index rows may only contain digits")
+        return cls(cells)
+
+    def to_text(self):
+        """Serialize the grid rows as they appear in the text index."""
+        out = np.full((LON_CELLS, LAT_CELLS + 1), _NEWLINE, dtype=np.uint8)
+        out[:, :LAT_CELLS] = self.cells + np.uint8(_ZERO)
+        return out.tobytes()
+
+    def mark(self, lons, lats, masks):
+        """OR level masks into the cells at the given lon/lat degrees."""
+        np.bitwise_or.at(
+            self.cells,
+            (
+                np.asarray(lons, dtype=np.intp) + 180,
+                np.asarray(lats, dtype=np.intp) + 90,
+            ),
+            np.asarray(masks, dtype=np.uint8),
+        )
+
+    def merge(self, other):
+        """OR another grid into this one in place."""
+        np.bitwise_or(self.cells, CoverageGrid.from_rows(other).cells, out=self.cells)
+        return self
+
+    def diff(self, other):
+        """Return a grid of the level bits that differ from ``other``."""
+        return CoverageGrid(
+            np.bitwise_xor(self.cells, CoverageGrid.from_rows(other).cells)
+        )
+
+    def changed_cells(self, other):
+        """Return an (N, 2) array of the lon/lat degrees that differ from ``other``."""
+        lon_idx, lat_idx = np.nonzero(self.cells != CoverageGrid.from_rows(other).cells)
+        return np.column_stack((lon_idx - 180, lat_idx - 90))
+
+    def copy(self):
+        return CoverageGrid(self.cells.copy())
+
+    def tolist(self):
+        return self.cells.tolist()
+
+    def __or__(self, other):
+        return self.copy().merge(other)
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def __eq__(self, other):
+        if not isinstance(other, CoverageGrid):
+            return NotImplemented
+        return bool(np.array_equal(self.cells, other.cells))
+
+    def __getitem__(self, key):
+        return self.cells[key]
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self):
+        return LON_CELLS
+
+    def __repr__(self):
+        return f"CoverageGrid({int(np.count_nonzero(self.cells))} non-zero cells)"
+
+
+def format_index(version, timestamp, grid):
+    """Serialize a complete text index."""
+    header = f"{version}\n{timestamp}\n".encode("ascii")
+    return header + CoverageGrid.from_rows(grid).to_text()
+
+
+def parse_index(data):
+    """Parse a complete text index into ``(version, timestamp, grid)``."""
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    version, timestamp, body = data.split(b"\n", 2)
+    return (
+        version.strip().decode("ascii"),
+        timestamp.strip().decode("ascii"),
+        CoverageGrid.from_text(body),
+    )
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+coverage_loader.py
+
+Load DTED coverage from whatever form it is stored in.
+
+A source can be a directory tree of tiles, an index written by
+create_index.py (``index.zip``, a plain ``index`` or ``index.bin``), or any
+zip of DTED tiles such as the ``dted_*_hemi.zip`` downloads or a single
+``n32.dt2.zip``. Indexes are read as a grid and archives from their central
+directory, so neither is walked or unpacked. Every source gives the same
+``{level: {(lon, lat), ...}}`` sets as dted-coverage-visualizer's
+scan_directory.
+
+The index grid records DTED1 and up; DTED0 tiles are not in it.
+
+Usage:
+
+    python coverage_loader.py <directory|index.zip|index.bin|archive.zip>
+"""
+
+import os
+import posixpath
+import zipfile
+
+import numpy as np
+
+from coverage_grid import CoverageGrid, parse_index
+from coverage_scan import parse_tile, scan_coverage
+
+# Level bits used by the index grid; DTED0 is not recorded there.
+GRID_LEVELS = {1: 1, 2: 2, 3: 4}
+
+INDEX_MEMBER = "index"
+
+
+def coverage_from_grid(grid):
+    """Return ``{level: {(lon, lat), ...}}`` for an index grid."""
+    cells = CoverageGrid.from_rows(grid).cells
+    coverage = {}
+    for level, bit in GRID_LEVELS.items():
+        lons, lats = np.nonzero(cells & bit)
+        if lons.size:
+            coverage[level] = set(zip((lons - 180).tolist(), (lats - 90).tolist()))
+    return coverage
+
+
+def read_index_grid(index_file):
+    """Return the grid of ``index.zip``, a plain ``index`` or ``index.bin``."""
+    if index_file.endswith(".bin"):
+        from binary_index import BinaryIndex
+
+        with BinaryIndex(index_file) as index:
+            return index.to_grid()
+
+    if zipfile.is_zipfile(index_file):
+        with zipfile.ZipFile(index_file) as zf:
+            data = zf.read(INDEX_MEMBER)
+    else:
+        with open(index_file, "rb") as f:
+            data = f.read()
+    return parse_index(data)[2]
+
+
+def coverage_from_archive(archive):
+    """Return the coverage of the DTED members named in a zip archive.
+
+    A member outside a longitude directory, as in a single ``n32.dt2.zip``
+    tile, takes its longitude from the directory holding the archive.
+    """
+    archive_dir = os.path.basename(os.path.dirname(os.path.abspath(archive)))
+    coverage = {}
+    with zipfile.ZipFile(archive) as zf:
+        for name in zf.namelist():
+            dir_name, file_name = posixpath.split(name)
+            tile = parse_tile(posixpath.basename(dir_name) or archive_dir, file_name)
+            if tile:
+                lon, lat, level = tile
+                coverage.setdefault(level, set()).add((lon, lat))
+    return coverage
+
+
+def is_index_archive(archive):
+    with zipfile.ZipFile(archive) as zf:
+        return INDEX_MEMBER in zf.namelist()
+
+
+def load_coverage(source, threads=None, cache=None):
+    """Return ``{level: {(lon, lat), ...}}`` for a directory, index or archive.
+
+    ``threads`` and the optional ScanCache ``cache`` are used by the
+    directory scan. Raises ValueError if ``source`` is neither a directory,
+    an index nor a zip archive.
+    """
+    if os.path.isdir(source):
+        return scan_coverage(source, threads, cache)
+    if not os.path.isfile(source):
+        raise ValueError(f"No such file or directory: {source}")
+    if zipfile.is_zipfile(source):
+        if is_index_archive(source):
+            return coverage_from_grid(read_index_grid(source))
+        return coverage_from_archive(source)
+    try:
+        return coverage_from_grid(read_index_grid(source))
+    except ValueError as e:
+        raise ValueError(f"Not a DTED index or archive: {source} - {e}") from None
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) != 2:
+        print(
+            "Usage:\n  python coverage_loader.py "
+            "<directory|index.zip|index.bin|archive.zip>"
+        )
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        coverage = load_coverage(sys.argv[1])
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    for level in sorted(coverage):
+        print(f"  Level {level}: {len(coverage[level])} cells")
+    print(f"Loaded {sys.argv[1]} in {elapsed * 1000:.1f} ms")
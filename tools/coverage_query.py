@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+coverage_query.py
+
+Answer DTED coverage questions for points and bounding boxes.
+
+A CoverageQuery is built once from a coverage grid (``index``/``index.zip``,
+``index.bin``) or from the ``{level: {(lon, lat), ...}}`` sets returned by
+dted-coverage-visualizer's scan_directory. It keeps a summed-area table per
+DTED level, so counting the covered cells inside any bounding box is four
+array lookups per level regardless of the size of the box.
+
+Cells are 1x1 degree tiles named by their south-west corner. A box covers
+every cell its extent overlaps; touching a cell's edge does not count.
+
+Usage:
+
+    python coverage_query.py <index.zip|index|index.bin> \\
+        <min_lon> <min_lat> <max_lon> <max_lat>
+"""
+
+import math
+import os
+
+import numpy as np
+
+from coverage_grid import LAT_CELLS, LON_CELLS, CoverageGrid
+from coverage_loader import GRID_LEVELS, read_index_grid
+
+
+class CoverageQuery:
+    """Point and bounding-box lookups over per-level coverage."""
+
+    def __init__(self, level_masks):
+        """``level_masks`` maps a DTED level to a 360x180 boolean array."""
+        self.levels = sorted(level_masks)
+        self._masks = {}
+        self._tables = {}
+        for level in self.levels:
+            mask = np.asarray(level_masks[level], dtype=bool)
+            if mask.shape != (LON_CELLS, LAT_CELLS):
+                raise ValueError(
+                    f"Level {level} mask must be {LON_CELLS}x{LAT_CELLS}, "
+                    f"got {mask.shape}"
+                )
+            table = np.zeros((LON_CELLS + 1, LAT_CELLS + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(mask, axis=0), axis=1, out=table[1:, 1:])
+            self._masks[level] = mask
+            self._tables[level] = table
+
+    @classmethod
+    def from_grid(cls, grid):
+        cells = CoverageGrid.from_rows(grid).cells
+        return cls({level: (cells & bit) != 0 for level, bit in GRID_LEVELS.items()})
+
+    @classmethod
+    def from_coverage(cls, coverage):
+        """Build from ``{level: {(lon, lat), ...}}`` as returned by scan_directory."""
+        masks = {}
+        for level, points in coverage.items():
+            mask = np.zeros((LON_CELLS, LAT_CELLS), dtype=bool)
+            if points:
+                lons, lats = np.array(sorted(points), dtype=np.intp).T
+                keep = (lons >= -180) & (lons < 180) & (lats >= -90) & (lats < 90)
+                mask[lons[keep] + 180, lats[keep] + 90] = True
+            masks[level] = mask
+        return cls(masks)
+
+    @classmethod
+    def from_index_file(cls, index_file):
+        """Build from ``index.zip``, a plain ``index`` or ``index.bin``."""
+        return cls.from_grid(read_index_grid(index_file))
+
+    def point(self, lon, lat):
+        """Return the sorted list of levels available at ``lon``, ``lat``."""
+        lon_idx = math.floor(lon) + 180
+        lat_idx = math.floor(lat) + 90
+        if not (0 <= lon_idx < LON_CELLS and 0 <= lat_idx < LAT_CELLS):
+            raise ValueError(f"Coordinates out of range: lon={lon}, lat={lat}")
+        return [level for level in self.levels if self._masks[level][lon_idx, lat_idx]]
+
+    def _cell_range(self, min_lon, min_lat, max_lon, max_lat):
+        if min_lon > max_lon or min_lat > max_lat:
+            raise ValueError(
+                f"Invalid bounding box: ({min_lon}, {min_lat}, {max_lon}, {max_lat})"
+            )
+        lon0 = min(max(math.floor(min_lon) + 180, 0), LON_CELLS)
+        lat0 = min(max(math.floor(min_lat) + 90, 0), LAT_CELLS)
+        lon1 = min(max(math.ceil(max_lon) + 180, lon0 + 1), LON_CELLS)
+        lat1 = min(max(math.ceil(max_lat) + 90, lat0 + 1), LAT_CELLS)
+        return lon0, lat0, lon1, lat1
+
+    def count(self, min_lon, min_lat, max_lon, max_lat):
+        """Return ``{level: covered cells}`` inside the bounding box."""
+        lon0, lat0, lon1, lat1 = self._cell_range(min_lon, min_lat, max_lon, max_lat)
+        counts = {}
+        for level, table in self._tables.items():
+            counts[level] = int(
+                table[lon1, lat1]
+                - table[lon0, lat1]
+                - table[lon1, lat0]
+                + table[lon0, lat0]
+            )
+        return counts
+
+    def cells_in_box(self, min_lon, min_lat, max_lon, max_lat):
+        """Return the number of 1x1 degree cells the bounding box overlaps."""
+        lon0, lat0, lon1, lat1 = self._cell_range(min_lon, min_lat, max_lon, max_lat)
+        return max(lon1 - lon0, 0) * max(lat1 - lat0, 0)
+
+    def percent(self, min_lon, min_lat, max_lon, max_lat):
+        """Return ``{level: percent of the box's cells covered}``."""
+        total = self.cells_in_box(min_lon, min_lat, max_lon, max_lat)
+        counts = self.count(min_lon, min_lat, max_lon, max_lat)
+        return {
+            level: (100.0 * count / total if total else 0.0)
+            for level, count in counts.items()
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 6:
+        print(
+            "Usage:\n  python coverage_query.py <index.zip|index|index.bin> "
+            "<min_lon> <min_lat> <max_lon> <max_lat>"
+        )
+        sys.exit(1)
+
+    query = CoverageQuery.from_index_file(sys.argv[1])
+    bbox = [float(value) for value in sys.argv[2:]]
+    counts = query.count(*bbox)
+    percents = query.percent(*bbox)
+    print(f"Coverage of {os.path.basename(sys.argv[1])} in {bbox}:")
+    for level in query.levels:
+        print(f"  Level {level}: {counts[level]} cells ({percents[level]:.1f}%)")
+    print(f"  Cells in box: {query.cells_in_box(*bbox)}")
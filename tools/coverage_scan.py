@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+coverage_scan.py
+
+Find the DTED tiles under a directory tree.
+
+Directories are listed with os.scandir, so file types come from the directory
+entries instead of a stat per file, and each directory is listed on a thread
+pool: on network filesystems most of a scan is spent waiting on directory
+reads, which overlap across threads. A tile is recognized by one precompiled
+pattern on its longitude directory and file name (``w115/n32.dt2``).
+
+iter_tiles() yields tiles as each directory is listed, so callers can start
+work before the scan is done; scan_coverage() collects them into the
+``{level: {(lon, lat), ...}}`` sets used by dted-coverage-visualizer.
+iter_tile_files() yields the tile paths as well, including zipped
+``n32.dt2.zip`` tiles, for readers of the posts such as elevation_preview.
+
+A ScanCache remembers each directory's tiles and subdirectories with its
+mtime. Adding, removing or renaming an entry changes a directory's mtime, so
+on the next scan an unchanged directory costs one stat instead of a listing
+and only the changed directories are listed again.
+
+Usage:
+
+    python coverage_scan.py <directory> [--threads N] [--cache FILE]
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DTED_EXTENSIONS = (".dt0", ".dt1", ".dt2")
+
+ZIP_SUFFIX = ".zip"
+
+CACHE_VERSION = 2
+
+# "<longitude directory>/<latitude file>", matched on the lowercased name.
+_TILE_PATH = re.compile(r"([ew])(\d+)/([ns])(\d+)\.dt([0-2])$")
+
+
+def parse_tile(dir_name, file_name):
+    """Return ``(lon, lat, level)`` for a tile in ``dir_name``, or None."""
+    match = _TILE_PATH.search(f"{dir_name}/{file_name}".lower())
+    if not match:
+        return None
+    ew, lon, ns, lat, level = match.groups()
+    lon = -int(lon) if ew == "w" else int(lon)
+    lat = -int(lat) if ns == "s" else int(lat)
+    return lon, lat, int(level)
+
+
+def _fallback_parse(path):
+    # Tiles outside a longitude directory (e.g. "dted/w115_n32.dt2") are still
+    # found by searching the whole path, as the visualizer always did.
+    lower = path.lower()
+    ew = re.search(r"([ew])(\d+)", lower)
+    ns = re.search(r"([ns])(\d+)", lower)
+    level = re.search(r"dt(\d+)", lower)
+    if not (ew and ns and level):
+        return None
+    lon = -int(ew.group(2)) if ew.group(1) == "w" else int(ew.group(2))
+    lat = -int(ns.group(2)) if ns.group(1) == "s" else int(ns.group(2))
+    return lon, lat, int(level.group(1))
+
+
+def list_directory(path):
+    """Return ``(tiles, subdirectories)`` of one directory.
+
+    Tiles are ``(lon, lat, level, file name)``, raw or zipped. Unreadable
+    directories are skipped like os.walk does. Symbolic links to directories
+    are not followed.
+    """
+    tiles = []
+    subdirs = []
+    dir_name = os.path.basename(path)
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    continue
+                name = entry.name
+                if name.lower().endswith(ZIP_SUFFIX):
+                    name = name[: -len(ZIP_SUFFIX)]
+                if not name.lower().endswith(DTED_EXTENSIONS):
+                    continue
+                tile = parse_tile(dir_name, name) or _fallback_parse(entry.path)
+                if tile:
+                    tiles.append((*tile, entry.name))
+    except OSError:
+        pass
+    return tiles, subdirs
+
+
+def default_cache_file():
+    """Return the per-user scan cache path."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "dted-tools", "scan-cache.json")
+
+
+class ScanCache:
+    """Directory listings keyed on absolute path and mtime, stored as JSON."""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file or default_cache_file()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the cache file; a missing or unreadable cache starts empty."""
+        self.entries = {}
+        if not os.path.exists(self.cache_file):
+            return self
+        try:
+            with open(self.cache_file, "r") as f:
+                cache = json.load(f)
+        except Exception as e:
+            print(f"Error reading scan cache {self.cache_file}, rescanning - {e}")
+            return self
+        if cache.get("version") != CACHE_VERSION:
+            print(f"Scan cache {self.cache_file} has an unknown version, rescanning")
+            return self
+        self.entries = cache["directories"]
+        return self
+
+    def clear(self):
+        """Forget every cached listing and remove the cache file."""
+        self.entries = {}
+        self._seen = {}
+        try:
+            os.remove(self.cache_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing scan cache {self.cache_file} - {e}")
+
+    def list_directory(self, path):
+        """Like list_directory(), reusing the listing of an unchanged directory."""
+        key = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            return [], []
+        entry = self.entries.get(key)
+        if entry is not None and entry["mtime_ns"] == mtime_ns:
+            tiles = [tuple(tile) for tile in entry["tiles"]]
+            subdirs = [os.path.join(path, name) for name in entry["subdirs"]]
+            hit = True
+        else:
+            tiles, subdirs = list_directory(path)
+            entry = {
+                "mtime_ns": mtime_ns,
+                "tiles": [list(tile) for tile in tiles],
+                "subdirs": [os.path.basename(d) for d in subdirs],
+            }
+            hit = False
+        with self._lock:
+            self._seen[key] = entry
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._dirty = True
+        return tiles, subdirs
+
+    def save(self, root_dir):
+        """Write the listings seen while scanning ``root_dir``.
+
+        Entries under ``root_dir`` that were not seen (removed directories)
+        are dropped; entries of other roots are kept. Nothing is written if
+        every directory came from the cache.
+        """
+        root = os.path.abspath(root_dir)
+        prefix = root.rstrip(os.sep) + os.sep
+        entries = {
+            key: entry
+            for key, entry in self.entries.items()
+            if key != root and not key.startswith(prefix)
+        }
+        entries.update(self._seen)
+        if not self._dirty and len(entries) == len(self.entries):
+            self._seen = {}
+            return True
+        cache = {"version": CACHE_VERSION, "directories": entries}
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True
+            )
+            with open(tmp_file, "w") as f:
+                json.dump(cache, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error writing scan cache {self.cache_file} - {e}")
+            return False
+        self.entries = entries
+        self._seen = {}
+        self._dirty = False
+        return True
+
+
+def _listings(root_dir, threads, cache):
+    """Yield ``(directory, tiles)`` for each directory under ``root_dir``."""
+    lister = cache.list_directory if cache is not None else list_directory
+    if threads == 1:
+        pending = [root_dir]
+        while pending:
+            path = pending.pop()
+            tiles, subdirs = lister(path)
+            yield path, tiles
+            pending.extend(reversed(subdirs))
+        return
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        running = {executor.submit(lister, root_dir): root_dir}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = running.pop(future)
+                tiles, subdirs = future.result()
+                running.update({executor.submit(lister, d): d for d in subdirs})
+                yield path, tiles
+
+
+def iter_tiles(root_dir, threads=None, cache=None):
+    """Yield ``(lon, lat, level)`` for every raw tile under ``root_dir``.
+
+    Tiles are yielded a directory at a time as listings complete, so the
+    order is not deterministic with more than one thread. ``threads`` of
+    None uses the ThreadPoolExecutor default. With a ScanCache, unchanged
+    directories come from the cache; call ``cache.save()`` afterwards.
+    """
+    for _, tiles in _listings(root_dir, threads, cache):
+        for lon, lat, level, name in tiles:
+            if not name.lower().endswith(ZIP_SUFFIX):
+                yield lon, lat, level
+
+
+def iter_tile_files(root_dir, threads=None, cache=None):
+    """Yield ``(lon, lat, level, path)`` for every raw or zipped tile.
+
+    Scans like iter_tiles(); call ``cache.save()`` afterwards.
+    """
+    for path, tiles in _listings(root_dir, threads, cache):
+        for lon, lat, level, name in tiles:
+            yield lon, lat, level, os.path.join(path, name)
+
+
+def scan_coverage(root_dir, threads=None, cache=None):
+    """Return ``{level: {(lon, lat), ...}}`` for the tiles under ``root_dir``.
+
+    With a ScanCache the cache is updated and saved after the scan.
+    """
+    coverage = {}
+    for lon, lat, level in iter_tiles(root_dir, threads, cache):
+        coverage.setdefault(level, set()).add((lon, lat))
+    if cache is not None:
+        cache.save(root_dir)
+    return coverage
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Count the DTED tiles under a directory tree."
+    )
+    parser.add_argument("directory", help="Directory containing w115/n32.dt2 tiles")
+    parser.add_argument(
+        "--threads", type=int, help="Directory listing threads (default: auto)"
+    )
+    parser.add_argument("--cache", help="Reuse and update a scan cache file")
+    args = parser.parse_args()
+
+    cache = ScanCache(args.cache).load() if args.cache else None
+    start = time.perf_counter()
+    coverage = scan_coverage(args.directory, args.threads, cache)
+    elapsed = time.perf_counter() - start
+    for level in sorted(coverage):
+        print(f"  Level {level}: {len(coverage[level])} cells")
+    print(f"Scanned {args.directory} in {elapsed:.3f}s")
+    if cache is not None:
+        print(f"Scan cache: {cache.hits} directories reused, {cache.misses} listed")
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+coverage_tiles.py
+
+Render DTED coverage into a z/x/y slippy-map tile pyramid.
+
+Tiles are 256x256 PNGs in Web Mercator (the ``{z}/{x}/{y}.png`` layout
+Leaflet and OpenLayers read), colored per DTED level like the visualizer's
+map and composited at the same alpha. Cell outlines are drawn once a
+1 degree cell is wide enough to show them. A TileJSON ``tiles.json`` next
+to the pyramid records the zoom range and bounds for the front end.
+
+The levels are composited once into a 360x180 RGBA grid, so a tile is one
+NumPy gather of that grid at its pixel coordinates. Tile columns are
+rendered on a process pool, and a PNG is only written when its bytes
+differ from the file already there. Tiles that are now empty, or outside
+the coverage, are removed. Rebuilding an unchanged pyramid therefore writes
+nothing, and a web server or CDN keeps its cached tiles.
+
+Usage:
+
+    python coverage_tiles.py <coverage source> <output directory> [options]
+"""
+
+import json
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511287798  # Web Mercator limit
+
+# RGB per DTED level, matching the visualizer's yellow/green/blue.
+LEVEL_RGB = {
+    0: (1.0, 1.0, 0.0),
+    1: (0.0, 0.5, 0.0),
+    2: (0.0, 0.0, 1.0),
+}
+DEFAULT_RGB = (0.5, 0.5, 0.5)
+LEVEL_ALPHA = 0.7
+
+# Outlines are drawn once a cell is at least this many pixels wide.
+OUTLINE_MIN_PIXELS = 6
+
+
+def coverage_raster(points):
+    """Return a (180, 360) boolean grid, row lat + 90, column lon + 180."""
+    grid = np.zeros((180, 360), dtype=bool)
+    if points:
+        cells = np.array(list(points), dtype=np.int32)
+        lons, lats = cells[:, 0] + 180, cells[:, 1] + 90
+        inside = (lons >= 0) & (lons < 360) & (lats >= 0) & (lats < 180)
+        grid[lats[inside], lons[inside]] = True
+    return grid
+
+
+def composite_levels(coverage, colors):
+    """Alpha-composite the levels, lowest first, into a (180, 360, 4) grid.
+
+    ``colors`` maps a level to an RGBA tuple of floats. The result is
+    straight (not premultiplied) RGBA in 0-1; empty cells are transparent.
+    """
+    image = np.zeros((180, 360, 4))
+    for level in sorted(coverage.keys()):
+        grid = coverage_raster(coverage[level])
+        color = np.asarray(colors[level], dtype=float)
+        alpha = grid[..., None] * color[3]
+        image[..., :3] = color[:3] * alpha + image[..., :3] * (1 - alpha)
+        image[..., 3:] = alpha + image[..., 3:] * (1 - alpha)
+    covered = image[..., 3] > 0
+    image[covered, :3] /= image[covered, 3:]
+    return image
+
+
+def level_colors(coverage):
+    return {
+        level: LEVEL_RGB.get(level, DEFAULT_RGB) + (LEVEL_ALPHA,) for level in coverage
+    }
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(kind, data):
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def _png_header(width, height):
+    # 8-bit RGBA, no interlacing
+    return _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+
+def _png_rows(rgba):
+    height, width = rgba.shape[:2]
+    rows = np.zeros((height, 1 + width * 4), dtype=np.uint8)  # filter type 0
+    rows[:, 1:] = rgba.reshape(height, width * 4)
+    return rows.tobytes()
+
+
+def encode_png(rgba):
+    """Encode a (height, width, 4) uint8 array as PNG bytes."""
+    height, width = rgba.shape[:2]
+    return (
+        PNG_SIGNATURE
+        + _png_header(width, height)
+        + _png_chunk(b"IDAT", zlib.compress(_png_rows(rgba), 9))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def write_png(path, width, height, strips, level=6):
+    """Stream an RGBA PNG to ``path`` from an iterable of row strips.
+
+    Each strip is a (rows, width, 4) uint8 array, top to bottom, so an image
+    larger than memory can be written a strip at a time.
+    """
+    compressor = zlib.compressobj(level)
+    written = 0
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE + _png_header(width, height))
+        for strip in strips:
+            written += strip.shape[0]
+            data = compressor.compress(_png_rows(strip))
+            if data:
+                f.write(_png_chunk(b"IDAT", data))
+        f.write(_png_chunk(b"IDAT", compressor.flush()))
+        f.write(_png_chunk(b"IEND", b""))
+    if written != height:
+        raise ValueError(f"PNG {path} declares {height} rows, {written} written")
+
+
+def _pixel_lons(z, x):
+    # Longitude of the centers of pixels -1..255 of tile column x
+    scale = TILE_SIZE * 2**z
+    pixels = x * TILE_SIZE + np.arange(-1, TILE_SIZE) + 0.5
+    return pixels / scale * 360.0 - 180.0
+
+
+def _pixel_lats(z, y):
+    scale = TILE_SIZE * 2**z
+    pixels = y * TILE_SIZE + np.arange(-1, TILE_SIZE) + 0.5
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * pixels / scale))))
+
+
+def render_tile(rgba, z, x, y, outlines=True):
+    """Return the (256, 256, 4) uint8 image of a tile, or None if empty.
+
+    ``rgba`` is the composite_levels() grid converted to uint8.
+    """
+    cols = np.clip(np.floor(_pixel_lons(z, x)).astype(int) + 180, 0, 359)
+    rows = np.clip(np.floor(_pixel_lats(z, y)).astype(int) + 90, 0, 179)
+    # One extra row and column on the top/left for the outline test
+    full = rgba[rows[:, None], cols[None, :]]
+    image = full[1:, 1:]
+    if not image[..., 3].any():
+        return None
+
+    if outlines and TILE_SIZE * 2**z / 360.0 >= OUTLINE_MIN_PIXELS:
+        covered = full[..., 3] > 0
+        new_col = (cols[1:] != cols[:-1])[None, :]
+        new_row = (rows[1:] != rows[:-1])[:, None]
+        edge = (new_col & (covered[1:, 1:] | covered[1:, :-1])) | (
+            new_row & (covered[1:, 1:] | covered[:-1, 1:])
+        )
+        if edge.any():
+            image = image.copy()
+            pixels = image[edge].astype(float) / 255
+            # Black at LEVEL_ALPHA over the pixel, straight alpha
+            alpha = LEVEL_ALPHA + pixels[:, 3] * (1 - LEVEL_ALPHA)
+            pixels[:, :3] *= (pixels[:, 3] * (1 - LEVEL_ALPHA) / alpha)[:, None]
+            pixels[:, 3] = alpha
+            image[edge] = np.rint(pixels * 255).astype(np.uint8)
+    return image
+
+
+def lon_to_tile(lon, z):
+    return int(math.floor((lon + 180.0) / 360.0 * 2**z))
+
+
+def lat_to_tile(lat, z):
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * 2**z
+    return int(math.floor(y))
+
+
+def tile_range(bounds, z):
+    """Return ``(x0, x1, y0, y1)``, inclusive, of the tiles over ``bounds``."""
+    west, south, east, north = bounds
+    last = 2**z - 1
+    x0 = min(max(lon_to_tile(west, z), 0), last)
+    # East/south edges are exclusive; step back inside the box.
+    x1 = min(max(lon_to_tile(east - 1e-9, z), 0), last)
+    y0 = min(max(lat_to_tile(north, z), 0), last)
+    y1 = min(max(lat_to_tile(south + 1e-9, z), 0), last)
+    return x0, x1, y0, y1
+
+
+def coverage_bounds(rgba):
+    """Return ``(west, south, east, north)`` of the covered cells, or None."""
+    lats, lons = np.nonzero(rgba[..., 3])
+    if not lats.size:
+        return None
+    return (
+        int(lons.min()) - 180,
+        int(lats.min()) - 90,
+        int(lons.max()) - 179,
+        int(lats.max()) - 89,
+    )
+
+
+def write_if_changed(path, data):
+    """Write ``data`` to ``path`` unless it already holds exactly that.
+
+    Returns True if the file was written.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+    return True
+
+
+# Set in each pool worker by _init_worker.
+_worker_rgba = None
+
+
+def _init_worker(rgba):
+    global _worker_rgba
+    _worker_rgba = rgba
+
+
+def render_column(output_dir, z, x, y0, y1, outlines=True):
+    """Render tiles ``y0..y1`` of column ``x``; returns counts and tiles kept."""
+    counts = {"written": 0, "unchanged": 0, "removed": 0}
+    kept = []
+    column_dir = os.path.join(output_dir, str(z), str(x))
+    for y in range(y0, y1 + 1):
+        path = os.path.join(column_dir, f"{y}.png")
+        image = render_tile(_worker_rgba, z, x, y, outlines)
+        if image is None:
+            if os.path.exists(path):
+                os.remove(path)
+                counts["removed"] += 1
+            continue
+        os.makedirs(column_dir, exist_ok=True)
+        if write_if_changed(path, encode_png(image)):
+            counts["written"] += 1
+        else:
+            counts["unchanged"] += 1
+        kept.append((z, x, y))
+    return counts, kept
+
+
+def remove_stale_tiles(output_dir, kept):
+    """Remove tiles under ``output_dir`` that are not in ``kept``.
+
+    Every ``{z}`` directory is looked at, so the tiles of zoom levels an
+    earlier run rendered outside the current range go too.
+    """
+    removed = 0
+    for z_name in os.listdir(output_dir):
+        zoom_dir = os.path.join(output_dir, z_name)
+        if not z_name.isdigit() or not os.path.isdir(zoom_dir):
+            continue
+        z = int(z_name)
+        for x_name in os.listdir(zoom_dir):
+            column_dir = os.path.join(zoom_dir, x_name)
+            if not x_name.isdigit() or not os.path.isdir(column_dir):
+                continue
+            for name in os.listdir(column_dir):
+                y_name, ext = os.path.splitext(name)
+                if ext != ".png" or not y_name.isdigit():
+                    continue
+                if (z, int(x_name), int(y_name)) not in kept:
+                    os.remove(os.path.join(column_dir, name))
+                    removed += 1
+            if not os.listdir(column_dir):
+                os.rmdir(column_dir)
+        if not os.listdir(zoom_dir):
+            os.rmdir(zoom_dir)
+    return removed
+
+
+def build_pyramid(
+    coverage, output_dir, min_zoom=0, max_zoom=7, jobs=None, outlines=True
+):
+    """Render the tile pyramid of ``coverage`` into ``output_dir``.
+
+    Returns a dict of written, unchanged and removed tile counts.
+    """
+    if not 0 <= min_zoom <= max_zoom:
+        raise ValueError(f"Invalid zoom range {min_zoom}-{max_zoom}")
+    rgba = np.rint(composite_levels(coverage, level_colors(coverage)) * 255).astype(
+        np.uint8
+    )
+    zooms = range(min_zoom, max_zoom + 1)
+    bounds = coverage_bounds(rgba)
+
+    work = []
+    if bounds:
+        for z in zooms:
+            x0, x1, y0, y1 = tile_range(bounds, z)
+            work.extend((z, x, y0, y1) for x in range(x0, x1 + 1))
+
+    os.makedirs(output_dir, exist_ok=True)
+    totals = {"written": 0, "unchanged": 0, "removed": 0}
+    kept = set()
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(rgba,)
+    ) as executor:
+        futures = [
+            executor.submit(render_column, output_dir, z, x, y0, y1, outlines)
+            for z, x, y0, y1 in work
+        ]
+        for future in futures:
+            counts, tiles = future.result()
+            for name, value in counts.items():
+                totals[name] += value
+            kept.update(tiles)
+    totals["removed"] += remove_stale_tiles(output_dir, kept)
+
+    tilejson = {
+        "tilejson": "2.2.0",
+        "name": "DTED coverage",
+        "tiles": ["{z}/{x}/{y}.png"],
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": list(bounds) if bounds else [-180, -85, 180, 85],
+    }
+    write_if_changed(
+        os.path.join(output_dir, "tiles.json"),
+        (json.dumps(tilejson, indent=2) + "\n").encode("ascii"),
+    )
+    return totals
+
+
+def add_arguments(parser):
+    """Add the tile pyramid options shared by the command line tools."""
+    parser.add_argument(
+        "--min-zoom", type=int, default=0, help="Lowest zoom level (default: 0)"
+    )
+    parser.add_argument(
+        "--max-zoom", type=int, default=7, help="Highest zoom level (default: 7)"
+    )
+    parser.add_argument(
+        "--tile-jobs",
+        type=int,
+        default=0,
+        help="Processes rendering tiles (default: 0, one per CPU)",
+    )
+
+
+def format_totals(totals, output_dir, seconds):
+    return (
+        f"Tiles in {output_dir}: {totals['written']} written, "
+        f"{totals['unchanged']} unchanged, {totals['removed']} removed "
+        f"in {seconds:.2f}s"
+    )
+
+
+def main():
+    import argparse
+    import time
+
+    from coverage_filter import filter_coverage, parse_region
+    from coverage_loader import load_coverage
+
+    parser = argparse.ArgumentParser(
+        description="Render DTED coverage into a z/x/y PNG tile pyramid."
+    )
+    parser.add_argument(
+        "source", help="Directory of DTED tiles, index.zip/index.bin or a DTED zip"
+    )
+    parser.add_argument("output_dir", help="Directory for {z}/{x}/{y}.png tiles")
+    parser.add_argument(
+        "--region",
+        "-r",
+        help="Quadrant, min_lon,min_lat,max_lon,max_lat or GeoJSON; attach "
+        "boxes with a negative longitude: --region=-125,32,-114,42",
+    )
+    parser.add_argument(
+        "--no-outlines", action="store_true", help="Do not outline the covered cells"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        coverage = load_coverage(args.source)
+        if args.region:
+            coverage = filter_coverage(coverage, parse_region(args.region))
+    except (ValueError, OSError) as e:
+        print(f"Error loading coverage - {e}")
+        return 1
+
+    start = time.perf_counter()
+    totals = build_pyramid(
+        coverage,
+        args.output_dir,
+        args.min_zoom,
+        args.max_zoom,
+        args.tile_jobs or None,
+        not args.no_outlines,
+    )
+    print(format_totals(totals, args.output_dir, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
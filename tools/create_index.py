@@ -1,34 +1,159 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
+import json
 import os
-import zipfile
+import shutil
+import stat
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from binary_index import write_binary_index
+from build_stats import BuildStats, ProgressReporter, write_report
+from coverage_grid import CoverageGrid, format_index, parse_index
+from dted_reader import DTEDError, parse_tile_name, validate_tile
+from zip_engine import ZipCompressor, zip_file
+import zip_engine
 
-def zip_file(input_file, output_file):
-    try:
-        with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as zf:
-            zf.write(input_file, os.path.basename(input_file))
-        return output_file
-    except Exception as e:
-        print(f"Error zipping the file: {input_file} - {e}")
-        if os.path.exists(output_file):
-            try:
+DTED_EXTENSIONS = (".dt0", ".dt1", ".dt2", ".dt3")
+ZIPPED_EXTENSIONS = tuple(f"{ext}.zip" for ext in DTED_EXTENSIONS)
+
+MANIFEST_VERSION = 1
+
+# 0 prints errors and the run summary, 1 adds a line per tile and 2 adds the
+# per-tile index debugging output. Set per process by set_verbosity().
+verbosity = 0
+
+
+def set_verbosity(level):
+    global verbosity
+    verbosity = level
+
+
+def log(level, message):
+    if verbosity >= level:
+        print(message)
+
+
+# Ways of staging an already-compressed tile into the output tree, cheapest
+# first. "auto" walks this list and uses the first one the filesystem accepts.
+COPY_METHODS = ("hardlink", "reflink", "copy_file_range", "sendfile", "chunked")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Linux FICLONE ioctl request number, _IOW(0x94, 9, int).
+FICLONE = 0x40049409
+
+# (method, src device, dst device) combinations that already failed, so
+# "auto" does not retry an unsupported syscall for every tile.
+_unsupported_methods = set()
+
+
+def _copy_hardlink(src, dst):
+    os.link(src, dst)
+
+
+def _copy_reflink(src, dst):
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _copy_file_range(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(
+                fsrc.fileno(), fdst.fileno(), min(remaining, 1 << 30)
+            )
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def _copy_sendfile(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        offset = 0
+        size = os.fstat(fsrc.fileno()).st_size
+        while offset < size:
+            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+
+def _copy_chunked(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+
+
+_COPY_FUNCTIONS = {
+    "hardlink": _copy_hardlink,
+    "reflink": _copy_reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile": _copy_sendfile,
+    "chunked": _copy_chunked,
+}
+
+
+def copy_method_available(method):
+    if method == "reflink":
+        return os.name == "posix" and os.uname().sysname == "Linux"
+    if method == "copy_file_range":
+        return hasattr(os, "copy_file_range")
+    if method == "sendfile":
+        return hasattr(os, "sendfile")
+    return method in _COPY_FUNCTIONS
+
+
+def stage_file(input_file, output_file, method="auto"):
+    """Copy ``input_file`` to ``output_file`` without buffering it in Python.
+
+    With ``method="auto"`` each entry of COPY_METHODS is tried in turn until
+    one succeeds; otherwise only the named method is used and its error is
+    raised. Returns the name of the method that staged the file.
+    """
+    # Never open an existing output for writing, it may be a hardlink to an
+    # input tile from an earlier build.
+    if os.path.lexists(output_file):
+        os.remove(output_file)
+
+    if method != "auto":
+        if method not in _COPY_FUNCTIONS:
+            raise ValueError(f"Unknown copy method: {method}")
+        try:
+            _COPY_FUNCTIONS[method](input_file, output_file)
+        except OSError:
+            if os.path.lexists(output_file):
                 os.remove(output_file)
-            except Exception as delete_error:
-                print(
-                    f"Failed to delete the output file {output_file} - {delete_error}"
-                )
-        return None
+            raise
+        return method
+
+    devices = (
+        os.stat(input_file).st_dev,
+        os.stat(os.path.dirname(output_file) or ".").st_dev,
+    )
+    for candidate in COPY_METHODS:
+        key = (candidate,) + devices
+        if key in _unsupported_methods or not copy_method_available(candidate):
+            continue
+        try:
+            _COPY_FUNCTIONS[candidate](input_file, output_file)
+            return candidate
+        except OSError:
+            if candidate == "chunked":
+                raise
+            _unsupported_methods.add(key)
+            if os.path.lexists(output_file):
+                os.remove(output_file)
+    raise OSError(f"No copy method could stage {input_file}")
 
 
 def write(filename, version, data):
     try:
-        with open(filename, "w") as output_writer:
-            output_writer.write(f"{version}\n")
-            output_writer.write(f"{int(time.time() * 1000)}\n")
-            for row in data:
-                output_writer.write("".join(map(str, row)) + "\n")
+        with open(filename, "wb") as output_writer:
+            output_writer.write(format_index(version, int(time.time() * 1000), data))
     except Exception as e:
         print(f"Error writing to file {filename} - {e}")
 
@@ -54,12 +179,11 @@ def visualize_index(index_file):
 
 def validate_index_file(index_file):
     try:
-        with open(index_file, "r") as f:
-            lines = f.readlines()
+        with open(index_file, "rb") as f:
+            version, timestamp, body = f.read().split(b"\n", 2)
 
-        version = lines[0].strip()
-        timestamp = lines[1].strip()
-        data = lines[2:]
+        version = version.strip().decode("ascii")
+        timestamp = timestamp.strip().decode("ascii")
 
         if not version.isdigit():
             print(f"Invalid version number: {version}")
@@ -69,10 +193,11 @@ def validate_index_file(index_file):
             print(f"Invalid timestamp: {timestamp}")
             return False
 
-        for row in data:
-            if len(row.strip()) != 360:
-                print(f"Invalid row length: {len(row.strip())}")
-                return False
+        try:
+            CoverageGrid.from_text(body)
+        except ValueError as e:
+            print(f"Invalid index data: {e}")
+            return False
 
         print("Index file is valid.")
         return True
@@ -83,18 +208,8 @@ def validate_index_file(index_file):
 
 def read_index_file(index_file):
     try:
-        with open(index_file, "r") as f:
-            lines = f.readlines()
-
-        version = lines[0].strip()
-        timestamp = lines[1].strip()
-        data = lines[2:]
-
-        world_data = []
-        for row in data:
-            world_data.append(list(map(int, row.strip())))
-
-        return version, timestamp, world_data
+        with open(index_file, "rb") as f:
+            return parse_index(f.read())
     except Exception as e:
         print(f"Error reading index file {index_file} - {e}")
         return None, None, None
@@ -102,146 +217,556 @@ def read_index_file(index_file):
 
 def write_index_file(index_file, version, timestamp, world_data):
     try:
-        with open(index_file, "w") as f:
-            f.write(f"{version}\n")
-            f.write(f"{timestamp}\n")
-            for row in world_data:
-                f.write("".join(map(str, row)) + "\n")
+        with open(index_file, "wb") as f:
+            f.write(format_index(version, timestamp, world_data))
     except Exception as e:
         print(f"Error writing index file {index_file} - {e}")
         return False
     return True
 
 
-def main(input_dir, output_dir):
-    if not os.path.exists(input_dir):
-        print(f"Input directory does not exist: {input_dir}")
-        return
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    if os.path.exists(output_dir):
-        print(f"Output directory cannot exist, please remove: {output_dir}")
-        return
 
+def read_manifest(manifest_file):
+    if not os.path.exists(manifest_file):
+        return {}
     try:
-        os.makedirs(output_dir)
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
     except Exception as e:
-        print(f"Output directory cannot be created: {output_dir} - {e}")
-        return
+        print(f"Error reading manifest {manifest_file}, rebuilding all tiles - {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Manifest {manifest_file} has an unknown version, rebuilding all tiles")
+        return {}
+    return manifest["tiles"]
+
+
+def write_manifest(manifest_file, tiles):
+    manifest = {"version": MANIFEST_VERSION, "tiles": tiles}
+    tmp_file = f"{manifest_file}.tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, manifest_file)
+    except Exception as e:
+        print(f"Error writing manifest {manifest_file} - {e}")
+        return False
+    return True
 
-    world = [[0 for _ in range(180)] for _ in range(360)]
 
+def scan_changes(input_dir, output_dir, tiles, stats=None):
+    """Compare the input tiles against the manifest ``tiles``.
+
+    Size and mtime are checked first; a tile is only hashed when they differ,
+    so a touched but unmodified tile is not reprocessed. Returns a dict of
+    longitude directory name to the tile names that need processing, the
+    manifest paths of tiles that no longer exist in the input, and a dict of
+    longitude directory name to the processed tiles whose recorded content
+    changed, so their zips are rebuilt even when newer than the tile.
+    """
+    if stats is None:
+        stats = BuildStats()
+    changed = {}
+    rebuild = {}
+    seen = set()
     for ew_name in os.listdir(input_dir):
         ew_path = os.path.join(input_dir, ew_name)
-        if not os.path.isdir(ew_path):
+        if not ew_name.lower().startswith(("w", "e")) or not os.path.isdir(ew_path):
             continue
 
-        if ew_name.lower().startswith(("w", "e")):
-            ew_out = os.path.join(output_dir, ew_name)
-            try:
-                os.makedirs(ew_out)
-            except Exception as e:
-                print(f"Output directory cannot be created: {ew_out} - {e}")
-                return
+        for ns_name in os.listdir(ew_path):
+            if not ns_name.lower().endswith(DTED_EXTENSIONS + ZIPPED_EXTENSIONS):
+                continue
+            ns_path = os.path.join(ew_path, ns_name)
+            st = os.stat(ns_path)
+            if not stat.S_ISREG(st.st_mode):
+                continue
+
+            path = f"{ew_name}/{ns_name}"
+            seen.add(path)
+            stats.add("tiles_seen")
+            record = tiles.get(path)
+            if record and os.path.exists(os.path.join(output_dir, record["output"])):
+                if (
+                    record["size"] == st.st_size
+                    and record["mtime_ns"] == st.st_mtime_ns
+                ):
+                    stats.add("tiles_unchanged")
+                    continue
+                if record["size"] == st.st_size:
+                    with stats.timer("hash"):
+                        digest = hash_file(ns_path)
+                    if record["sha256"] == digest:
+                        record["mtime_ns"] = st.st_mtime_ns
+                        stats.add("tiles_unchanged")
+                        continue
+            changed.setdefault(ew_name, []).append(ns_name)
+            if record:
+                rebuild.setdefault(ew_name, set()).add(ns_name)
 
-            index_html = os.path.join(ew_out, "index.html")
-            try:
-                with open(index_html, "w") as f:
-                    pass
-            except Exception as e:
-                print(
-                    f"Output dir listing blocker cannot be created: {index_html} - {e}"
-                )
-                return
+    removed = [path for path in tiles if path not in seen]
+    return changed, removed, rebuild
 
-            try:
-                ew = int("".join(filter(str.isdigit, ew_name)))
-                if ew_name.lower().startswith("w"):
-                    ew *= -1
 
-                for ns_name in os.listdir(ew_path):
-                    ns_path = os.path.join(ew_path, ns_name)
-                    if not os.path.isfile(ns_path):
-                        continue
+def remove_output(output_dir, record):
+    """Delete the output file of a manifest ``record``."""
+    ns_out = os.path.join(output_dir, record["output"])
+    try:
+        if os.path.exists(ns_out):
+            os.remove(ns_out)
+    except Exception as e:
+        print(f"Error removing stale output file {ns_out} - {e}")
 
-                    ns_name = ns_name.lower()
-                    if ns_name.endswith((".dt0", ".dt1", ".dt2", ".dt3")):
-                        print(
-                            f"Encountered uncompressed elevation file: {ns_name} compressing..."
-                        )
-                        ns_out = os.path.join(ew_out, f"{ns_name}.zip")
-                        if not zip_file(ns_path, ns_out):
-                            continue
-                        ns_name = os.path.basename(ns_out)
-                    elif ns_name.endswith(
-                        (".dt0.zip", ".dt1.zip", ".dt2.zip", ".dt3.zip")
-                    ):
-                        ns_out = os.path.join(ew_out, ns_name)
-                        try:
-                            with open(ns_path, "rb") as src, open(ns_out, "wb") as dst:
-                                dst.write(src.read())
-                        except Exception as e:
-                            print(f"Error copying file {ns_path} to {ns_out} - {e}")
-                            continue
-                    else:
-                        print(
-                            f"Encountered unrecognized elevation file {ns_name} skipping..."
-                        )
-                        continue
 
+def remove_ew_output(output_dir, ew_name):
+    """Delete the output directory of a longitude directory that is gone.
+
+    Only its index.html is removed along with it; anything else left in the
+    directory keeps it in place.
+    """
+    ew_out = os.path.join(output_dir, ew_name)
+    try:
+        index_html = os.path.join(ew_out, "index.html")
+        if os.path.exists(index_html):
+            os.remove(index_html)
+        os.rmdir(ew_out)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error removing stale output directory {ew_out} - {e}")
+
+
+def process_ew_dir(
+    input_dir,
+    output_dir,
+    ew_name,
+    copy_method="auto",
+    ns_names=None,
+    hash_tiles=False,
+    validate=False,
+    compression=None,
+    rebuild=(),
+):
+    """Stage the tiles of one longitude directory and return their coverage.
+
+    Only ``ns_names`` are staged if given, otherwise every tile in the
+    directory. With ``validate`` each tile's headers and record checksums are
+    checked first and invalid tiles are neither staged nor indexed. Raw tiles
+    are compressed on a ZipCompressor built from the ``compression`` options;
+    a zip newer than its tile is reused unless the tile is in ``rebuild``.
+
+    Returns the tile records (the manifest entries, keyed by ``path``) and
+    the BuildStats of the directory. The records are an empty list if
+    ``ew_name`` is not a longitude directory, or None if the output could not
+    be created.
+    """
+    stats = BuildStats()
+    ew_path = os.path.join(input_dir, ew_name)
+    if not os.path.isdir(ew_path):
+        return [], stats
+
+    if not ew_name.lower().startswith(("w", "e")):
+        return [], stats
+
+    records = []
+    ew_out = os.path.join(output_dir, ew_name)
+    try:
+        os.makedirs(ew_out, exist_ok=True)
+    except Exception as e:
+        print(f"Output directory cannot be created: {ew_out} - {e}")
+        return None, stats
+
+    index_html = os.path.join(ew_out, "index.html")
+    try:
+        with open(index_html, "w") as f:
+            pass
+    except Exception as e:
+        print(f"Output dir listing blocker cannot be created: {index_html} - {e}")
+        return None, stats
+
+    compressor = ZipCompressor(**(compression or {}))
+    staged = []
+    try:
+        ew = int("".join(filter(str.isdigit, ew_name)))
+        if ew_name.lower().startswith("w"):
+            ew *= -1
+
+        # An incremental build passes ns_names and has already counted the
+        # tiles it looked at in scan_changes().
+        count_seen = ns_names is None
+        if ns_names is None:
+            with stats.timer("scan"):
+                ns_names = os.listdir(ew_path)
+
+        for input_name in ns_names:
+            ns_path = os.path.join(ew_path, input_name)
+            st = os.stat(ns_path)
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if count_seen:
+                stats.add("tiles_seen")
+
+            ns_name = input_name.lower()
+            if validate and ns_name.endswith(DTED_EXTENSIONS + ZIPPED_EXTENSIONS):
+                with stats.timer("validate"):
                     try:
-                        ns = int("".join(filter(str.isdigit, ns_name.split(".")[0])))
-                        print(f"Processing file: {ns_name}, parsed ns value: {ns}")
-                        if ns_name.startswith("s"):
-                            ns *= -1
-
-                        mask = 0
-                        if "dt3" in ns_name:
-                            mask = 4
-                        elif "dt2" in ns_name:
-                            mask = 2
-                        elif "dt1" in ns_name:
-                            mask = 1
-
-                        # Debugging logs
-                        print(f"ew: {ew}, ns: {ns}, mask: {mask}")
-                        print(
-                            f"Index in world array: ew + 180 = {ew + 180}, ns + 90 = {ns + 90}"
+                        problems = validate_tile(
+                            ns_path, *parse_tile_name(ew_name, input_name)
                         )
+                    except DTEDError as e:
+                        problems = [str(e)]
+                if problems:
+                    print(f"Invalid elevation file {ns_path}: {'; '.join(problems)}")
+                    stats.add("tiles_invalid")
+                    continue
+
+            if ns_name.endswith(DTED_EXTENSIONS):
+                log(
+                    1,
+                    f"Encountered uncompressed elevation file: {ns_name} compressing...",
+                )
+                ns_out = os.path.join(ew_out, f"{ns_name}.zip")
+                # A tile whose recorded content changed has a stale zip even
+                # if the zip is newer (say, after a touch -d); a tile without
+                # a record, as on a first incremental run, may reuse its zip.
+                future = compressor.submit(ns_path, ns_out, force=input_name in rebuild)
+                staged.append((input_name, st, ns_path, f"{ns_name}.zip", future))
+            elif ns_name.endswith(ZIPPED_EXTENSIONS):
+                ns_out = os.path.join(ew_out, ns_name)
+                try:
+                    with stats.timer("stage"):
+                        stage_file(ns_path, ns_out, copy_method)
+                except Exception as e:
+                    print(f"Error copying file {ns_path} to {ns_out} - {e}")
+                    stats.add("tiles_skipped")
+                    continue
+                stats.add("tiles_copied")
+                stats.add("bytes_in", st.st_size)
+                stats.add("bytes_out", st.st_size)
+                staged.append((input_name, st, ns_path, ns_name, None))
+            else:
+                log(1, f"Encountered unrecognized elevation file {ns_name} skipping...")
+                stats.add("tiles_skipped")
+                continue
+
+        # Raw tiles were queued on the compressor above; collect them in
+        # listing order so the records match a serial run.
+        for input_name, st, ns_path, ns_name, future in staged:
+            if future is not None:
+                result = future.result()
+                if not result.ok:
+                    stats.add("tiles_skipped")
+                    continue
+                if result.reused:
+                    stats.add("zips_reused")
+                else:
+                    stats.add("tiles_zipped")
+                    stats.add("bytes_in", result.input_bytes)
+                    stats.add("bytes_out", result.output_bytes)
+                    stats.add("compress_bytes_in", result.input_bytes)
+                    stats.add("compress_bytes_out", result.output_bytes)
+                    stats.add_time("compress", result.seconds)
 
-                        # Validate indices
-                        if not (0 <= ew + 180 < 360) or not (0 <= ns + 90 < 180):
-                            print(
-                                f"Skipping out-of-bounds indices for ew: {ew}, ns: {ns}"
-                            )
-                            continue
-
-                        world[ew + 180][ns + 90] |= mask
-                    except Exception as e:
-                        print(f"Error parsing file {ns_name} - {e}")
-                        raise
+            try:
+                ns = int("".join(filter(str.isdigit, ns_name.split(".")[0])))
+                log(1, f"Processing file: {ns_name}, parsed ns value: {ns}")
+                if ns_name.startswith("s"):
+                    ns *= -1
+
+                mask = 0
+                if "dt3" in ns_name:
+                    mask = 4
+                elif "dt2" in ns_name:
+                    mask = 2
+                elif "dt1" in ns_name:
+                    mask = 1
+
+                # Debugging logs
+                log(2, f"ew: {ew}, ns: {ns}, mask: {mask}")
+                log(
+                    2,
+                    f"Index in world array: ew + 180 = {ew + 180}, ns + 90 = {ns + 90}",
+                )
+
+                # Validate indices
+                if not (0 <= ew + 180 < 360) or not (0 <= ns + 90 < 180):
+                    print(f"Skipping out-of-bounds indices for ew: {ew}, ns: {ns}")
+                    stats.add("tiles_skipped")
+                    continue
+
+                record = {
+                    "path": f"{ew_name}/{input_name}",
+                    "output": f"{ew_name}/{ns_name}",
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "ew": ew,
+                    "ns": ns,
+                    "mask": mask,
+                }
+                if hash_tiles:
+                    with stats.timer("hash"):
+                        record["sha256"] = hash_file(ns_path)
+                records.append(record)
             except Exception as e:
-                print(f"Error processing directory {ew_name} - {e}")
+                print(f"Error parsing file {ns_name} - {e}")
                 raise
+    except Exception as e:
+        print(f"Error processing directory {ew_name} - {e}")
+        raise
+    finally:
+        compressor.shutdown()
+
+    return records, stats
+
+
+def main(
+    input_dir,
+    output_dir,
+    jobs=1,
+    copy_method="auto",
+    incremental=False,
+    manifest_file=None,
+    report_file=None,
+    progress_interval=5.0,
+    validate=False,
+    compression=None,
+):
+    start = time.perf_counter()
+    stats = BuildStats()
+    progress = ProgressReporter(progress_interval)
+
+    if not os.path.exists(input_dir):
+        print(f"Input directory does not exist: {input_dir}")
+        return
+
+    if os.path.exists(output_dir) and not incremental:
+        print(f"Output directory cannot exist, please remove: {output_dir}")
+        return
+
+    try:
+        os.makedirs(output_dir, exist_ok=incremental)
+    except Exception as e:
+        print(f"Output directory cannot be created: {output_dir} - {e}")
+        return
+
+    # The manifest sits next to the output directory so it is not served.
+    if manifest_file is None:
+        manifest_file = os.path.normpath(output_dir) + ".manifest.json"
+
+    tiles = {}
+    if incremental:
+        tiles = read_manifest(manifest_file)
+        with stats.timer("scan"):
+            changed, removed, rebuild = scan_changes(
+                input_dir, output_dir, tiles, stats
+            )
+        print(
+            f"Incremental build: {sum(map(len, changed.values()))} tiles to "
+            f"process, {len(removed)} removed, {len(tiles) - len(removed)} known"
+        )
+        for path in removed:
+            remove_output(output_dir, tiles.pop(path))
+            stats.add("tiles_removed")
+        for ew_name in {path.split("/")[0] for path in removed}:
+            if not os.path.isdir(os.path.join(input_dir, ew_name)):
+                remove_ew_output(output_dir, ew_name)
+        # The records of the tiles being processed are replaced by what
+        # process_ew_dir() returns; a tile it leaves out, say one failing
+        # --validate, must not stay indexed with its old output.
+        replaced = {
+            path: tiles.pop(path)
+            for ew_name, ns_names in changed.items()
+            for path in (f"{ew_name}/{ns_name}" for ns_name in ns_names)
+            if path in tiles
+        }
+        work = [
+            (ew_name, ns_names, rebuild.get(ew_name, set()))
+            for ew_name, ns_names in changed.items()
+        ]
+    else:
+        work = [(ew_name, None, set()) for ew_name in os.listdir(input_dir)]
+
+    if jobs > 1:
+        # Longitude directories are independent, so each worker stages one and
+        # hands back its tile records; the world grid is only built here.
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=set_verbosity, initargs=(verbosity,)
+        )
+        futures = [
+            executor.submit(
+                process_ew_dir,
+                input_dir,
+                output_dir,
+                ew_name,
+                copy_method,
+                ns_names,
+                incremental,
+                validate,
+                compression,
+                rebuild,
+            )
+            for ew_name, ns_names, rebuild in work
+        ]
+        results = (future.result() for future in as_completed(futures))
+    else:
+        executor = None
+        results = (
+            process_ew_dir(
+                input_dir,
+                output_dir,
+                ew_name,
+                copy_method,
+                ns_names,
+                incremental,
+                validate,
+                compression,
+                rebuild,
+            )
+            for ew_name, ns_names, rebuild in work
+        )
+
+    try:
+        for done, (records, dir_stats) in enumerate(results, 1):
+            stats.merge(dir_stats)
+            if records is None:
+                return
+            for record in records:
+                tiles[record["path"]] = record
+            progress.update(stats, done, len(work))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if incremental:
+        for path, record in replaced.items():
+            if path not in tiles:
+                remove_output(output_dir, record)
+                stats.add("tiles_removed")
+
+    world = CoverageGrid()
+    if tiles:
+        world.mark(
+            *zip(*((tile["ew"], tile["ns"], tile["mask"]) for tile in tiles.values()))
+        )
+
     try:
         pre_index = os.path.join(output_dir, "index")
         zipped_index = os.path.join(output_dir, "index.zip")
-        write(pre_index, 1, world)
-        zip_file(pre_index, zipped_index)
-        os.remove(pre_index)
+        binary_index = os.path.join(output_dir, "index.bin")
+        timestamp = int(time.time() * 1000)
+        with stats.timer("index"):
+            write_index_file(pre_index, 1, timestamp, world)
+            zip_file(pre_index, zipped_index)
+            os.remove(pre_index)
+            write_binary_index(binary_index, 1, world, timestamp)
     except Exception as e:
         print(f"Error occurred writing file: {e}")
 
+    if incremental:
+        write_manifest(manifest_file, tiles)
+
+    wall_time = time.perf_counter() - start
     print(f"Constructed the layout for the server at: {output_dir}")
+    print(f"Build finished in {wall_time:.2f}s: {stats.summary()}")
+    if stats.counters["tiles_zipped"]:
+        print(stats.compression_summary())
+
+    if report_file:
+        write_report(
+            report_file,
+            stats,
+            wall_time,
+            input_dir=input_dir,
+            output_dir=output_dir,
+            jobs=jobs,
+            copy_method=copy_method,
+            incremental=incremental,
+            validate=validate,
+            compression=compression,
+            tiles=len(tiles),
+        )
 
 
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) < 3:
-        print(
-            "Usage:\n"
-            "  python create_index.py [input directory] [output directory]\n\n"
-            "The input directory must follow the required structure as described in the documentation."
-        )
-    else:
-        main(sys.argv[1], sys.argv[2])
+    parser = argparse.ArgumentParser(
+        description="Construct the DTED server layout and index.",
+        epilog="The input directory must follow the required structure as "
+        "described in the documentation.",
+    )
+    parser.add_argument("input_dir", help="Input directory, e.g. w115/n32.dt2")
+    parser.add_argument(
+        "output_dir", help="Output directory, must not exist unless --incremental"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes for staging longitude directories "
+        "(default: 1, 0 for one per CPU)",
+    )
+    parser.add_argument(
+        "--copy-method",
+        choices=("auto",) + COPY_METHODS,
+        default="auto",
+        help="How already-compressed tiles are staged into the output directory "
+        "(default: auto, the cheapest method the filesystem supports)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse an existing output directory and only process tiles that "
+        "were added, changed or removed since the last incremental build",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Tile manifest used by --incremental "
+        "(default: <output_dir>.manifest.json)",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Check each tile's DTED headers and record checksums, and leave "
+        "out tiles that fail",
+    )
+    zip_engine.add_arguments(parser)
+    parser.add_argument(
+        "--report",
+        help="Write a JSON report of the run counters and stage timings to this file",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between progress lines (default: 5, 0 to disable)",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="count",
+        default=0,
+        help="Print a line per tile (-v) and index debugging output (-vv)",
+    )
+    args = parser.parse_args()
+
+    set_verbosity(args.verbose)
+    jobs = args.jobs or os.cpu_count() or 1
+    main(
+        args.input_dir,
+        args.output_dir,
+        jobs,
+        args.copy_method,
+        args.incremental,
+        args.manifest,
+        args.report,
+        args.progress_interval,
+        args.validate,
+        zip_engine.options_from_args(args, jobs),
+    )
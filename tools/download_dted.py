@@ -14,92 +14,47 @@
 #       Additional details can be found here: https://www.usgs.gov/media/files/m2m-application-token-documentation
 
 import json
-import requests
 import sys
 import time
 import argparse
 import datetime
-import threading
-import re
+
+import requests
+
+import download_poller
+import download_scheduler
+import m2m_client
 
 path = ""  # Fill a valid path to save the downloaded files
 maxthreads = 5  # Threads count for downloads
-sema = threading.Semaphore(value=maxthreads)
 label = datetime.datetime.now().strftime(
     "%Y%m%d_%H%M%S"
 )  # Customized label using date time
-threads = []
 
 
-# send http request
-def sendRequest(url, data, apiKey=None):
-    pos = url.rfind("/") + 1
-    endpoint = url[pos:]
+# send a request through the shared client, which sends the API key once
+# logged in
+def sendRequest(endpoint, data=None):
     json_data = json.dumps(data)
-
-    if apiKey == None:
-        response = requests.post(url, json_data)
-    else:
-        headers = {"X-Auth-Token": apiKey}
-        response = requests.post(url, json_data, headers=headers)
-
     try:
-        httpStatusCode = response.status_code
-        if response == None:
-            print("No output from service")
-            sys.exit()
-        output = json.loads(response.text)
-        if output["errorCode"] != None:
-            print("Failed Request ID", output["requestId"])
-            print(output["errorCode"], "-", output["errorMessage"])
-            print(url)
-            print(json_data)
-            sys.exit()
-        if httpStatusCode == 404:
-            print("404 Not Found")
-            sys.exit()
-        elif httpStatusCode == 401:
-            print("401 Unauthorized")
-            sys.exit()
-        elif httpStatusCode == 400:
-            print("Error Code", httpStatusCode)
-            sys.exit()
-    except Exception as e:
-        response.close()
-        pos = serviceUrl.find("api")
+        output = client.post(endpoint, data)
+    except m2m_client.M2MError as e:
+        print("Failed Request ID", e.request_id)
+        print(e)
+        print(json_data)
+        sys.exit()
+    except requests.HTTPError as e:
+        print(e.response.status_code, e.response.reason)
+        sys.exit()
+    except (requests.RequestException, ValueError):
+        pos = client.api_url.find("api")
         print(
-            f"Failed to parse request {endpoint} response. Re-check the input {json_data}. The input examples can be found at {url[:pos]}api/docs/reference/#{endpoint}\n"
+            f"Failed to parse request {endpoint} response. Re-check the input {json_data}. The input examples can be found at {client.api_url[:pos]}api/docs/reference/#{endpoint}\n"
         )
         sys.exit()
-    response.close()
-    print(f"Finished request {endpoint} with request ID {output['requestId']}\n")
+    print(f"Finished request {endpoint} with request ID {client.request_id}\n")
 
-    return output["data"]
-
-
-def downloadFile(url):
-    sema.acquire()
-    global path
-    try:
-        response = requests.get(url, stream=True)
-        disposition = response.headers["content-disposition"]
-        filename = re.findall("filename=(.+)", disposition)[0].strip('"')
-        print(f"Downloading {filename} ...\n")
-        if path != "" and path[-1] != "/":
-            filename = "/" + filename
-        open(path + filename, "wb").write(response.content)
-        print(f"Downloaded {filename}\n")
-        sema.release()
-    except Exception as e:
-        print(f"Failed to download from {url}. {e}. Will try to re-download.")
-        sema.release()
-        runDownload(threads, url)
-
-
-def runDownload(threads, url):
-    thread = threading.Thread(target=downloadFile, args=(url,))
-    threads.append(thread)
-    thread.start()
+    return output
 
 
 if __name__ == "__main__":
@@ -112,6 +67,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-u", "--username", required=True, help="ERS Username")
     parser.add_argument("-t", "--token", required=True, help="ERS application token")
+    download_scheduler.add_arguments(parser, workers=maxthreads)
+    download_poller.add_arguments(parser)
+    m2m_client.add_arguments(parser)
 
     args = parser.parse_args()
 
@@ -122,10 +80,25 @@ if __name__ == "__main__":
 
     serviceUrl = "https://m2m.cr.usgs.gov/api/api/json/stable/"
 
-    # login-token
-    payload = {"username": username, "token": token}
+    # API calls and downloads reuse the connections of one session.
+    client = m2m_client.client_from_args(args, serviceUrl, args.workers)
+
+    # Downloads run on a fixed worker pool, or an asyncio event loop with
+    # --engine async; failures are retried with backoff and resume from their
+    # .part files.
+    scheduler = download_scheduler.scheduler_from_args(
+        args, path or ".", client.download
+    )
+
+    # Products still being prepared are polled with an adaptive interval.
+    poller = download_poller.poller_from_args(args)
 
-    apiKey = sendRequest(serviceUrl + "login-token", payload)
+    # login-token; the client sends the API key with every later request
+    try:
+        apiKey = client.login_token(username, token)
+    except (m2m_client.M2MError, requests.RequestException) as e:
+        print(f"Login failed: {e}")
+        sys.exit()
 
     print("API Key: " + apiKey + "\n")
 
@@ -146,7 +119,7 @@ if __name__ == "__main__":
     }
 
     print("Searching datasets...\n")
-    datasets = sendRequest(serviceUrl + "dataset-search", payload, apiKey)
+    datasets = sendRequest("dataset-search", payload)
 
     print("Found ", len(datasets), " datasets\n")
 
@@ -178,7 +151,7 @@ if __name__ == "__main__":
         # Now I need to run a scene search to find data to download
         print("Searching scenes...\n\n")
 
-        scenes = sendRequest(serviceUrl + "scene-search", payload, apiKey)
+        scenes = sendRequest("scene-search", payload)
 
         # Did we find anything?
         if scenes["recordsReturned"] > 0:
@@ -192,9 +165,7 @@ if __name__ == "__main__":
             # NOTE :: Remember the scene list cannot exceed 50,000 items!
             payload = {"datasetName": dataset["datasetAlias"], "entityIds": sceneIds}
 
-            downloadOptions = sendRequest(
-                serviceUrl + "download-options", payload, apiKey
-            )
+            downloadOptions = sendRequest("download-options", payload)
 
             # Aggregate a list of available products
             downloads = []
@@ -213,10 +184,9 @@ if __name__ == "__main__":
                     "%Y%m%d_%H%M%S"
                 )  # Customized label using date time
                 payload = {"downloads": downloads, "label": label}
+                requestedAt = time.monotonic()
                 # Call the download to get the direct download urls
-                requestResults = sendRequest(
-                    serviceUrl + "download-request", payload, apiKey
-                )
+                requestResults = sendRequest("download-request", payload)
 
                 # PreparingDownloads has a valid link that can be used but data may not be immediately available
                 # Call the download-retrieve method to get download that is available for immediate download
@@ -225,75 +195,49 @@ if __name__ == "__main__":
                     and len(requestResults["preparingDownloads"]) > 0
                 ):
                     payload = {"label": label}
-                    moreDownloadUrls = sendRequest(
-                        serviceUrl + "download-retrieve", payload, apiKey
+                    wanted = set(requestResults["newRecords"]) | set(
+                        requestResults["duplicateProducts"]
                     )
 
-                    downloadIds = []
-
-                    for download in moreDownloadUrls["available"]:
-                        if (
-                            str(download["downloadId"]) in requestResults["newRecords"]
-                            or str(download["downloadId"])
-                            in requestResults["duplicateProducts"]
-                        ):
-                            downloadIds.append(download["downloadId"])
-                            runDownload(threads, download["url"])
-
-                    for download in moreDownloadUrls["requested"]:
-                        if (
-                            str(download["downloadId"]) in requestResults["newRecords"]
-                            or str(download["downloadId"])
-                            in requestResults["duplicateProducts"]
-                        ):
-                            downloadIds.append(download["downloadId"])
-                            runDownload(threads, download["url"])
-
-                    # Didn't get all of the reuested downloads, call the download-retrieve method again probably after 30 seconds
-                    while len(downloadIds) < (
-                        requestedDownloadsCount - len(requestResults["failed"])
-                    ):
-                        preparingDownloads = (
-                            requestedDownloadsCount
-                            - len(downloadIds)
-                            - len(requestResults["failed"])
-                        )
-                        print(
-                            "\n",
-                            preparingDownloads,
-                            "downloads are not available. Waiting for 30 seconds.\n",
-                        )
-                        time.sleep(30)
-                        print("Trying to retrieve data\n")
-                        moreDownloadUrls = sendRequest(
-                            serviceUrl + "download-retrieve", payload, apiKey
-                        )
-                        for download in moreDownloadUrls["available"]:
-                            if download["downloadId"] not in downloadIds and (
-                                str(download["downloadId"])
-                                in requestResults["newRecords"]
-                                or str(download["downloadId"])
-                                in requestResults["duplicateProducts"]
-                            ):
-                                downloadIds.append(download["downloadId"])
-                                runDownload(threads, download["url"])
+                    def retrieve():
+                        moreDownloadUrls = sendRequest("download-retrieve", payload)
+                        ready = [
+                            (download["downloadId"], download["url"])
+                            for download in moreDownloadUrls["available"]
+                            + moreDownloadUrls["requested"]
+                            if str(download["downloadId"]) in wanted
+                        ]
+                        return ready, False
+
+                    # Each URL is queued as soon as it is available; keep
+                    # polling until all but the failed ones have turned up.
+                    poller.poll(
+                        retrieve,
+                        scheduler.submit,
+                        expected=requestedDownloadsCount
+                        - len(requestResults["failed"]),
+                        started=requestedAt,
+                    )
 
                 else:
                     # Get all available downloads
                     for download in requestResults["availableDownloads"]:
-                        runDownload(threads, download["url"])
+                        scheduler.submit(download["url"])
         else:
             print("Search found no results.\n")
 
     print("Downloading files... Please do not close the program\n")
-    for thread in threads:
-        thread.join()
+    report = scheduler.join()
 
     print("Complete Downloading")
+    print(report)
+    if poller.stats.polls:
+        print(poller.stats)
 
     # Logout so the API Key cannot be used anymore
-    endpoint = "logout"
-    if sendRequest(serviceUrl + endpoint, None, apiKey) == None:
+    try:
+        client.logout()
         print("Logged Out\n\n")
-    else:
+    except (m2m_client.M2MError, requests.RequestException):
         print("Logout Failed\n\n")
+    client.close()
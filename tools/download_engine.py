@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+download_engine.py
+
+Stream large downloads to disk, resuming interrupted transfers.
+
+A download is written a chunk at a time to ``<name>.part`` next to its
+destination, so memory use is one chunk however large the archive. If an
+interrupted run left a ``.part`` file, the transfer resumes with an HTTP
+Range request from its last byte; a server that ignores the range sends the
+whole file and the part is started over. When the body is complete its
+length (and, if given, its checksum) is checked and the part is renamed into
+place, so a file under its final name is always whole. A file that is
+already complete is not downloaded again: when its name is known up front,
+a Range request for the bytes past its end is answered with an empty 416,
+which keeps the pooled connection open instead of opening and abandoning a
+whole-file response.
+
+Throughput is reported every few seconds while a file downloads.
+
+Usage:
+
+    python download_engine.py <url> [<url> ...] [options]
+
+Options:
+    --output-dir <dir>    Where to save the files (default: .)
+    --chunk-size <MiB>    Write size (default: 1)
+    --checksum <algo:hex> Expected digest of a single download, e.g. sha256:...
+"""
+
+import hashlib
+import os
+import re
+import time
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 5.0
+PART_SUFFIX = ".part"
+TIMEOUT = 60
+
+
+class DownloadError(Exception):
+    """A download failed or did not verify; ``status`` is the HTTP status."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class Transfer:
+    """Progress and outcome of one download."""
+
+    def __init__(self, url, path=None):
+        self.url = url
+        self.path = path
+        self.total = None
+        self.resumed_from = 0
+        self.received = 0
+        self.skipped = False
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.path) if self.path else self.url
+
+    @property
+    def size(self):
+        """Bytes on disk: the resumed part plus what this attempt received."""
+        return self.resumed_from + self.received
+
+    @property
+    def seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self):
+        """Bytes per second received by this attempt."""
+        return self.received / max(self.seconds, 1e-6)
+
+    def __str__(self):
+        if self.skipped:
+            return f"{self.name} already downloaded ({format_bytes(self.size)})"
+        if self.finished:
+            resumed = (
+                f", resumed at {format_bytes(self.resumed_from)}"
+                if self.resumed_from
+                else ""
+            )
+            return (
+                f"Downloaded {self.name} ({format_bytes(self.size)} in "
+                f"{self.seconds:.1f}s, {format_bytes(self.rate)}/s{resumed})"
+            )
+        done = format_bytes(self.size)
+        if self.total:
+            done += f" of {format_bytes(self.total)} ({self.size / self.total:.0%})"
+        return f"{self.name}: {done} at {format_bytes(self.rate)}/s"
+
+
+def format_bytes(count):
+    """Return ``count`` bytes as a short human-readable string."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(count) < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def print_progress(transfer):
+    """Default progress callback: print the transfer's status line."""
+    print(transfer)
+
+
+def filename_from_response(response, url):
+    """Return the file name from Content-Disposition, else from the URL."""
+    disposition = response.headers.get("content-disposition", "")
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", disposition, re.I)
+    if match:
+        name = unquote(match.group(1).strip().strip('"'))
+    else:
+        match = re.search(r"filename=([^;]+)", disposition, re.I)
+        if match:
+            name = match.group(1).strip().strip('"')
+        else:
+            name = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1])
+    name = os.path.basename(name.replace("\\", "/"))
+    if not name or name in (".", ".."):
+        raise DownloadError(f"No file name for {url}")
+    return name
+
+
+def parse_checksum(checksum):
+    """Return ``(hashlib name, hex digest)`` for ``"sha256:..."`` style text."""
+    algorithm, _, digest = checksum.partition(":")
+    if not digest:
+        raise ValueError(f"Checksum must be algorithm:hexdigest, got {checksum!r}")
+    algorithm = algorithm.lower()
+    if algorithm not in hashlib.algorithms_available:
+        raise ValueError(f"Unknown checksum algorithm: {algorithm}")
+    return algorithm, digest.lower()
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _hash_file(hasher, path, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+
+
+def _content_total(status, headers, offset):
+    """Return the full size of the file the response is part of, if known."""
+    if status == 206:
+        match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", headers.get("content-range", ""))
+        if not match or int(match.group(1)) != offset:
+            raise DownloadError(
+                f"Unexpected Content-Range {headers.get('content-range')!r}", 206
+            )
+        return None if match.group(2) == "*" else int(match.group(2))
+    length = headers.get("content-length")
+    return int(length) if length is not None else None
+
+
+def part_size(path):
+    """Return the bytes already in ``path``'s partial file, 0 if none."""
+    return _file_size(path + PART_SUFFIX)
+
+
+def request_headers(offset):
+    """Return the GET headers for a download resuming at ``offset``."""
+    # Identity encoding, so byte counts and ranges are of the file itself.
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+    return headers
+
+
+def _get(http, url, offset, timeout):
+    return http.get(url, headers=request_headers(offset), stream=True, timeout=timeout)
+
+
+def complete_file(transfer, status, headers, digest, expected_size, chunk_size):
+    """Return True if ``transfer.path`` is already the whole file.
+
+    ``status`` and ``headers`` answer a request ranged past the end of the
+    file: a 416 giving the file's own size means nothing is left to send.
+    The file is then checked against ``expected_size`` and ``digest``.
+    """
+    size = _file_size(transfer.path)
+    match = re.match(r"bytes \*/(\d+)", headers.get("content-range", ""))
+    if status != 416 or not match or int(match.group(1)) != size:
+        return False
+    if expected_size is not None and expected_size != size:
+        return False
+    if not _verify(transfer.path, digest, chunk_size):
+        return False
+    transfer.total = transfer.resumed_from = size
+    transfer.skipped = True
+    transfer.finished = time.monotonic()
+    return True
+
+
+def _probe(http, url, transfer, digest, expected_size, chunk_size, timeout):
+    response = _get(http, url, _file_size(transfer.path), timeout)
+    try:
+        if response.status_code != 416:
+            return False
+        # Read the empty body so the connection goes back to the pool.
+        response.content
+        return complete_file(
+            transfer,
+            response.status_code,
+            response.headers,
+            digest,
+            expected_size,
+            chunk_size,
+        )
+    finally:
+        response.close()
+
+
+def download_file(
+    url,
+    output_dir=".",
+    filename=None,
+    session=None,
+    chunk_size=CHUNK_SIZE,
+    checksum=None,
+    expected_size=None,
+    progress=print_progress,
+    progress_interval=PROGRESS_INTERVAL,
+    timeout=TIMEOUT,
+):
+    """Download ``url`` into ``output_dir`` and return its Transfer.
+
+    The name comes from ``filename``, the response's Content-Disposition or
+    the URL. ``session`` is a requests.Session (or anything with its
+    ``get``); ``checksum`` an ``"algorithm:hexdigest"`` string. ``progress``
+    is called with the Transfer every ``progress_interval`` seconds and
+    when the download ends; pass None for silence. Raises DownloadError if
+    the transfer fails or does not verify; a partial file is kept so the
+    next call resumes it, except after a verification failure.
+    """
+    http = session or requests
+    digest = parse_checksum(checksum) if checksum else None
+    transfer = Transfer(url)
+    path = os.path.join(output_dir, filename) if filename else None
+    offset = part_size(path) if path else 0
+    try:
+        if path and not offset and _file_size(path) and os.path.isfile(path):
+            transfer.path = path
+            if _probe(http, url, transfer, digest, expected_size, chunk_size, timeout):
+                if progress:
+                    progress(transfer)
+                return transfer
+        response = _get(http, url, offset, timeout)
+        try:
+            if path is None:
+                path = os.path.join(output_dir, filename_from_response(response, url))
+                offset = part_size(path)
+                if offset and response.status_code == 200:
+                    # The name came with this response; ask for the rest only.
+                    response.close()
+                    response = _get(http, url, offset, timeout)
+            transfer.path = path
+            if start_transfer(
+                transfer,
+                response.status_code,
+                response.reason,
+                response.headers,
+                offset,
+                digest,
+                expected_size,
+                chunk_size,
+            ):
+                _stream(
+                    response, transfer, chunk_size, digest, progress, progress_interval
+                )
+        finally:
+            response.close()
+    except requests.RequestException as e:
+        raise DownloadError(f"{transfer.name}: {e}") from e
+    if progress:
+        progress(transfer)
+    return transfer
+
+
+def start_transfer(
+    transfer, status, reason, headers, offset, digest, expected_size, chunk_size
+):
+    """Check a response's status and headers and set up ``transfer``.
+
+    Returns True if the body should be streamed with open_part() and
+    end_transfer(), False if the file is already complete. Raises
+    DownloadError for an error status.
+    """
+    path = transfer.path
+    part = path + PART_SUFFIX
+
+    if status == 416 and offset:
+        # Nothing left to send: the part may already be the whole file.
+        match = re.match(r"bytes \*/(\d+)", headers.get("content-range", ""))
+        if match and int(match.group(1)) == offset:
+            transfer.total = transfer.resumed_from = offset
+            _finish(transfer, digest, expected_size, chunk_size)
+            return False
+        os.remove(part)
+        raise DownloadError(f"{transfer.name}: partial file does not match", status)
+    if status not in (200, 206):
+        raise DownloadError(f"{transfer.name}: HTTP {status} {reason}", status)
+
+    total = _content_total(status, headers, offset if status == 206 else 0)
+    if expected_size is not None:
+        if total is not None and total != expected_size:
+            raise DownloadError(
+                f"{transfer.name}: server reports {total} bytes, "
+                f"expected {expected_size}",
+                status,
+            )
+        total = expected_size
+    transfer.total = total
+
+    if status == 200:
+        if offset:
+            print(f"{transfer.name}: server ignored the range, restarting")
+        if not offset and total is not None and _file_size(path) == total:
+            if os.path.isfile(path) and _verify(path, digest, chunk_size):
+                transfer.skipped = True
+                transfer.resumed_from = total
+                transfer.finished = time.monotonic()
+                return False
+        offset = 0
+    transfer.resumed_from = offset
+    return True
+
+
+def open_part(transfer, digest, chunk_size=CHUNK_SIZE):
+    """Open the partial file for writing; returns ``(file, hasher or None)``."""
+    part = transfer.path + PART_SUFFIX
+    hasher = hashlib.new(digest[0]) if digest else None
+    if hasher and transfer.resumed_from:
+        _hash_file(hasher, part, chunk_size)
+    return open(part, "ab" if transfer.resumed_from else "wb"), hasher
+
+
+def end_transfer(transfer, digest, hasher=None, chunk_size=CHUNK_SIZE):
+    """Check a streamed body is complete, verify it and rename it into place."""
+    if transfer.total is not None and transfer.size < transfer.total:
+        raise DownloadError(
+            f"{transfer.name}: connection closed at {transfer.size} of "
+            f"{transfer.total} bytes; the download will resume"
+        )
+    _finish(transfer, digest, None, chunk_size, hasher)
+
+
+def _stream(response, transfer, chunk_size, digest, progress, interval):
+    next_report = time.monotonic() + interval
+    f, hasher = open_part(transfer, digest, chunk_size)
+    with f:
+        for chunk in response.iter_content(chunk_size):
+            f.write(chunk)
+            if hasher:
+                hasher.update(chunk)
+            transfer.received += len(chunk)
+            if progress and time.monotonic() >= next_report:
+                progress(transfer)
+                next_report = time.monotonic() + interval
+    end_transfer(transfer, digest, hasher, chunk_size)
+
+
+def _verify(path, digest, chunk_size, hasher=None):
+    if not digest:
+        return True
+    if hasher is None:
+        hasher = hashlib.new(digest[0])
+        _hash_file(hasher, path, chunk_size)
+    return hasher.hexdigest() == digest[1]
+
+
+def _finish(transfer, digest, expected_size, chunk_size, hasher=None):
+    """Verify the part file and rename it into place."""
+    part = transfer.path + PART_SUFFIX
+    size = _file_size(part)
+    total = expected_size if expected_size is not None else transfer.total
+    if total is not None and size != total:
+        os.remove(part)
+        raise DownloadError(f"{transfer.name}: received {size} bytes, expected {total}")
+    if not _verify(part, digest, chunk_size, hasher):
+        os.remove(part)
+        raise DownloadError(f"{transfer.name}: {digest[0]} checksum mismatch")
+    os.replace(part, transfer.path)
+    transfer.finished = time.monotonic()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Download files with resume and verification."
+    )
+    parser.add_argument("urls", nargs="+", help="URLs to download")
+    parser.add_argument(
+        "--output-dir", default=".", help="Where to save the files (default: .)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=float, default=1, help="Write size in MiB (default: 1)"
+    )
+    parser.add_argument(
+        "--checksum", help="Expected algorithm:hexdigest of a single download"
+    )
+    args = parser.parse_args()
+    if args.checksum and len(args.urls) > 1:
+        parser.error("--checksum applies to a single URL")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    for url in args.urls:
+        try:
+            download_file(
+                url,
+                args.output_dir,
+                chunk_size=max(int(args.chunk_size * 1024 * 1024), 1024),
+                checksum=args.checksum,
+            )
+        except (DownloadError, ValueError, OSError) as e:
+            print(f"Failed to download {url} - {e}")
+            failed += 1
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+download_poller.py
+
+Poll M2M download-retrieve until prepared downloads become available.
+
+Instead of sleeping a fixed interval between calls, the poller starts with a
+short interval and lengthens it by ``factor`` after each poll that finds
+nothing new, up to ``max_interval``. Products of one request tend to become
+ready over a short span, so a poll that finds new ones drops the interval
+back to the start. Quick preparations are picked up within seconds, and a
+long preparation costs a handful of API calls rather than one every few
+seconds.
+
+Each newly available URL is handed to a callback, typically a download
+scheduler's submit(), as soon as it is seen, so files start downloading
+while the rest are still being prepared. The poller records how long each
+download took to become available for the summary at the end of a run.
+
+Usage:
+
+    poller = DownloadPoller()
+    poller.poll(retrieve, scheduler.submit, expected=len(downloads))
+    print(poller.stats)
+
+``retrieve()`` makes one download-retrieve call and returns the available
+``(download_id, url)`` pairs and whether preparation has finished.
+"""
+
+import statistics
+import time
+
+# Seconds between polls: the first, the growth per empty poll and the limit
+POLL_INTERVAL = 2.0
+POLL_FACTOR = 1.5
+MAX_POLL_INTERVAL = 60.0
+
+
+class PreparationStats:
+    """How long downloads took to become available, and the polls it took."""
+
+    def __init__(self):
+        self.latencies = []
+        self.polls = 0
+        self.waited = 0.0
+
+    def add(self, latency):
+        self.latencies.append(latency)
+
+    def percentile(self, percent):
+        """The ``percent`` percentile latency (nearest rank), or None."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(round(percent / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    def summary(self):
+        """The statistics in seconds as a dict, e.g. for JSON output."""
+        median = statistics.median(self.latencies) if self.latencies else None
+        longest = max(self.latencies, default=None)
+        p90 = self.percentile(90)
+        return {
+            "downloads": len(self.latencies),
+            "polls": self.polls,
+            "waited": round(self.waited, 3),
+            "median": None if median is None else round(median, 3),
+            "p90": None if p90 is None else round(p90, 3),
+            "max": None if longest is None else round(longest, 3),
+        }
+
+    def __str__(self):
+        if not self.latencies:
+            return f"No downloads became available after {self.polls} polls"
+        return (
+            f"{len(self.latencies)} downloads became available over "
+            f"{self.polls} polls ({self.waited:.0f}s waiting): median "
+            f"{statistics.median(self.latencies):.1f}s, 90th percentile "
+            f"{self.percentile(90):.1f}s, longest {max(self.latencies):.1f}s"
+        )
+
+
+class DownloadPoller:
+    """Adaptive download-retrieve polling; ``stats`` accumulates across polls."""
+
+    def __init__(
+        self,
+        interval=POLL_INTERVAL,
+        max_interval=MAX_POLL_INTERVAL,
+        factor=POLL_FACTOR,
+    ):
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.factor = factor
+        self.stats = PreparationStats()
+
+    def next_interval(self, interval, found):
+        """Seconds to wait after a poll that ``found`` new downloads or not."""
+        if found:
+            return self.interval
+        return min(self.max_interval, interval * self.factor)
+
+    def poll(self, retrieve, on_available, expected=None, started=None):
+        """Poll until ``retrieve`` reports done or ``expected`` URLs arrived.
+
+        ``on_available(url)`` is called once for each new download.
+        Latencies are measured from ``started`` (a time.monotonic() value,
+        default now), e.g. when the download request was made. Returns the
+        set of download IDs that became available.
+        """
+        started = time.monotonic() if started is None else started
+        seen = set()
+        interval = self.interval
+        while True:
+            available, done = retrieve()
+            self.stats.polls += 1
+            now = time.monotonic()
+            found = 0
+            for download_id, url in available:
+                if download_id in seen:
+                    continue
+                seen.add(download_id)
+                found += 1
+                self.stats.add(now - started)
+                on_available(url)
+            if done or (expected is not None and len(seen) >= expected):
+                return seen
+
+            interval = self.next_interval(interval, found)
+            remaining = None if expected is None else expected - len(seen)
+            if remaining is None:
+                waiting = "Downloads are still being prepared"
+            elif remaining == 1:
+                waiting = "1 download is not available yet"
+            else:
+                waiting = f"{remaining} downloads are not available yet"
+            print(f"{waiting}. Polling again in {interval:.1f}s")
+            time.sleep(interval)
+            self.stats.waited += interval
+
+
+def add_arguments(parser):
+    """Add the polling options shared by the download scripts."""
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=POLL_INTERVAL,
+        help="Seconds before polling again for prepared downloads; it grows "
+        f"while none become available (default: {POLL_INTERVAL:g})",
+    )
+    parser.add_argument(
+        "--max-poll-interval",
+        type=float,
+        default=MAX_POLL_INTERVAL,
+        help=f"Longest wait between polls (default: {MAX_POLL_INTERVAL:g})",
+    )
+
+
+def poller_from_args(args):
+    """Return a DownloadPoller for the options of add_arguments()."""
+    return DownloadPoller(
+        interval=max(args.poll_interval, 0.1),
+        max_interval=args.max_poll_interval,
+    )
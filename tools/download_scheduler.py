@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+download_scheduler.py
+
+Download many URLs with a fixed pool of worker threads.
+
+URLs are queued with submit() and taken by a fixed number of workers, at
+most ``per_host`` at a time from any one server. A failed download goes back
+on the queue after an exponential backoff with jitter (1s, 2s, 4s, ... up to
+a minute, each shortened by a random fraction so retries from many workers
+do not arrive together) until its retry budget is spent. Only transient
+failures are retried: dropped connections, timeouts and 408, 429 and 5xx
+responses; a 404 or a failed checksum is not going to improve. Because
+downloads resume from their ``.part`` file, a retry only fetches what is
+missing.
+
+While files download, a ThroughputMeter prints each finished file and,
+every few seconds, the overall throughput and an estimate of the time left.
+join() waits for the queue to drain and returns a report of the files that
+succeeded and failed.
+
+Usage:
+
+    python download_scheduler.py <url> [<url> ...] [options]
+
+Options:
+    --output-dir <dir>    Where to save the files (default: .)
+    --engine <name>       threads, or async for async_download (default: threads)
+    --workers <n>         Concurrent downloads (default: 5)
+    --concurrency <n>     Concurrent downloads with --engine async (default: 100)
+    --per-host <n>        Concurrent downloads from one server (default: 2)
+    --bandwidth <MB/s>    Total bandwidth limit with --engine async
+    --chunk-size <MiB>    Read and write size (default: 1, async: 0.25)
+    --retries <n>         Retries per URL after the first attempt (default: 4)
+"""
+
+import datetime
+import functools
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from download_engine import DownloadError, download_file, format_bytes
+
+# HTTP statuses worth retrying; other errors with a status are final.
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Retry budget and backoff: ``base * 2**n`` seconds, capped, with jitter."""
+
+    def __init__(self, retries=4, base_delay=1.0, max_delay=60.0, jitter=0.5):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, retry, rng=random):
+        """Seconds to wait before retry number ``retry`` (1 for the first)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return delay * (1 - self.jitter * rng.random())
+
+    def should_retry(self, error, retry):
+        if retry > self.retries:
+            return False
+        if isinstance(error, DownloadError):
+            return error.status is None or error.status in RETRY_STATUSES
+        return False
+
+
+class DownloadItem:
+    """One queued URL and what happened to it."""
+
+    def __init__(self, url, options, output_dir=None):
+        self.url = url
+        self.host = urlsplit(url).netloc
+        self.options = options
+        self.output_dir = output_dir
+        self.attempts = 0
+        self.ready_at = 0.0
+        self.transfer = None
+        self.error = None
+
+
+class DownloadReport:
+    """The downloads that succeeded and failed, and how long it took."""
+
+    def __init__(self, succeeded, failed, seconds):
+        self.succeeded = succeeded
+        self.failed = failed
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __str__(self):
+        size = sum(getattr(item.transfer, "size", 0) for item in self.succeeded)
+        retried = sum(1 for item in self.succeeded if item.attempts > 1)
+        lines = [
+            f"Downloaded {len(self.succeeded)} of "
+            f"{len(self.succeeded) + len(self.failed)} files "
+            f"({format_bytes(size)}) in {self.seconds:.1f}s"
+            + (f", {retried} after retries" if retried else "")
+        ]
+        for item in self.failed:
+            attempts = (
+                "1 attempt" if item.attempts == 1 else f"{item.attempts} attempts"
+            )
+            lines.append(f"  Failed after {attempts}: {item.url} - {item.error}")
+        return "\n".join(lines)
+
+
+class ThroughputMeter:
+    """Aggregate throughput and ETA of a batch of downloads.
+
+    Pass update() as the downloads' progress callback: it prints each
+    finished file and, every ``interval`` seconds, the files done, bytes
+    received, current rate and the time left. The estimate counts the bytes
+    still due for files in flight plus the files not yet started at the
+    average size seen so far, at the rate since the previous line. Safe to
+    call from several threads.
+    """
+
+    # Seconds between the progress callbacks of one download
+    UPDATE_INTERVAL = 1.0
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.files = 0
+        self.done = 0
+        self.received = 0
+        self._active = {}
+        self._sizes = []
+        self._started = None
+        self._next = None
+        self._mark = None
+        self._lock = threading.Lock()
+
+    def add(self, count=1):
+        """Count ``count`` more files in the batch."""
+        with self._lock:
+            self.files += count
+            if self._started is None:
+                self._started = time.monotonic()
+                self._next = self._started + self.interval
+                self._mark = (self._started, 0)
+
+    def update(self, transfer):
+        """Record a download's progress; ``transfer`` is its Transfer."""
+        # Printing under the lock keeps lines from different threads whole.
+        with self._lock:
+            previous = self._active.pop(transfer.url, None)
+            if previous is not None and previous is not transfer:
+                # An earlier attempt of a retried download
+                self.received += previous.received
+            if transfer.finished:
+                self.received += transfer.received
+                self.done += 1
+                self._sizes.append(transfer.size)
+                print(transfer)
+            else:
+                self._active[transfer.url] = transfer
+            self._report()
+
+    def message(self, text):
+        """Print ``text`` without interleaving it with the meter's lines."""
+        with self._lock:
+            print(text)
+
+    def fail(self, url):
+        """Record that the download of ``url`` was given up."""
+        with self._lock:
+            previous = self._active.pop(url, None)
+            if previous is not None:
+                self.received += previous.received
+            self.done += 1
+            self._report()
+
+    def _report(self):
+        now = time.monotonic()
+        if self._next is None or now < self._next:
+            return
+        self._next = now + self.interval
+        print(self._status(now, update=True))
+
+    def _status(self, now, update=False):
+        active = list(self._active.values())
+        received = self.received + sum(t.received for t in active)
+        since, before = self._mark or (now, 0)
+        rate = (received - before) / max(now - since, 1e-6)
+        if update:
+            self._mark = (now, received)
+        line = (
+            f"{self.done} of {self.files} files done, {len(active)} active, "
+            f"{format_bytes(received)} at {format_bytes(rate)}/s"
+        )
+        sizes = self._sizes + [t.total for t in active if t.total]
+        if sizes and rate > 0:
+            average = sum(sizes) / len(sizes)
+            waiting = max(self.files - self.done - len(active), 0)
+            remaining = waiting * average + sum(
+                max((t.total or average) - t.size, 0) for t in active
+            )
+            eta = datetime.timedelta(seconds=round(remaining / rate))
+            line += f", about {format_bytes(remaining)} left, ETA {eta}"
+        return line
+
+    def __str__(self):
+        with self._lock:
+            return self._status(time.monotonic())
+
+
+class DownloadScheduler:
+    """A fixed pool of download workers with per-host caps and retries.
+
+    ``download`` is called as ``download(url, output_dir, **options)`` and
+    defaults to download_engine.download_file. With a ThroughputMeter,
+    ``meter.update`` is passed as its ``progress`` callback. Workers start on
+    the first submit(); call join() once everything has been submitted.
+    """
+
+    def __init__(
+        self,
+        output_dir=".",
+        workers=5,
+        per_host=2,
+        policy=None,
+        download=download_file,
+        rng=None,
+        meter=None,
+    ):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.per_host = per_host or workers
+        self.policy = policy or RetryPolicy()
+        self.download = download
+        self.rng = rng or random.Random()
+        self.meter = meter
+        self.succeeded = []
+        self.failed = []
+        self._queue = []
+        self._active = {}
+        self._pending = 0
+        self._closing = False
+        self._threads = []
+        self._started = None
+        self._cond = threading.Condition()
+
+    def submit(self, url, output_dir=None, **options):
+        """Queue ``url``; ``options`` are passed on to the download function.
+
+        ``output_dir`` overrides the scheduler's directory for this URL.
+        """
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Scheduler has been joined")
+            self._queue.append(DownloadItem(url, options, output_dir))
+            self._pending += 1
+            if self.meter:
+                self.meter.add()
+            if not self._threads:
+                self._start()
+            self._cond.notify()
+
+    def _start(self):
+        self._started = time.monotonic()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take(self):
+        """Return a ready item whose host has a free slot, or the wait time."""
+        now = time.monotonic()
+        wait = None
+        for index, item in enumerate(self._queue):
+            if item.ready_at > now:
+                delay = item.ready_at - now
+                wait = delay if wait is None else min(wait, delay)
+            elif self._active.get(item.host, 0) < self.per_host:
+                return self._queue.pop(index), None
+        return None, wait
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closing and not self._pending:
+                        return
+                    item, wait = self._take()
+                    if item is not None:
+                        break
+                    self._cond.wait(wait)
+                self._active[item.host] = self._active.get(item.host, 0) + 1
+
+            options = item.options
+            if self.meter:
+                options = dict(
+                    options,
+                    progress=self.meter.update,
+                    progress_interval=self.meter.UPDATE_INTERVAL,
+                )
+            error = None
+            try:
+                item.transfer = self.download(
+                    item.url, item.output_dir or self.output_dir, **options
+                )
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._active[item.host] -= 1
+                item.attempts += 1
+                item.error = error
+                if error is None:
+                    self.succeeded.append(item)
+                    self._pending -= 1
+                elif self.policy.should_retry(error, item.attempts):
+                    delay = self.policy.delay(item.attempts, self.rng)
+                    item.ready_at = time.monotonic() + delay
+                    self._queue.append(item)
+                    self._print(
+                        f"Failed to download {item.url} - {error}; retry "
+                        f"{item.attempts} of {self.policy.retries} in {delay:.1f}s"
+                    )
+                else:
+                    self.failed.append(item)
+                    self._pending -= 1
+                    self._print(f"Giving up on {item.url} - {error}")
+                    if self.meter:
+                        self.meter.fail(item.url)
+                self._cond.notify_all()
+
+    def _print(self, text):
+        if self.meter:
+            self.meter.message(text)
+        else:
+            print(text)
+
+    def join(self):
+        """Wait for every submitted URL and return the DownloadReport."""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+            self._closing = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        seconds = time.monotonic() - self._started if self._started else 0.0
+        return DownloadReport(self.succeeded, self.failed, seconds)
+
+
+def add_arguments(parser, workers=5, per_host=2):
+    """Add the download options shared by the download scripts.
+
+    ``workers`` and ``per_host`` are the defaults of the threads engine.
+    """
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default="threads",
+        help="Download on a worker thread pool, or on an asyncio event loop "
+        "for hundreds of concurrent downloads (requires aiohttp) "
+        "(default: threads)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=workers,
+        help=f"Concurrent downloads with the threads engine (default: {workers})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=100,
+        help="Concurrent downloads with the async engine (default: 100)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        help="Concurrent downloads from one server "
+        f"(default: {per_host} threads, 16 async)",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        help="Total bandwidth limit in MB/s with the async engine",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=4,
+        help="Retries per URL after the first attempt (default: 4)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=float,
+        help="Read and write size in MiB (default: 1 threads, 0.25 async)",
+    )
+    parser.set_defaults(threads_per_host=per_host)
+
+
+def scheduler_from_args(args, output_dir=".", download=download_file):
+    """Return a scheduler for the options of add_arguments().
+
+    With ``--engine async`` this is an async_download.AsyncScheduler, which
+    makes its own connections, so ``download`` is not used.
+    """
+    if getattr(args, "engine", "threads") == "async":
+        import async_download
+
+        return async_download.scheduler_from_args(args, output_dir)
+    if args.chunk_size:
+        chunk_size = max(int(args.chunk_size * 1024 * 1024), 1024)
+        download = functools.partial(download, chunk_size=chunk_size)
+    return DownloadScheduler(
+        output_dir,
+        workers=max(args.workers, 1),
+        per_host=max(args.per_host or args.threads_per_host, 1),
+        policy=RetryPolicy(retries=max(args.retries, 0)),
+        download=download,
+        meter=ThroughputMeter(),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Download URLs with a worker pool, retries and backoff."
+    )
+    parser.add_argument("urls", nargs="+", help="URLs to download")
+    parser.add_argument(
+        "--output-dir", default=".", help="Where to save the files (default: .)"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    scheduler = scheduler_from_args(args, args.output_dir)
+    for url in args.urls:
+        scheduler.submit(url)
+    report = scheduler.join()
+    print(report)
+    sys.exit(0 if report.ok else 1)
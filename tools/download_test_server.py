@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+download_test_server.py
+
+A local stand-in for the USGS download servers, for trying the download
+tools without an account or network.
+
+Files under a directory are served with Content-Length, a Content-Disposition
+attachment name and single-range ``Range`` support, like the M2M download
+URLs. To exercise retries and resume it can throttle its sending rate, drop
+the connection after a number of body bytes (once per file) and answer with
+errors such as 503 for the first requests of each file.
+
+Usage:
+
+    python download_test_server.py <directory> [options]
+
+Options:
+    --port <n>            Port to listen on (default: 8000, 0 for any)
+    --rate <KiB/s>        Throttle each response
+    --fail-after <bytes>  Drop each file's first transfer after this many bytes
+    --errors <n>          Answer the first n requests of each file with 503
+    --ignore-range        Always send the whole file with 200
+"""
+
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadHandler(BaseHTTPRequestHandler):
+    """Serve ``server.root`` with the faults configured on the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _count(self, counter, key):
+        with self.server.lock:
+            counter[key] = counter.get(key, 0) + 1
+            return counter[key]
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # The client reset an idle keep-alive connection.
+            self.close_connection = True
+
+    def do_HEAD(self):
+        self._send(head=True)
+
+    def do_GET(self):
+        try:
+            self._send(head=False)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. to resume with a Range request.
+            self.close_connection = True
+
+    def _send(self, head):
+        relative = unquote(urlsplit(self.path).path).lstrip("/")
+        path = os.path.realpath(os.path.join(self.server.root, relative))
+        if not path.startswith(self.server.root + os.sep) or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        if self._count(self.server.requests, path) <= self.server.errors:
+            self.send_response(503)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match and not self.server.ignore_range:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header(
+            "Content-Disposition", f'attachment; filename="{os.path.basename(path)}"'
+        )
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head:
+            return
+
+        fail_after = None
+        if self.server.fail_after is not None:
+            if self._count(self.server.transfers, path) == 1:
+                fail_after = self.server.fail_after
+        sent = 0
+        started = time.monotonic()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if fail_after is not None and sent + len(chunk) > fail_after:
+                    self.wfile.write(chunk[: max(fail_after - sent, 0)])
+                    self.wfile.flush()
+                    # Drop the connection mid-body, like a reset transfer.
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if self.server.rate:
+                    # Pace before writing, so the last chunk is not followed
+                    # by an idle wait holding the connection.
+                    elapsed = time.monotonic() - started
+                    delay = (sent + len(chunk)) / self.server.rate - elapsed
+                    if delay > 0:
+                        time.sleep(delay)
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                remaining -= len(chunk)
+
+
+def serve(
+    root,
+    port=0,
+    rate=None,
+    fail_after=None,
+    errors=0,
+    ignore_range=False,
+    verbose=False,
+):
+    """Start the server on a daemon thread; returns it (``server_address``).
+
+    ``rate`` is in bytes per second. Call ``server.shutdown()`` to stop.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), DownloadHandler)
+    server.daemon_threads = True
+    server.root = os.path.realpath(root)
+    server.rate = rate
+    server.fail_after = fail_after
+    server.errors = errors
+    server.ignore_range = ignore_range
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.requests = {}
+    server.transfers = {}
+    # Connections accepted, to check that clients keep them alive
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url_for(server, name):
+    """Return the URL of ``name`` under the server root."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/{name}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Serve a directory like the USGS download servers."
+    )
+    parser.add_argument("directory", help="Directory of files to serve")
+    parser.add_argument(
+        "--port", type=int, default=8000, help="Port (default: 8000, 0 for any)"
+    )
+    parser.add_argument("--rate", type=float, help="Throttle in KiB/s per response")
+    parser.add_argument(
+        "--fail-after",
+        type=int,
+        help="Drop each file's first transfer after this many bytes",
+    )
+    parser.add_argument(
+        "--errors",
+        type=int,
+        default=0,
+        help="Answer the first N requests of each file with 503",
+    )
+    parser.add_argument(
+        "--ignore-range", action="store_true", help="Always send the whole file"
+    )
+    args = parser.parse_args()
+
+    server = serve(
+        args.directory,
+        args.port,
+        args.rate * 1024 if args.rate else None,
+        args.fail_after,
+        args.errors,
+        args.ignore_range,
+        verbose=True,
+    )
+    print(f"Serving {server.root} at {url_for(server, '')}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
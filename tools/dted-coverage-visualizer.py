@@ -6,169 +6,175 @@ Visualize DTED data coverage from a directory structure.
 This script scans a directory for DTED files, extracts coverage information,
 and generates a map showing the coverage of different DTED levels.
 
+Coverage can also be read straight from an index written by create_index.py
+(index.zip, index or index.bin) or from a zip of DTED tiles such as a
+dted_*_hemi.zip download, without extracting anything. The index does not
+record DTED0.
+
 Usage:
 
-    python dted-coverage-visualizer.py <directory> [options]
+    python dted-coverage-visualizer.py <directory|index.zip|archive.zip> [options]
 
 Options:
     -h, --help            Show this help message and exit
     -o, --output <file>   Output file path (e.g., coverage_map.png)
     --no-grid             Disable grid lines
+    --summary             Only print the per-level cell counts; matplotlib
+                            is not loaded, and the exit status is 1 when
+                            there is no data (for cron jobs and health checks)
+    --json                Only print the summary as JSON on stdout
+    --render <mode>       Draw cells as one raster image per level (raster,
+                            the default) or as one patch per cell (patches)
+    --no-outlines         Do not outline the covered cells
+    --tiles <dir>         Also (or, without --output, only) render a z/x/y
+                            PNG tile pyramid for web maps into <dir>
+    --min-zoom, --max-zoom, --tile-jobs
+                          Zoom range (default: 0-7) and processes for --tiles
+    --preview <file>      Also (or, without --output, only) render a shaded
+                            elevation preview PNG from the tiles' posts
+                            (directory sources only)
+    --preview-style, --preview-level, --resolution, --max-size, --preview-jobs
+                          Style (shaded, hillshade, color), DTED level,
+                            pixels per degree, largest side and processes
+                            for --preview
+    --batch <region> ...  Render one map per region (a --region value, or
+                            "all") from a single scan, in parallel processes;
+                            quote a list such as "all NW -125,32,-114,42"
+                            to pass boxes with negative longitudes
+    --formats <list>      Comma-separated --batch formats (default: png)
+    --batch-dir <dir>     Directory for --batch maps (default: .)
+    --batch-jobs <n>      Processes rendering --batch maps (default: CPUs)
+    --scan-threads <n>    Threads listing directories (default: auto)
+    --cache-file <file>   Scan cache location
+                            (default: ~/.cache/dted-tools/scan-cache.json)
+    --no-cache            Scan the whole directory without the scan cache
+    --clear-cache         Discard the scan cache before scanning
     -r, --region <region> Filter by region (N=North, S=South, E=East, W=West,
                             or combinations for quadrants)
-                            (e.g., NW, NE, SW, SE)
+                            (e.g., NW, NE, SW, SE), a bounding box
+                            (e.g., --region=-125,32,-114,42; the "=" keeps
+                            a negative longitude from reading as an option)
+                            or a GeoJSON file
+    --bbox <min_lon> <min_lat> <max_lon> <max_lat>
+                          Filter by a bounding box
+    --geojson <file>      Filter by a GeoJSON polygon (e.g., a state boundary)
 """
 
 
 import os
 import re
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.colors import LinearSegmentedColormap
+import sys
+import json
+import contextlib
 import numpy as np
 import argparse
-from matplotlib.ticker import MultipleLocator
 import math
-
-# Set up matplotlib to use a non-interactive backend
-plt.switch_backend("Agg")  # Use 'Agg' for non-interactive backends
-# Define a custom colormap for DTED levels
-cmap = LinearSegmentedColormap.from_list(
-    "dted_cmap", ["yellow", "green", "blue"], N=256
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from coverage_filter import (
+    QUADRANTS,
+    BBoxRegion,
+    filter_coverage,
+    load_geojson,
+    parse_region,
 )
+from coverage_loader import load_coverage
+from coverage_scan import ScanCache, scan_coverage
+import coverage_tiles
+from coverage_tiles import composite_levels
+import elevation_preview
+
+# matplotlib is imported by load_matplotlib() when a map is drawn, so
+# printing a summary does not pay for it.
+plt = None
+mpatches = None
+to_rgba = None
+MultipleLocator = None
+cmap = None
+
+
+def load_matplotlib():
+    """Import matplotlib and apply the map style on first use."""
+    global plt, mpatches, to_rgba, MultipleLocator, cmap
+    if plt is not None:
+        return plt
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    from matplotlib.colors import LinearSegmentedColormap, to_rgba
+    from matplotlib.ticker import MultipleLocator
+
+    # Set up matplotlib to use a non-interactive backend
+    plt.switch_backend("Agg")  # Use 'Agg' for non-interactive backends
+    # Define a custom colormap for DTED levels
+    cmap = LinearSegmentedColormap.from_list(
+        "dted_cmap", ["yellow", "green", "blue"], N=256
+    )
 
-# Set the default font size for matplotlib
-plt.rcParams["font.size"] = 12
-# Set the default figure size for matplotlib
-plt.rcParams["figure.figsize"] = (12, 8)
-# Set the default figure dpi for matplotlib
-plt.rcParams["figure.dpi"] = 300
-# Set the default line width for matplotlib
-plt.rcParams["lines.linewidth"] = 1.5
-# Set the default grid color for matplotlib
-plt.rcParams["grid.color"] = "gray"
-# Set the default grid linestyle for matplotlib
-plt.rcParams["grid.linestyle"] = "--"
-# Set the default grid linewidth for matplotlib
-plt.rcParams["grid.linewidth"] = 0.5
-# Set the default grid alpha for matplotlib
-plt.rcParams["grid.alpha"] = 0.7
-# Set the default legend font size for matplotlib
-plt.rcParams["legend.fontsize"] = 10
-# Set the default legend loc for matplotlib
-plt.rcParams["legend.loc"] = "upper right"
-# Set the default legend frameon for matplotlib
-plt.rcParams["legend.frameon"] = True
-# Set the default legend shadow for matplotlib
-plt.rcParams["legend.shadow"] = True
-
-# Set the default legend fancybox for matplotlib
-plt.rcParams["legend.fancybox"] = True
-# Set the default legend borderpad for matplotlib
-plt.rcParams["legend.borderpad"] = 0.5
-# Set the default legend borderaxespad for matplotlib
-plt.rcParams["legend.borderaxespad"] = 0.5
-# Set the default legend handlelength for matplotlib
-plt.rcParams["legend.handlelength"] = 1.5
-# Set the default legend handletextpad for matplotlib
-plt.rcParams["legend.handletextpad"] = 0.5
-# Set the default legend markerscale for matplotlib
-plt.rcParams["legend.markerscale"] = 1.0
-# Set the default legend title_fontsize for matplotlib
-plt.rcParams["legend.title_fontsize"] = 12
-# Set the default legend title for matplotlib
-plt.rcParams["legend.title"] = "DTED Levels"
-
-
-def parse_dted_path(path):
-    """Extract longitude, latitude, and DTED level from a path."""
-    # Define regex patterns for extraction
-    lon_pattern = r"([ew])(\d+)"  # e.g., 'w115'
-    lat_pattern = r"([ns])(\d+)"  # e.g., 'n32'
-    level_pattern = r"dt(\d+)"  # e.g., 'dt2'
-
-    # Find all matches
-    lon_match = re.search(lon_pattern, path.lower())
-    lat_match = re.search(lat_pattern, path.lower())
-    level_match = re.search(level_pattern, path.lower())
-
-    if not (lon_match and lat_match and level_match):
-        return None
-
-    # Extract values
-    lon_dir, lon_val = lon_match.groups()
-    lat_dir, lat_val = lat_match.groups()
-    level = level_match.group(1)
-
-    # Convert to numeric values
-    lon = int(lon_val)
-    if lon_dir == "w":
-        lon = -lon  # West is negative
-
-    lat = int(lat_val)
-    if lat_dir == "s":
-        lat = -lat  # South is negative
-
-    return lon, lat, int(level)
-
-
-def scan_directory(root_dir):
-    """Scan directory for DTED files and extract coverage information."""
-    coverage = {}  # Dictionary to store coverage by level
-
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if (
-                file.lower().endswith(".dt0")
-                or file.lower().endswith(".dt1")
-                or file.lower().endswith(".dt2")
-            ):
-                path = os.path.join(root, file)
-                result = parse_dted_path(path)
-
-                if result:
-                    lon, lat, level = result
-                    if level not in coverage:
-                        coverage[level] = set()
-                    coverage[level].add((lon, lat))
-
-    return coverage
+    # Set the default font size for matplotlib
+    plt.rcParams["font.size"] = 12
+    # Set the default figure size for matplotlib
+    plt.rcParams["figure.figsize"] = (12, 8)
+    # Set the default figure dpi for matplotlib
+    plt.rcParams["figure.dpi"] = 300
+    # Set the default line width for matplotlib
+    plt.rcParams["lines.linewidth"] = 1.5
+    # Set the default grid color for matplotlib
+    plt.rcParams["grid.color"] = "gray"
+    # Set the default grid linestyle for matplotlib
+    plt.rcParams["grid.linestyle"] = "--"
+    # Set the default grid linewidth for matplotlib
+    plt.rcParams["grid.linewidth"] = 0.5
+    # Set the default grid alpha for matplotlib
+    plt.rcParams["grid.alpha"] = 0.7
+    # Set the default legend font size for matplotlib
+    plt.rcParams["legend.fontsize"] = 10
+    # Set the default legend loc for matplotlib
+    plt.rcParams["legend.loc"] = "upper right"
+    # Set the default legend frameon for matplotlib
+    plt.rcParams["legend.frameon"] = True
+    # Set the default legend shadow for matplotlib
+    plt.rcParams["legend.shadow"] = True
+
+    # Set the default legend fancybox for matplotlib
+    plt.rcParams["legend.fancybox"] = True
+    # Set the default legend borderpad for matplotlib
+    plt.rcParams["legend.borderpad"] = 0.5
+    # Set the default legend borderaxespad for matplotlib
+    plt.rcParams["legend.borderaxespad"] = 0.5
+    # Set the default legend handlelength for matplotlib
+    plt.rcParams["legend.handlelength"] = 1.5
+    # Set the default legend handletextpad for matplotlib
+    plt.rcParams["legend.handletextpad"] = 0.5
+    # Set the default legend markerscale for matplotlib
+    plt.rcParams["legend.markerscale"] = 1.0
+    # Set the default legend title_fontsize for matplotlib
+    plt.rcParams["legend.title_fontsize"] = 12
+    return plt
+
+
+def scan_directory(root_dir, threads=None, cache=None):
+    """Scan directory for DTED files and extract coverage information.
+
+    Directories are listed in parallel by coverage_scan; ``threads`` of 1
+    scans serially. With a ScanCache only directories whose mtime changed
+    since the last scan are listed again.
+    """
+    return scan_coverage(root_dir, threads, cache)
+
+
+def as_region(region):
+    """Return a coverage_filter region for a region object or argument string."""
+    if region is None or not isinstance(region, str):
+        return region
+    return parse_region(region)
 
 
 def filter_by_region(coverage, region=None):
-    """Filter coverage data by hemisphere or quadrant."""
+    """Filter coverage data by quadrant, bounding box or polygon."""
     if not region:
         return coverage
-
-    filtered_coverage = {}
-
-    for level, points in coverage.items():
-        filtered_points = set()
-
-        for lon, lat in points:
-            # Basic hemispheres
-            if region.upper() == "N" and lat >= 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "S" and lat < 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "E" and lon >= 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "W" and lon < 0:
-                filtered_points.add((lon, lat))
-            # Quadrants
-            elif region.upper() == "NW" and lat >= 0 and lon < 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "NE" and lat >= 0 and lon >= 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "SW" and lat < 0 and lon < 0:
-                filtered_points.add((lon, lat))
-            elif region.upper() == "SE" and lat < 0 and lon >= 0:
-                filtered_points.add((lon, lat))
-
-        if filtered_points:
-            filtered_coverage[level] = filtered_points
-
-    return filtered_coverage
+    return filter_coverage(coverage, as_region(region))
 
 
 def get_map_bounds(coverage, region=None):
@@ -176,55 +182,94 @@ def get_map_bounds(coverage, region=None):
     if not coverage:
         return (-180, 180, -90, 90)  # Default to world map
 
-    # Set initial bounds based on region
-    if region == "N":
-        min_lat, max_lat = 0, 90
-        min_lon, max_lon = -180, 180
-    elif region == "S":
-        min_lat, max_lat = -90, 0
-        min_lon, max_lon = -180, 180
-    elif region == "E":
-        min_lat, max_lat = -90, 90
-        min_lon, max_lon = 0, 180
-    elif region == "W":
-        min_lat, max_lat = -90, 90
-        min_lon, max_lon = -180, 0
-    elif region == "NW":
-        min_lat, max_lat = 0, 90
-        min_lon, max_lon = -180, 0
-    elif region == "NE":
-        min_lat, max_lat = 0, 90
-        min_lon, max_lon = 0, 180
-    elif region == "SW":
-        min_lat, max_lat = -90, 0
-        min_lon, max_lon = -180, 0
-    elif region == "SE":
-        min_lat, max_lat = -90, 0
-        min_lon, max_lon = 0, 180
-    else:
-        # If no region specified, use data bounds with padding
-        all_points = []
-        for points in coverage.values():
-            all_points.extend(points)
+    if region:
+        min_lon, min_lat, max_lon, max_lat = as_region(region).bounds
+        return (min_lon, max_lon, min_lat, max_lat)
+
+    # If no region specified, use data bounds with padding
+    points = [np.array(list(cells)) for cells in coverage.values() if cells]
+    if not points:
+        return (-180, 180, -90, 90)
+    cells = np.concatenate(points)
+    lons, lats = cells[:, 0], cells[:, 1]
+
+    padding = 5  # degrees of padding
+    min_lon = max(int(lons.min()) - padding, -180)
+    max_lon = min(int(lons.max()) + padding, 180)
+    min_lat = max(int(lats.min()) - padding, -90)
+    max_lat = min(int(lats.max()) + padding, 90)
+
+    return (min_lon, max_lon, min_lat, max_lat)
 
-        if not all_points:
-            return (-180, 180, -90, 90)
 
-        lons = [p[0] for p in all_points]
-        lats = [p[1] for p in all_points]
+# Colors for the different DTED levels
+LEVEL_COLORS = {
+    0: "yellow",
+    1: "green",
+    2: "blue",
+}
 
-        padding = 5  # degrees of padding
-        min_lon = max(min(lons) - padding, -180)
-        max_lon = min(max(lons) + padding, 180)
-        min_lat = max(min(lats) - padding, -90)
-        max_lat = min(max(lats) + padding, 90)
+RENDER_MODES = ("raster", "patches")
 
-    return (min_lon, max_lon, min_lat, max_lat)
 
+def draw_raster(ax, coverage, colors, bounds, outlines=True):
+    """Draw all levels as a single mesh of the 1 degree cells in ``bounds``.
 
-def plot_coverage(coverage, output_file=None, show_grid=True, region=None):
-    """Plot the DTED coverage on a map."""
+    The levels are alpha-composited into one RGBA color per cell, so the map
+    is one artist whose size is fixed by the map extent, not by the number
+    of tiles.
+    """
+    min_lon, max_lon, min_lat, max_lat = bounds
+    west, east = max(math.floor(min_lon), -180), min(math.ceil(max_lon), 180)
+    south, north = max(math.floor(min_lat), -90), min(math.ceil(max_lat), 90)
+    window = (slice(south + 90, north + 90), slice(west + 180, east + 180))
+
+    # Same result as stacking the levels' patches at alpha 0.7
+    rgba = {level: to_rgba(colors.get(level, "gray"), alpha=0.7) for level in coverage}
+    image = composite_levels(coverage, rgba)[window]
+    covered = image[..., 3] > 0
+
+    mesh = ax.pcolormesh(
+        np.arange(west, east + 1),
+        np.arange(south, north + 1),
+        image,
+        edgecolors="none",
+    )
+    if outlines:
+        # Outline covered cells only, at the patches' alpha; empty cells
+        # get a transparent edge.
+        edges = np.zeros((covered.size, 4))
+        edges[:, 3] = covered.ravel() * 0.7
+        mesh.set_edgecolor(edges)
+        mesh.set_linewidth(0.5)
+
+
+def draw_patches(ax, coverage, colors, outlines=True):
+    """Draw one rectangle per cell."""
+    for level in sorted(coverage.keys()):
+        color = colors.get(level, "gray")
+
+        for lon, lat in coverage[level]:
+            # Plot 1x1 degree cell
+            rect = mpatches.Rectangle(
+                (lon, lat),
+                1,
+                1,
+                alpha=0.7,
+                facecolor=color,
+                edgecolor="black" if outlines else "none",
+                linewidth=0.5,
+            )
+            ax.add_patch(rect)
+
+
+def coverage_figure(
+    coverage, show_grid=True, region=None, render="raster", outlines=True
+):
+    """Build the coverage map figure of ``coverage`` within ``region``."""
+    load_matplotlib()
     fig, ax = plt.subplots(figsize=(12, 8))
+    region = as_region(region)
 
     # Filter data by region if specified
     filtered_coverage = filter_by_region(coverage, region)
@@ -240,19 +285,8 @@ def plot_coverage(coverage, output_file=None, show_grid=True, region=None):
 
     # Set title based on region
     title = "DTED Coverage Map"
-    region_names = {
-        "N": "Northern Hemisphere",
-        "S": "Southern Hemisphere",
-        "E": "Eastern Hemisphere",
-        "W": "Western Hemisphere",
-        "NW": "Northwest Quadrant",
-        "NE": "Northeast Quadrant",
-        "SW": "Southwest Quadrant",
-        "SE": "Southeast Quadrant",
-    }
-
     if region:
-        title += f" - {region_names.get(region.upper(), region)}"
+        title += f" - {region.label}"
     ax.set_title(title)
 
     # Add grid lines
@@ -298,40 +332,45 @@ def plot_coverage(coverage, output_file=None, show_grid=True, region=None):
 
         ax.grid(True, which="minor", linestyle=":", alpha=0.4)
 
-    # Define colors for different DTED levels
-    colors = {
-        0: "yellow",
-        1: "green",
-        2: "blue",
-    }
-
-    # Create legend handles
-    legend_handles = []
-
     # Plot each DTED level
-    for level in sorted(filtered_coverage.keys()):
-        points = filtered_coverage[level]
-        color = colors.get(level, "gray")
-
-        for lon, lat in points:
-            # Plot 1x1 degree cell
-            rect = mpatches.Rectangle(
-                (lon, lat),
-                1,
-                1,
-                alpha=0.7,
-                facecolor=color,
-                edgecolor="black",
-                linewidth=0.5,
-            )
-            ax.add_patch(rect)
+    if render == "patches":
+        draw_patches(ax, filtered_coverage, LEVEL_COLORS, outlines)
+    else:
+        draw_raster(
+            ax,
+            filtered_coverage,
+            LEVEL_COLORS,
+            (min_lon, max_lon, min_lat, max_lat),
+            outlines,
+        )
+    # Images and meshes autoscale the axes; keep the map bounds.
+    ax.set_xlim(min_lon, max_lon)
+    ax.set_ylim(min_lat, max_lat)
 
-        # Add to legend
-        legend_handles.append(mpatches.Patch(color=color, label=f"DTED Level {level}"))
+    # Create legend handles
+    legend_handles = [
+        mpatches.Patch(
+            color=LEVEL_COLORS.get(level, "gray"), label=f"DTED Level {level}"
+        )
+        for level in sorted(filtered_coverage.keys())
+    ]
 
     # Add the legend
     if legend_handles:
-        ax.legend(handles=legend_handles, loc="lower right")
+        ax.legend(handles=legend_handles, loc="lower right", title="DTED Levels")
+    return fig
+
+
+def plot_coverage(
+    coverage,
+    output_file=None,
+    show_grid=True,
+    region=None,
+    render="raster",
+    outlines=True,
+):
+    """Plot the DTED coverage on a map."""
+    coverage_figure(coverage, show_grid, region, render, outlines)
 
     # Save the figure if output file is specified
     if output_file:
@@ -343,20 +382,105 @@ def plot_coverage(coverage, output_file=None, show_grid=True, region=None):
     plt.show()
 
 
+BATCH_FORMATS = ("png", "svg", "pdf", "jpg", "tif")
+
+# Set in each batch worker by _init_batch_worker.
+_batch_coverage = None
+_batch_options = None
+
+
+def region_slug(text):
+    """Return a file name part for a --batch region such as NW or a box."""
+    if text.lower() == "all":
+        return "all"
+    if text.upper() in QUADRANTS:
+        return text.upper()
+    if os.path.isfile(text):
+        return os.path.splitext(os.path.basename(text))[0]
+    return re.sub(r"[^0-9A-Za-z.-]+", "_", text).strip("_")
+
+
+def _init_batch_worker(coverage, options):
+    global _batch_coverage, _batch_options
+    _batch_coverage = coverage
+    _batch_options = options
+
+
+def render_batch_job(region, outputs):
+    """Draw one region's map and save it to each of ``outputs``."""
+    start = time.perf_counter()
+    fig = coverage_figure(_batch_coverage, region=region, **_batch_options)
+    for output_file in outputs:
+        fig.savefig(output_file, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+    return outputs, time.perf_counter() - start
+
+
+def render_batch(
+    coverage,
+    regions,
+    output_dir,
+    formats=("png",),
+    jobs=None,
+    show_grid=True,
+    render="raster",
+    outlines=True,
+    prefix="coverage",
+):
+    """Render a map per region from one loaded ``coverage``.
+
+    ``regions`` are --region arguments, or "all" for the whole coverage;
+    each map is drawn once and saved as ``<prefix>_<region>.<format>`` for
+    every format. Maps are drawn in parallel worker processes. Returns the
+    paths written.
+    """
+    work = []
+    for text in regions:
+        region = None if text.lower() == "all" else parse_region(text)
+        if region is not None and not filter_by_region(coverage, region):
+            print(f"No data found in {region.label}, skipping.")
+            continue
+        name = f"{prefix}_{region_slug(text)}"
+        outputs = [os.path.join(output_dir, f"{name}.{fmt}") for fmt in formats]
+        work.append((region, outputs))
+    if not work:
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    options = {"show_grid": show_grid, "render": render, "outlines": outlines}
+    jobs = min(jobs or os.cpu_count() or 1, len(work))
+    written = []
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_batch_worker,
+        initargs=(coverage, options),
+    ) as executor:
+        futures = [
+            executor.submit(render_batch_job, region, outputs)
+            for region, outputs in work
+        ]
+        for future in futures:
+            outputs, elapsed = future.result()
+            print(f"Coverage map saved to {', '.join(outputs)} ({elapsed:.1f}s)")
+            written.extend(outputs)
+    return written
+
+
 def print_region_summary(coverage, region=None):
     """Print summary of coverage, filtered by region if specified."""
     if region:
+        region = as_region(region)
         filtered = filter_by_region(coverage, region)
         filtered_total = sum(len(cells) for cells in filtered.values())
 
-        print(f"\nFiltered by {region} region:")
+        print(f"\nFiltered to {region.label}:")
         for level, cells in filtered.items():
             count = len(cells)
             print(f"  Level {level}: {count} cells")
         print(f"  Total: {filtered_total} cells")
 
         if filtered_total == 0:
-            print(f"No data found in the {region} region.")
+            print(f"No data found in {region.label}.")
             return False
         return True
     else:
@@ -364,28 +488,202 @@ def print_region_summary(coverage, region=None):
         return total_cells > 0
 
 
+def open_coverage(args):
+    """Load the coverage named on the command line.
+
+    Returns ``(coverage, cache)``; coverage is None if it could not be read.
+    """
+    cache = None
+    if os.path.isdir(args.directory):
+        print(f"Scanning directory: {args.directory}")
+        if not args.no_cache:
+            cache = ScanCache(args.cache_file)
+            if args.clear_cache:
+                cache.clear()
+            else:
+                cache.load()
+    else:
+        print(f"Reading coverage from: {args.directory}")
+    try:
+        coverage = load_coverage(args.directory, args.scan_threads, cache)
+    except (ValueError, OSError) as e:
+        print(f"Error loading coverage - {e}")
+        return None, cache
+    if cache is not None:
+        print(
+            f"Scan cache: {cache.hits} directories reused, "
+            f"{cache.misses} listed ({cache.cache_file})"
+        )
+    return coverage, cache
+
+
+def coverage_summary(coverage, region=None):
+    """Return the cell counts per level, and within ``region``, as a dict."""
+    summary = {
+        "levels": {str(level): len(cells) for level, cells in sorted(coverage.items())},
+        "total": sum(len(cells) for cells in coverage.values()),
+    }
+    if region:
+        region = as_region(region)
+        filtered = filter_by_region(coverage, region)
+        summary["region"] = {
+            "label": region.label,
+            "bounds": list(region.bounds),
+            "levels": {
+                str(level): len(cells) for level, cells in sorted(filtered.items())
+            },
+            "total": sum(len(cells) for cells in filtered.values()),
+        }
+    return summary
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Visualize DTED data coverage from a directory structure."
     )
     parser.add_argument(
-        "directory", help="Directory containing DTED data in format w115/n32.dt2"
+        "directory",
+        help="Directory containing DTED data in format w115/n32.dt2, "
+        "an index.zip/index.bin from create_index.py, or a zip of DTED tiles",
     )
     parser.add_argument(
         "--output", "-o", help="Output file path (e.g., coverage_map.png)"
     )
     parser.add_argument("--no-grid", action="store_true", help="Disable grid lines")
     parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Only print the coverage summary; matplotlib is not loaded",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Only print the coverage summary as JSON on stdout",
+    )
+    parser.add_argument(
+        "--render",
+        choices=RENDER_MODES,
+        default="raster",
+        help="Draw cells as one image per level (raster) or one patch per cell",
+    )
+    parser.add_argument(
+        "--no-outlines", action="store_true", help="Do not outline the covered cells"
+    )
+    parser.add_argument(
+        "--tiles", help="Render a z/x/y PNG tile pyramid for web maps into DIR"
+    )
+    coverage_tiles.add_arguments(parser)
+    parser.add_argument(
+        "--preview",
+        help="Render a shaded elevation preview PNG of a DTED directory into FILE",
+    )
+    elevation_preview.add_arguments(parser)
+    parser.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="REGION",
+        help="Render one map per region (a --region value, or all) from a "
+        "single scan; quote a space-separated list to pass boxes such as "
+        "'all NW -125,32,-114,42'",
+    )
+    parser.add_argument(
+        "--formats",
+        default="png",
+        help="Comma-separated --batch output formats (default: png)",
+    )
+    parser.add_argument(
+        "--batch-dir",
+        default=".",
+        help="Directory for --batch maps (default: current directory)",
+    )
+    parser.add_argument(
+        "--batch-jobs",
+        type=int,
+        default=0,
+        help="Processes rendering --batch maps (default: 0, one per CPU)",
+    )
+    parser.add_argument(
+        "--scan-threads",
+        type=int,
+        help="Threads listing directories (default: auto, 1 to scan serially)",
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="Scan cache location (default: ~/.cache/dted-tools/scan-cache.json)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Scan the whole directory without reading or writing the scan cache",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Discard the scan cache before scanning",
+    )
+    regions = parser.add_mutually_exclusive_group()
+    regions.add_argument(
         "--region",
         "-r",
-        choices=["N", "S", "E", "W", "NW", "NE", "SW", "SE"],
-        help="Filter by region (N=North, S=South, E=East, W=West, or combinations for quadrants)",
+        help="Filter by region (N=North, S=South, E=East, W=West, or combinations "
+        "for quadrants), a min_lon,min_lat,max_lon,max_lat box or a GeoJSON file; "
+        "attach boxes with a negative longitude, e.g. --region=-125,32,-114,42",
+    )
+    regions.add_argument(
+        "--bbox",
+        nargs=4,
+        type=float,
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+        help="Filter by a bounding box",
+    )
+    regions.add_argument(
+        "--geojson", help="Filter by a GeoJSON (Multi)Polygon, e.g. a state boundary"
     )
 
     args = parser.parse_args()
 
-    print(f"Scanning directory: {args.directory}")
-    coverage = scan_directory(args.directory)
+    try:
+        if args.bbox:
+            region = BBoxRegion(*args.bbox)
+        elif args.geojson:
+            region = load_geojson(args.geojson)
+        else:
+            region = as_region(args.region)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    if args.preview and not os.path.isdir(args.directory):
+        parser.error("--preview needs a directory of DTED tiles")
+    batch_regions = [text for value in args.batch or () for text in value.split()]
+    formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    for fmt in formats:
+        if fmt not in BATCH_FORMATS:
+            parser.error(f"Unsupported format: {fmt} (choose from {BATCH_FORMATS})")
+    for text in batch_regions:
+        if text.lower() != "all":
+            try:
+                parse_region(text)
+            except (ValueError, OSError) as e:
+                parser.error(str(e))
+
+    start = time.perf_counter()
+    if args.json:
+        # Progress goes to stderr so stdout holds only the JSON document.
+        with contextlib.redirect_stdout(sys.stderr):
+            coverage, cache = open_coverage(args)
+    else:
+        coverage, cache = open_coverage(args)
+    if coverage is None:
+        return 1 if args.summary or args.json else None
+
+    if args.json:
+        summary = coverage_summary(coverage, region)
+        summary["source"] = args.directory
+        if cache is not None:
+            summary["scan_cache"] = {"hits": cache.hits, "misses": cache.misses}
+        summary["seconds"] = round(time.perf_counter() - start, 6)
+        print(json.dumps(summary, indent=2))
+        found = summary["region"]["total"] if region else summary["total"]
+        return 0 if found else 1
 
     # Print summary of all data
     print("\nDTED Coverage Summary:")
@@ -397,18 +695,92 @@ def main():
     print(f"  Total: {total_cells} cells")
 
     if total_cells == 0:
-        print("No DTED data found. Check your directory structure.")
-        return
+        print("No DTED data found. Check your directory structure or archive.")
+        return 1 if args.summary else None
 
     # Print region-specific summary if requested
-    has_data = print_region_summary(coverage, args.region)
+    has_data = print_region_summary(coverage, region)
 
+    if args.summary:
+        return 0 if has_data else 1
     if not has_data:
         return
 
+    if batch_regions:
+        start = time.perf_counter()
+        try:
+            written = render_batch(
+                coverage,
+                batch_regions,
+                args.batch_dir,
+                formats,
+                args.batch_jobs or None,
+                not args.no_grid,
+                args.render,
+                not args.no_outlines,
+            )
+        except (ValueError, OSError) as e:
+            print(f"Error rendering batch maps - {e}")
+            return
+        print(
+            f"Rendered {len(written)} maps in {time.perf_counter() - start:.1f}s "
+            f"into {args.batch_dir}"
+        )
+
+    if args.tiles:
+        start = time.perf_counter()
+        try:
+            totals = coverage_tiles.build_pyramid(
+                filter_by_region(coverage, region),
+                args.tiles,
+                args.min_zoom,
+                args.max_zoom,
+                args.tile_jobs or None,
+                not args.no_outlines,
+            )
+        except (ValueError, OSError) as e:
+            print(f"Error rendering tiles - {e}")
+            return
+        print(
+            coverage_tiles.format_totals(
+                totals, args.tiles, time.perf_counter() - start
+            )
+        )
+
+    if args.preview:
+        start = time.perf_counter()
+        try:
+            elevation_preview.render_preview(
+                args.directory,
+                args.preview,
+                region,
+                args.preview_level,
+                args.preview_style,
+                args.resolution,
+                args.max_size,
+                args.preview_jobs or None,
+                args.scan_threads,
+                cache,
+            )
+        except (ValueError, OSError) as e:
+            print(f"Error rendering elevation preview - {e}")
+            return
+        print(f"Elevation preview rendered in {time.perf_counter() - start:.1f}s")
+
+    # The other modes replace the map unless --output also asks for it.
+    if not args.output and (batch_regions or args.tiles or args.preview):
+        return
+
     # Plot the coverage
-    plot_coverage(coverage, args.output, not args.no_grid, args.region)
+    plot_coverage(
+        coverage,
+        args.output,
+        not args.no_grid,
+        region,
+        args.render,
+        not args.no_outlines,
+    )
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
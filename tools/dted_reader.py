@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+dted_reader.py
+
+Read and validate DTED tiles (MIL-PRF-89020B).
+
+A tile is a 80 byte User Header Label (UHL), a 648 byte Data Set
+Identification (DSI) record and a 2700 byte Accuracy Description (ACC)
+record, followed by one data record per longitude line. Each data record is
+a 0xAA sentinel, a 3 byte block count, 2 byte longitude and latitude counts,
+the elevation posts south to north as 16-bit signed-magnitude big-endian
+values, and a 4 byte checksum that is the sum of all preceding bytes of the
+record.
+
+DTEDTile memory-maps the file (or wraps bytes already in memory, e.g. a zip
+member) and exposes the records as a NumPy view, so checksums and elevations
+are decoded with whole-array operations instead of per-post loops.
+
+Usage:
+
+    python dted_reader.py <tile> [<tile> ...]
+"""
+
+import mmap
+import os
+import re
+import zipfile
+
+import numpy as np
+
+UHL_SIZE = 80
+DSI_SIZE = 648
+ACC_SIZE = 2700
+HEADER_SIZE = UHL_SIZE + DSI_SIZE + ACC_SIZE
+RECORD_OVERHEAD = 12  # sentinel, block count, lon/lat counts and checksum
+SENTINEL = 0xAA
+VOID = -32767
+
+# Latitude post interval in tenths of arc-seconds per level. MIL-PRF-89020B
+# only defines levels 0-2; other levels are read but their spacing is not
+# checked.
+LAT_INTERVALS = {0: 300, 1: 30, 2: 10}
+
+# Longitude interval multiplier per latitude zone, (zone upper bound, factor).
+LON_ZONES = ((50, 1), (70, 2), (75, 3), (80, 4), (90, 6))
+
+_TILE_NAME = re.compile(r"^([ns])(\d+)\.dt(\d)(?:\.zip)?$")
+
+
+class DTEDError(ValueError):
+    """Raised when a tile is not structurally valid DTED."""
+
+
+def lon_factor(lat):
+    """Longitude interval multiplier for the tile whose south edge is ``lat``."""
+    equator_edge = lat if lat >= 0 else -(lat + 1)
+    for bound, factor in LON_ZONES:
+        if equator_edge < bound:
+            return factor
+    return LON_ZONES[-1][1]
+
+
+def expected_intervals(lat, level):
+    """Return ``(lon_interval, lat_interval)`` in tenths of arc-seconds."""
+    lat_interval = LAT_INTERVALS[level]
+    return lat_interval * lon_factor(lat), lat_interval
+
+
+def parse_tile_name(ew_name, ns_name):
+    """Return ``(lon, lat, level)`` for ``w115``, ``n32.dt2`` style names."""
+    match = _TILE_NAME.match(ns_name.lower())
+    ew_digits = "".join(filter(str.isdigit, ew_name))
+    if not match or not ew_digits or ew_name[:1].lower() not in ("e", "w"):
+        raise DTEDError(f"Unrecognized tile name: {ew_name}/{ns_name}")
+    lon = int(ew_digits) * (-1 if ew_name[:1].lower() == "w" else 1)
+    lat = int(match.group(2)) * (-1 if match.group(1) == "s" else 1)
+    return lon, lat, int(match.group(3))
+
+
+def _parse_angle(text, degree_digits):
+    """Parse ``DDDMMSSH`` (or ``DDMMSSH``) into signed decimal degrees."""
+    try:
+        degrees = int(text[:degree_digits])
+        minutes = int(text[degree_digits : degree_digits + 2])
+        seconds = int(text[degree_digits + 2 : degree_digits + 4])
+    except ValueError:
+        raise DTEDError(f"Invalid angle field: {text!r}") from None
+    hemisphere = text[-1:].upper()
+    if hemisphere not in ("N", "S", "E", "W"):
+        raise DTEDError(f"Invalid hemisphere in angle field: {text!r}")
+    value = degrees + minutes / 60.0 + seconds / 3600.0
+    return -value if hemisphere in ("S", "W") else value
+
+
+def _int_field(buf, start, size, name):
+    text = bytes(buf[start : start + size]).decode("ascii", "replace")
+    try:
+        return int(text)
+    except ValueError:
+        raise DTEDError(f"Invalid {name}: {text!r}") from None
+
+
+class DTEDTile:
+    """Parsed headers and a NumPy view of the data records of one tile."""
+
+    def __init__(self, buffer, name=None):
+        self.name = name
+        self._map = None
+        self._buffer = buffer
+        if len(buffer) < HEADER_SIZE:
+            raise DTEDError(f"File too short for DTED headers: {len(buffer)} bytes")
+
+        uhl = bytes(buffer[:UHL_SIZE]).decode("ascii", "replace")
+        dsi = bytes(buffer[UHL_SIZE : UHL_SIZE + DSI_SIZE]).decode("ascii", "replace")
+        acc = bytes(buffer[UHL_SIZE + DSI_SIZE : HEADER_SIZE]).decode(
+            "ascii", "replace"
+        )
+        if not uhl.startswith("UHL1"):
+            raise DTEDError("Missing UHL1 sentinel")
+        if not dsi.startswith("DSI"):
+            raise DTEDError("Missing DSI sentinel")
+        if not acc.startswith("ACC"):
+            raise DTEDError("Missing ACC sentinel")
+
+        self.lon_origin = _parse_angle(uhl[4:12], 3)
+        self.lat_origin = _parse_angle(uhl[12:20], 3)
+        self.lon_interval = _int_field(buffer, 20, 4, "longitude interval")
+        self.lat_interval = _int_field(buffer, 24, 4, "latitude interval")
+        self.lon_lines = _int_field(buffer, 47, 4, "number of longitude lines")
+        self.lat_points = _int_field(buffer, 51, 4, "number of latitude points")
+        self.security = dsi[3]
+
+        series = dsi[59:64]
+        if not (series.startswith("DTED") and series[4:].isdigit()):
+            raise DTEDError(f"Invalid DSI product level: {series!r}")
+        self.level = int(series[4:])
+
+        self.record_size = RECORD_OVERHEAD + 2 * self.lat_points
+        expected_size = HEADER_SIZE + self.lon_lines * self.record_size
+        if len(buffer) < expected_size:
+            raise DTEDError(
+                f"Truncated tile: {len(buffer)} bytes, headers declare {expected_size}"
+            )
+        self.records = np.frombuffer(
+            buffer,
+            dtype=np.uint8,
+            count=self.lon_lines * self.record_size,
+            offset=HEADER_SIZE,
+        ).reshape(self.lon_lines, self.record_size)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map ``path``; a ``.zip`` tile is read from its DTED member."""
+        if path.lower().endswith(".zip"):
+            return cls(read_zip_member(path), name=path)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                raise DTEDError(f"Empty tile: {path}")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            tile = cls(mapped, name=path)
+        except Exception:
+            mapped.close()
+            raise
+        tile._map = mapped
+        return tile
+
+    def bad_sentinels(self):
+        """Return the indices of records without the 0xAA sentinel."""
+        return np.flatnonzero(self.records[:, 0] != SENTINEL)
+
+    def bad_checksums(self):
+        """Return the indices of records whose checksum does not match."""
+        computed = self.records[:, :-4].sum(axis=1, dtype=np.uint32)
+        stored = self.records[:, -4:].copy().view(">u4").ravel()
+        return np.flatnonzero(computed != stored)
+
+    def elevations(self):
+        """Return an int16 (lon_lines, lat_points) array, west to east, south to north."""
+        raw = self.records[:, 8:-4].copy().view(">u2").astype(np.int32)
+        values = np.where(raw & 0x8000, -(raw & 0x7FFF), raw)
+        return values.astype(np.int16)
+
+    def problems(self, lon=None, lat=None, level=None):
+        """Return a list of validation problems, empty if the tile is valid.
+
+        ``lon``, ``lat`` and ``level`` are the values implied by the file
+        name; the origin, declared level and post spacing must agree with them.
+        """
+        problems = []
+        if lon is not None and self.lon_origin != lon:
+            problems.append(f"longitude origin {self.lon_origin} does not match {lon}")
+        if lat is not None and self.lat_origin != lat:
+            problems.append(f"latitude origin {self.lat_origin} does not match {lat}")
+        if level is not None and self.level != level:
+            problems.append(
+                f"DSI declares DTED{self.level}, file name says DTED{level}"
+            )
+
+        if self.level in LAT_INTERVALS:
+            # A reduced-resolution grid (such as generate_dted.py --posts)
+            # spaces its posts a whole multiple of the standard interval apart;
+            # that it still spans one degree is checked below.
+            expected = expected_intervals(int(np.floor(self.lat_origin)), self.level)
+            spacing = (self.lon_interval, self.lat_interval)
+            if any(
+                actual <= 0 or actual % standard
+                for actual, standard in zip(spacing, expected)
+            ):
+                problems.append(
+                    f"post spacing {self.lon_interval}x{self.lat_interval} does not "
+                    f"match DTED{self.level} ({expected[0]}x{expected[1]})"
+                )
+        if (self.lat_points - 1) * self.lat_interval != 36000 or (
+            self.lon_lines - 1
+        ) * self.lon_interval != 36000:
+            problems.append(
+                f"{self.lon_lines}x{self.lat_points} posts do not span one degree "
+                f"at {self.lon_interval}x{self.lat_interval} spacing"
+            )
+
+        bad = self.bad_sentinels()
+        if bad.size:
+            problems.append(f"{bad.size} records without sentinel, first {bad[0]}")
+        bad = self.bad_checksums()
+        if bad.size:
+            problems.append(f"{bad.size} records with bad checksums, first {bad[0]}")
+        return problems
+
+    def close(self):
+        self.records = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_zip_member(path):
+    """Return the bytes of the DTED member of a single-tile zip."""
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if re.search(r"\.dt\d$", info.filename.lower()):
+                return zf.read(info)
+    raise DTEDError(f"No DTED member in {path}")
+
+
+def validate_tile(path, lon=None, lat=None, level=None):
+    """Return a list of problems with the tile at ``path``, empty if valid."""
+    try:
+        with DTEDTile.open(path) as tile:
+            return tile.problems(lon, lat, level)
+    except (DTEDError, OSError, zipfile.BadZipFile) as e:
+        return [str(e)]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage:\n  python dted_reader.py <tile> [<tile> ...]")
+        sys.exit(1)
+
+    failed = 0
+    for path in sys.argv[1:]:
+        try:
+            expected = parse_tile_name(
+                os.path.basename(os.path.dirname(os.path.abspath(path))),
+                os.path.basename(path),
+            )
+        except DTEDError:
+            expected = (None, None, None)
+        problems = validate_tile(path, *expected)
+        if problems:
+            failed += 1
+            print(f"{path}: INVALID")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"{path}: OK")
+    sys.exit(1 if failed else 0)
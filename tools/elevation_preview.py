@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+elevation_preview.py
+
+Render a hillshade or color-ramped preview of the elevations in a DTED tree.
+
+Each tile is decoded with dted_reader, its posts are averaged down to the
+preview resolution (void posts are skipped), and the block is placed into a
+mosaic of the region. Tiles are decoded on a process pool with a bounded
+number in flight, and the mosaic is a memory-mapped temporary file, so
+memory stays bounded by the pool rather than by the region: a hemisphere
+preview needs no more RAM than a state. The image is then shaded and
+written as a PNG a strip of rows at a time.
+
+Where a cell has several levels the highest is used, so a DTED2 overlay
+shows over the DTED0 base; ``level`` restricts the preview to one level.
+
+Usage:
+
+    python elevation_preview.py <directory> <output.png> [options]
+"""
+
+import math
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from coverage_scan import iter_tile_files
+from coverage_tiles import write_png
+from dted_reader import VOID, DTEDError, DTEDTile
+
+STYLES = ("shaded", "hillshade", "color")
+
+# Hypsometric color ramp, (elevation in meters, RGB 0-255)
+COLOR_RAMP = (
+    (-400, (40, 90, 160)),
+    (0, (70, 130, 90)),
+    (300, (120, 170, 90)),
+    (1000, (210, 200, 120)),
+    (2000, (170, 120, 70)),
+    (3000, (140, 110, 100)),
+    (4500, (245, 245, 245)),
+)
+
+# Sun position for the hillshade, degrees
+AZIMUTH = 315.0
+ALTITUDE = 45.0
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111320.0
+
+STRIP_ROWS = 256
+
+
+def find_tiles(root_dir, level=None, threads=None, cache=None):
+    """Return ``{(lon, lat): (level, path)}`` of the best tile per cell.
+
+    Raw and ``.dtN.zip`` tiles are both read. With ``level`` only tiles of
+    that level are used. The tree is listed by coverage_scan on ``threads``;
+    with a ScanCache, such as the one the visualizer just scanned with,
+    unchanged directories are not listed again and the cache is saved.
+    """
+    tiles = {}
+    for lon, lat, tile_level, path in iter_tile_files(root_dir, threads, cache):
+        if level is not None and tile_level != level:
+            continue
+        best = tiles.get((lon, lat))
+        if best is None or tile_level > best[0]:
+            tiles[(lon, lat)] = (tile_level, path)
+    if cache is not None:
+        cache.save(root_dir)
+    return tiles
+
+
+def _bins(posts, pixels):
+    """Return the first post of each of ``pixels`` bins over ``posts`` posts."""
+    if posts >= pixels:
+        return np.arange(pixels) * posts // pixels
+    return None
+
+
+def decimate(elevations, pixels):
+    """Average a (lon_lines, lat_points) tile down to a (pixels, pixels) block.
+
+    The result is float32, north up and west left, with NaN where every post
+    in a pixel is void. The last line and point of a tile duplicate the
+    first ones of its neighbors and are dropped. A tile with fewer posts
+    than ``pixels`` is enlarged by repeating posts.
+    """
+    # North up: rows are latitude points from north to south.
+    grid = elevations[:-1, :-1].T[::-1].astype(np.float32)
+    valid = grid != VOID
+    grid[~valid] = 0
+    for axis in (0, 1):
+        posts = grid.shape[axis]
+        starts = _bins(posts, pixels)
+        if starts is None:
+            index = np.arange(pixels) * posts // pixels
+            grid = np.take(grid, index, axis=axis)
+            valid = np.take(valid, index, axis=axis)
+        else:
+            grid = np.add.reduceat(grid, starts, axis=axis)
+            valid = np.add.reduceat(valid.astype(np.int32), starts, axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid > 0, grid / np.maximum(valid, 1), np.nan).astype(
+            np.float32
+        )
+
+
+def load_block(job):
+    """Decode and decimate one tile; returns ``(lon, lat, block or None)``."""
+    lon, lat, path, pixels = job
+    try:
+        with DTEDTile.open(path) as tile:
+            block = decimate(tile.elevations(), pixels)
+    except (DTEDError, OSError, ValueError) as e:
+        print(f"Error reading tile {path} - {e}")
+        return lon, lat, None
+    return lon, lat, block
+
+
+def color_ramp(elevations):
+    """Return (rows, cols, 3) float colors in 0-1 for the elevations."""
+    stops = np.array([stop for stop, _ in COLOR_RAMP], dtype=np.float32)
+    colors = np.array([color for _, color in COLOR_RAMP], dtype=np.float32) / 255
+    values = np.nan_to_num(elevations, nan=0.0)
+    return np.stack([np.interp(values, stops, colors[:, i]) for i in range(3)], axis=-1)
+
+
+def hillshade(elevations, dx, dy):
+    """Return 0-1 illumination of an elevation strip.
+
+    ``dx`` is the pixel width in meters per row (it shrinks with latitude)
+    and ``dy`` the pixel height in meters.
+    """
+    values = np.nan_to_num(elevations, nan=0.0)
+    dz_dy, dz_dx = np.gradient(values)
+    slope_x = dz_dx / dx[:, None]
+    # Rows run north to south, so the row gradient is minus d/dnorth.
+    slope_y = -dz_dy / dy
+    azimuth = math.radians(AZIMUTH)
+    altitude = math.radians(ALTITUDE)
+    normal = np.sqrt(1 + slope_x**2 + slope_y**2)
+    # Light comes from the azimuth, measured clockwise from north.
+    light = (
+        math.sin(altitude)
+        - math.cos(altitude) * math.sin(azimuth) * slope_x
+        - math.cos(altitude) * math.cos(azimuth) * slope_y
+    ) / normal
+    return np.clip(light, 0, 1)
+
+
+def shade_strips(mosaic, north, pixels, style):
+    """Yield RGBA uint8 strips of the shaded mosaic, top to bottom.
+
+    Each strip is shaded with one row of context above and below so the
+    gradients are continuous across strips.
+    """
+    height = mosaic.shape[0]
+    dy = METERS_PER_DEGREE / pixels
+    for top in range(0, height, STRIP_ROWS):
+        bottom = min(top + STRIP_ROWS, height)
+        lo, hi = max(top - 1, 0), min(bottom + 1, height)
+        strip = np.asarray(mosaic[lo:hi])
+        lats = north - (np.arange(lo, hi) + 0.5) / pixels
+        dx = dy * np.cos(np.radians(lats))
+
+        if style == "color":
+            rgb = color_ramp(strip)
+        else:
+            light = hillshade(strip, np.maximum(dx, 1e-3), dy)
+            if style == "hillshade":
+                rgb = np.repeat(light[..., None], 3, axis=-1)
+            else:
+                rgb = color_ramp(strip) * (0.35 + 0.65 * light[..., None])
+
+        rgba = np.empty(strip.shape + (4,), dtype=np.uint8)
+        rgba[..., :3] = np.rint(rgb * 255)
+        rgba[..., 3] = np.where(np.isnan(strip), 0, 255)
+        yield rgba[top - lo : top - lo + bottom - top]
+
+
+def preview_bounds(cells, bounds=None):
+    """Return integer ``(west, south, east, north)`` of the preview.
+
+    The extent of ``cells`` is clipped to ``bounds``, a region's bounds, so
+    a hemisphere region around a few tiles does not size a hemisphere
+    mosaic.
+    """
+    lons = [lon for lon, _ in cells]
+    lats = [lat for _, lat in cells]
+    west, south, east, north = min(lons), min(lats), max(lons) + 1, max(lats) + 1
+    if bounds is not None:
+        min_lon, min_lat, max_lon, max_lat = bounds
+        west = max(west, math.floor(min_lon))
+        south = max(south, math.floor(min_lat))
+        east = min(east, math.ceil(max_lon))
+        north = min(north, math.ceil(max_lat))
+    return west, south, east, north
+
+
+def render_preview(
+    root_dir,
+    output_file,
+    region=None,
+    level=None,
+    style="shaded",
+    resolution=None,
+    max_size=4096,
+    jobs=None,
+    threads=None,
+    cache=None,
+):
+    """Render the elevation preview of ``root_dir`` into ``output_file``.
+
+    ``region`` is a coverage_filter region (its cells and bounds are used),
+    ``resolution`` the pixels per degree; by default the largest that keeps
+    the image within ``max_size`` pixels on each side, capped at the
+    posts of the best level present. ``threads`` and ``cache`` are passed
+    to find_tiles(). Returns the number of tiles drawn, or None if there was
+    nothing to draw.
+    """
+    if style not in STYLES:
+        raise ValueError(f"Unknown preview style: {style}")
+    tiles = find_tiles(root_dir, level, threads, cache)
+    if region is not None and tiles:
+        cells = np.array(list(tiles), dtype=np.int32)
+        keep = region.contains(cells[:, 0], cells[:, 1])
+        tiles = {
+            (int(lon), int(lat)): tiles[(int(lon), int(lat))]
+            for lon, lat in cells[keep]
+        }
+    if not tiles:
+        print("No DTED tiles found for the elevation preview.")
+        return None
+
+    west, south, east, north = preview_bounds(
+        tiles, region.bounds if region is not None else None
+    )
+    if resolution is None:
+        best_level = max(tile_level for tile_level, _ in tiles.values())
+        full = {0: 120, 1: 1200, 2: 3600}.get(best_level, 3600)
+        resolution = max(1, min(full, max_size // max(east - west, north - south)))
+    width = (east - west) * resolution
+    height = (north - south) * resolution
+
+    jobs = jobs or os.cpu_count() or 1
+    fd, mosaic_file = tempfile.mkstemp(
+        suffix=".npy", dir=os.path.dirname(os.path.abspath(output_file))
+    )
+    os.close(fd)
+    drawn = 0
+    try:
+        mosaic = np.lib.format.open_memmap(
+            mosaic_file, mode="w+", dtype=np.float32, shape=(height, width)
+        )
+        mosaic[:] = np.nan
+        work = iter(
+            (lon, lat, path, resolution)
+            for (lon, lat), (_, path) in sorted(tiles.items())
+            if west <= lon < east and south <= lat < north
+        )
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Keep a few tiles per worker in flight so decoded blocks never
+            # pile up in memory.
+            pending = set()
+            while True:
+                while len(pending) < jobs * 4:
+                    job = next(work, None)
+                    if job is None:
+                        break
+                    pending.add(executor.submit(load_block, job))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    lon, lat, block = future.result()
+                    if block is None:
+                        continue
+                    row = (north - lat - 1) * resolution
+                    col = (lon - west) * resolution
+                    mosaic[row : row + resolution, col : col + resolution] = block
+                    drawn += 1
+        mosaic.flush()
+        write_png(
+            output_file, width, height, shade_strips(mosaic, north, resolution, style)
+        )
+        del mosaic
+    finally:
+        os.remove(mosaic_file)
+    print(
+        f"Elevation preview saved to {output_file} ({width}x{height}, "
+        f"{resolution} px/degree, {drawn} tiles)"
+    )
+    return drawn
+
+
+def add_arguments(parser):
+    """Add the preview options shared by the command line tools."""
+    parser.add_argument(
+        "--preview-style",
+        choices=STYLES,
+        default="shaded",
+        help="Color ramp with hillshade (shaded), hillshade or color (default: shaded)",
+    )
+    parser.add_argument(
+        "--preview-level", type=int, help="Only preview tiles of this DTED level"
+    )
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        help="Preview pixels per degree (default: fit --max-size)",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=4096,
+        help="Largest preview side in pixels when --resolution is not set",
+    )
+    parser.add_argument(
+        "--preview-jobs",
+        type=int,
+        default=0,
+        help="Processes decoding tiles (default: 0, one per CPU)",
+    )
+
+
+def main():
+    import argparse
+
+    from coverage_filter import parse_region
+
+    parser = argparse.ArgumentParser(
+        description="Render an elevation preview of a DTED directory tree."
+    )
+    parser.add_argument("directory", help="Directory containing w115/n32.dt2 tiles")
+    parser.add_argument("output", help="Output PNG file")
+    parser.add_argument(
+        "--region",
+        "-r",
+        help="Quadrant, min_lon,min_lat,max_lon,max_lat or GeoJSON; attach "
+        "boxes with a negative longitude: --region=-125,32,-114,42",
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        region = parse_region(args.region) if args.region else None
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    drawn = render_preview(
+        args.directory,
+        args.output,
+        region,
+        args.preview_level,
+        args.preview_style,
+        args.resolution,
+        args.max_size,
+        args.preview_jobs or None,
+    )
+    return 0 if drawn else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+generate_dted.py
+
+Generate synthetic DTED trees for benchmarks and offline testing.
+
+Tiles are written in the layout create_index.py expects (``w115/n32.dt2``)
+and follow MIL-PRF-89020B: UHL, DSI and ACC headers followed by one data
+record per longitude line with sentinel, counts, signed-magnitude posts and
+checksum. Post spacing follows the level and latitude zone, so a full-size
+DTED2 tile is about 25 MB; ``posts`` caps the number of posts per axis to
+keep large trees small while leaving the headers consistent with the data.
+A capped count is rounded down so the posts still span exactly one degree
+at a whole multiple of the standard spacing, which dted_reader accepts as a
+reduced-resolution grid.
+
+The elevations are a smooth function of longitude and latitude, so adjacent
+tiles join up and previews look like terrain rather than noise.
+
+Usage:
+
+    python generate_dted.py <output directory> [options]
+
+Options:
+    --bbox MIN_LON MIN_LAT MAX_LON MAX_LAT
+                        Tile range, south-west corners, max exclusive
+                        (default: -125 32 -114 42, roughly California)
+    --level {0,1,2}     DTED level (default: 0)
+    --posts N           Cap posts per axis (default: full size)
+    --zip-tiles         Write each tile as <tile>.dtN.zip
+    --archive FILE      Also write a hemisphere-style zip of the tiles
+"""
+
+import argparse
+import os
+import zipfile
+
+import numpy as np
+
+from dted_reader import (
+    ACC_SIZE,
+    DSI_SIZE,
+    LAT_INTERVALS,
+    SENTINEL,
+    UHL_SIZE,
+    expected_intervals,
+)
+
+
+def tile_name(lon, lat, level):
+    """Return ``w115/n32.dt2`` style relative path of a tile."""
+    ew = f"{'w' if lon < 0 else 'e'}{abs(lon):03d}"
+    ns = f"{'s' if lat < 0 else 'n'}{abs(lat):02d}"
+    return f"{ew}/{ns}.dt{level}"
+
+
+# The headers hold post spacing in four digits (up to 999.9 arc-seconds), so
+# a capped axis keeps at least this many posts across its one degree.
+MIN_POSTS = 5
+
+
+def _capped(full, posts):
+    """Return the most posts up to ``posts`` that evenly thin a ``full`` axis."""
+    count = min(full, max(posts, MIN_POSTS))
+    while (full - 1) % (count - 1):
+        count -= 1
+    if count < MIN_POSTS:
+        count = MIN_POSTS
+        while (full - 1) % (count - 1):
+            count += 1
+    return count
+
+
+def post_counts(lat, level, posts=None):
+    """Return ``(lon_lines, lat_points)`` for a tile."""
+    lon_interval, lat_interval = expected_intervals(lat, level)
+    lon_lines = 36000 // lon_interval + 1
+    lat_points = 36000 // lat_interval + 1
+    if posts:
+        lon_lines = _capped(lon_lines, posts)
+        lat_points = _capped(lat_points, posts)
+    return lon_lines, lat_points
+
+
+def synthetic_elevations(lon, lat, lon_lines, lat_points):
+    """Return an int16 (lon_lines, lat_points) array of elevations in meters."""
+    x = lon + np.linspace(0.0, 1.0, lon_lines)[:, None]
+    y = lat + np.linspace(0.0, 1.0, lat_points)[None, :]
+    elevation = (
+        600.0
+        + 900.0 * np.sin(x * 0.35) * np.cos(y * 0.45)
+        + 350.0 * np.sin(x * 2.3 + y * 1.7)
+        + 120.0 * np.sin(x * 11.0 - y * 7.0)
+        + 30.0 * np.cos(x * 41.0 + y * 37.0)
+    )
+    return np.clip(np.rint(elevation), -400, 8800).astype(np.int16)
+
+
+def _dms(value, width, hemispheres, decimal=False):
+    hemi = hemispheres[0] if value >= 0 else hemispheres[1]
+    seconds = "00.0" if decimal else "00"
+    return f"{abs(value):0{width}d}00{seconds}{hemi}"
+
+
+def _field(buf, offset, text):
+    data = text.encode("ascii")
+    buf[offset : offset + len(data)] = data
+
+
+def encode_headers(lon, lat, level, lon_lines, lat_points):
+    """Return the UHL, DSI and ACC headers of a tile as bytes."""
+    lon_interval, lat_interval = expected_intervals(lat, level)
+    full_lon, full_lat = post_counts(lat, level)
+    # A capped tile still spans one degree, so its spacing widens by a whole
+    # factor (see post_counts).
+    lon_interval = lon_interval * (full_lon - 1) // max(lon_lines - 1, 1)
+    lat_interval = lat_interval * (full_lat - 1) // max(lat_points - 1, 1)
+
+    uhl = bytearray(b" " * UHL_SIZE)
+    _field(uhl, 0, "UHL1")
+    _field(uhl, 4, _dms(lon, 3, "EW"))
+    _field(uhl, 12, _dms(lat, 3, "NS"))
+    _field(uhl, 20, f"{lon_interval:04d}")
+    _field(uhl, 24, f"{lat_interval:04d}")
+    _field(uhl, 28, "NA  ")
+    _field(uhl, 32, "U  ")
+    _field(uhl, 47, f"{lon_lines:04d}")
+    _field(uhl, 51, f"{lat_points:04d}")
+    _field(uhl, 55, "0")
+
+    dsi = bytearray(b" " * DSI_SIZE)
+    _field(dsi, 0, "DSIU")
+    _field(dsi, 59, f"DTED{level}")
+    _field(dsi, 87, "01")
+    _field(dsi, 141, "MSL")
+    _field(dsi, 144, "WGS84")
+    _field(dsi, 185, _dms(lat, 2, "NS", decimal=True))
+    _field(dsi, 194, _dms(lon, 3, "EW", decimal=True))
+    corners = ((lat, lon), (lat + 1, lon), (lat + 1, lon + 1), (lat, lon + 1))
+    for i, (corner_lat, corner_lon) in enumerate(corners):
+        _field(dsi, 204 + i * 15, _dms(corner_lat, 2, "NS"))
+        _field(dsi, 211 + i * 15, _dms(corner_lon, 3, "EW"))
+    _field(dsi, 264, "0000000.0")
+    _field(dsi, 273, f"{lat_interval:04d}")
+    _field(dsi, 277, f"{lon_interval:04d}")
+    _field(dsi, 281, f"{lat_points:04d}")
+    _field(dsi, 285, f"{lon_lines:04d}")
+    _field(dsi, 289, "00")
+
+    acc = bytearray(b" " * ACC_SIZE)
+    _field(acc, 0, "ACC")
+    _field(acc, 3, "NA  NA  NA  NA  ")
+
+    return bytes(uhl + dsi + acc)
+
+
+def encode_records(elevations):
+    """Encode an int16 (lon_lines, lat_points) array as DTED data records."""
+    lon_lines, lat_points = elevations.shape
+    records = np.zeros((lon_lines, 8 + 2 * lat_points + 4), dtype=np.uint8)
+    index = np.arange(lon_lines, dtype=np.uint32)
+    records[:, 0] = SENTINEL
+    records[:, 1] = (index >> 16) & 0xFF
+    records[:, 2] = (index >> 8) & 0xFF
+    records[:, 3] = index & 0xFF
+    records[:, 4] = (index >> 8) & 0xFF
+    records[:, 5] = index & 0xFF
+
+    values = elevations.astype(np.int32)
+    magnitude = np.where(values < 0, 0x8000 | -values, values).astype(">u2")
+    records[:, 8:-4] = magnitude.view(np.uint8).reshape(lon_lines, 2 * lat_points)
+
+    checksum = records[:, :-4].sum(axis=1, dtype=np.uint32).astype(">u4")
+    records[:, -4:] = checksum.view(np.uint8).reshape(lon_lines, 4)
+    return records.tobytes()
+
+
+def dted_bytes(lon, lat, level, posts=None):
+    """Return the complete contents of a synthetic DTED tile."""
+    lon_lines, lat_points = post_counts(lat, level, posts)
+    elevations = synthetic_elevations(lon, lat, lon_lines, lat_points)
+    return encode_headers(lon, lat, level, lon_lines, lat_points) + encode_records(
+        elevations
+    )
+
+
+def tiles_in_bbox(min_lon, min_lat, max_lon, max_lat):
+    """Yield ``(lon, lat)`` of every tile with its south-west corner in the box."""
+    for lon in range(min_lon, max_lon):
+        for lat in range(min_lat, max_lat):
+            yield lon, lat
+
+
+def generate_tree(root, tiles, level, posts=None, zip_tiles=False):
+    """Write ``tiles`` into ``root`` and return the relative paths written."""
+    written = []
+    for lon, lat in tiles:
+        name = tile_name(lon, lat, level)
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = dted_bytes(lon, lat, level, posts)
+        if zip_tiles:
+            path += ".zip"
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(os.path.basename(name), data)
+            written.append(name + ".zip")
+        else:
+            with open(path, "wb") as f:
+                f.write(data)
+            written.append(name)
+    return written
+
+
+def write_archive(archive, tiles, level, posts=None):
+    """Write ``tiles`` into a single zip laid out like ``dted_*_hemi.zip``."""
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for lon, lat in tiles:
+            zf.writestr(tile_name(lon, lat, level), dted_bytes(lon, lat, level, posts))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic DTED tree in the format w115/n32.dt2"
+    )
+    parser.add_argument("output", help="Output directory")
+    parser.add_argument(
+        "--bbox",
+        nargs=4,
+        type=int,
+        default=(-125, 32, -114, 42),
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+        help="Tile range, south-west corners, max exclusive",
+    )
+    parser.add_argument(
+        "--level", type=int, choices=sorted(LAT_INTERVALS), default=0, help="DTED level"
+    )
+    parser.add_argument("--posts", type=int, help="Cap posts per axis")
+    parser.add_argument(
+        "--zip-tiles", action="store_true", help="Write each tile as .dtN.zip"
+    )
+    parser.add_argument("--archive", help="Also write a hemisphere-style zip")
+    args = parser.parse_args()
+
+    tiles = list(tiles_in_bbox(*args.bbox))
+    written = generate_tree(args.output, tiles, args.level, args.posts, args.zip_tiles)
+    print(f"Wrote {len(written)} DTED{args.level} tiles to {args.output}")
+    if args.archive:
+        write_archive(args.archive, tiles, args.level, args.posts)
+        print(f"Wrote archive {args.archive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+m2m_client.py
+
+A client for the USGS M2M JSON API shared by the download scripts.
+
+Every API call and file download of a run goes through one requests.Session,
+so connections are kept alive and reused from a pool instead of paying a TCP
+and TLS handshake per call; size the pool to at least the number of
+concurrent downloads. The API key from login-token is kept by the client and
+sent with each API call (but not to the download servers).
+
+Usage:
+
+    from m2m_client import M2MClient
+
+    with M2MClient() as client:
+        client.login_token(username, token)
+        datasets = client.post("dataset-search", {"datasetName": "gls_all"})
+        client.download(url, "downloads")
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import download_engine
+
+API_URL = "https://m2m.cr.usgs.gov/api/api/json/stable"
+
+# Connections kept per host, and hosts kept pooled
+POOL_SIZE = 10
+POOL_HOSTS = 4
+
+# (connect, read) seconds
+TIMEOUT = (10, 120)
+
+
+class M2MError(Exception):
+    """An error reported in an M2M API response."""
+
+    def __init__(self, endpoint, code, message, request_id=None):
+        super().__init__(f"{endpoint}: {code} - {message}")
+        self.endpoint = endpoint
+        self.code = code
+        self.request_id = request_id
+
+
+def create_session(pool_size=POOL_SIZE, pool_hosts=POOL_HOSTS):
+    """Return a requests.Session keeping ``pool_size`` connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class M2MClient:
+    """M2M API calls and downloads over one pooled, keep-alive session."""
+
+    def __init__(
+        self,
+        api_url=API_URL,
+        session=None,
+        timeout=TIMEOUT,
+        pool_size=POOL_SIZE,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.session = session or create_session(pool_size)
+        self.timeout = timeout
+        self.api_key = None
+        self.request_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _headers(self):
+        return {"X-Auth-Token": self.api_key} if self.api_key else {}
+
+    def _data(self, endpoint, response):
+        # Error responses usually carry the API's reason in their JSON body,
+        # so that is checked before the HTTP status.
+        try:
+            output = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        if output.get("errorCode"):
+            raise M2MError(
+                endpoint,
+                output["errorCode"],
+                output.get("errorMessage"),
+                output.get("requestId"),
+            )
+        response.raise_for_status()
+        self.request_id = output.get("requestId")
+        return output.get("data")
+
+    def post(self, endpoint, payload=None):
+        """POST ``payload`` as JSON to an endpoint and return its ``data``."""
+        response = self.session.post(
+            f"{self.api_url}/{endpoint}",
+            json=payload,
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        return self._data(endpoint, response)
+
+    def get(self, endpoint, params=None):
+        """GET an endpoint and return its ``data``."""
+        response = self.session.get(
+            f"{self.api_url}/{endpoint}",
+            params=params,
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        return self._data(endpoint, response)
+
+    def login_token(self, username, token):
+        """Log in with an application token; later calls send the API key."""
+        self.api_key = self.post("login-token", {"username": username, "token": token})
+        return self.api_key
+
+    def logout(self):
+        """Invalidate the API key."""
+        if self.api_key:
+            self.post("logout")
+            self.api_key = None
+
+    def download(self, url, output_dir=".", **options):
+        """Download a file over the client's session; returns its Transfer."""
+        options.setdefault("timeout", self.timeout)
+        return download_engine.download_file(
+            url, output_dir, session=self.session, **options
+        )
+
+
+def add_arguments(parser):
+    """Add the connection options shared by the download scripts."""
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=POOL_SIZE,
+        help=f"Connections kept open per server (default: {POOL_SIZE})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=TIMEOUT[1],
+        help=f"Seconds to wait for a server response (default: {TIMEOUT[1]})",
+    )
+
+
+def client_from_args(args, api_url=API_URL, workers=0):
+    """Return an M2MClient for the options of add_arguments().
+
+    The pool is enlarged to ``workers`` so no download waits for a connection.
+    """
+    return M2MClient(
+        api_url,
+        timeout=(TIMEOUT[0], args.timeout),
+        pool_size=max(args.pool_size, workers, 1),
+    )
@@ -0,0 +1,116 @@
+import random
+import time
+
+import pytest
+
+import download_test_server
+from async_download import AsyncScheduler
+from download_scheduler import RetryPolicy
+
+SIZE = 64 * 1024
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(name, count, **faults):
+        root = tmp_path / name
+        root.mkdir()
+        rng = random.Random(name)
+        files = {}
+        for index in range(count):
+            file_name = f"{name}{index}.bin"
+            files[file_name] = rng.randbytes(SIZE)
+            (root / file_name).write_bytes(files[file_name])
+        server = download_test_server.serve(str(root), **faults)
+        servers.append(server)
+        return server, files
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    path = tmp_path / "out"
+    path.mkdir()
+    return path
+
+
+def scheduler(output_dir, **options):
+    return AsyncScheduler(
+        str(output_dir),
+        progress=False,
+        policy=RetryPolicy(retries=2, base_delay=0.01, max_delay=0.05),
+        **options,
+    )
+
+
+def test_busy_host_does_not_starve_others(serve, output_dir):
+    # Each file from the slow host takes about half a second.
+    slow, slow_files = serve("slow", 4, rate=128 * 1024)
+    fast, fast_files = serve("fast", 2)
+    downloads = scheduler(output_dir, concurrency=2, per_host=1)
+    active = {}
+    peak = {}
+    finished = {}
+    started = time.monotonic()
+
+    def track(event):
+        host = event.item.host
+        if event.kind == "started":
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        elif event.kind in ("finished", "failed"):
+            active[host] -= 1
+            finished[event.item.url] = time.monotonic() - started
+
+    downloads.subscribe(track)
+    for server, files in ((slow, slow_files), (fast, fast_files)):
+        for name in files:
+            downloads.submit(download_test_server.url_for(server, name))
+    report = downloads.join()
+
+    assert report.ok
+    assert max(peak.values()) == 1
+    slow_done = [finished[download_test_server.url_for(slow, n)] for n in slow_files]
+    fast_done = [finished[download_test_server.url_for(fast, n)] for n in fast_files]
+    assert max(fast_done) < min(slow_done) + 0.5
+    assert max(fast_done) < max(slow_done) / 2
+    for name, data in {**slow_files, **fast_files}.items():
+        assert (output_dir / name).read_bytes() == data
+
+
+def test_unexpected_error_fails_only_its_item(serve, output_dir):
+    server, files = serve("files", 3)
+    downloads = scheduler(output_dir)
+    broken = download_test_server.url_for(server, "files0.bin")
+
+    def explode(event):
+        if event.kind == "started" and event.item.url == broken:
+            raise RuntimeError("subscriber bug")
+
+    downloads.subscribe(explode)
+    for name in files:
+        downloads.submit(download_test_server.url_for(server, name))
+    report = downloads.join()
+
+    assert [item.url for item in report.failed] == [broken]
+    assert isinstance(report.failed[0].error, RuntimeError)
+    assert len(report.succeeded) == 2
+    assert downloads.downloader.session.closed
+
+
+def test_complete_files_are_not_downloaded_again(serve, output_dir):
+    server, files = serve("files", 2)
+    for attempt in range(2):
+        downloads = scheduler(output_dir)
+        for name in files:
+            downloads.submit(download_test_server.url_for(server, name), filename=name)
+        report = downloads.join()
+        assert report.ok
+        skipped = [item.transfer.skipped for item in report.succeeded]
+        assert skipped == [attempt == 1] * len(files)
@@ -0,0 +1,78 @@
+import pytest
+
+from binary_index import HEADER, BinaryIndex, write_binary_index
+from coverage_grid import CoverageGrid
+
+# Corner cells and their neighbours, so both nibbles of the first and last
+# bytes are covered.
+CELLS = {
+    (-180, -90): 1,
+    (-180, -89): 2,
+    (-179, -90): 4,
+    (179, 89): 3,
+    (179, 88): 5,
+    (178, 89): 6,
+    (-115, 32): 7,
+}
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    grid = CoverageGrid()
+    lons, lats = zip(*CELLS)
+    grid.mark(lons, lats, list(CELLS.values()))
+    path = tmp_path / "index.bin"
+    assert write_binary_index(str(path), 2, grid, timestamp=1234)
+    return path, grid
+
+
+def test_lookups_at_corner_cells(index_file):
+    path, _ = index_file
+    with BinaryIndex(str(path)) as index:
+        assert (index.version, index.timestamp) == (2, 1234)
+        for (lon, lat), mask in CELLS.items():
+            assert index.levels(lon, lat) == mask
+        assert index.levels(0, 0) == 0
+        assert index.levels(-179, -89) == 0
+        assert index.levels(178, 88) == 0
+
+
+def test_fractional_degrees_use_the_south_west_corner(index_file):
+    path, _ = index_file
+    with BinaryIndex(str(path)) as index:
+        assert index.levels(-179.5, -89.5) == 1
+        assert index.levels(179.999, 89.999) == 3
+        assert index.levels(-114.5, 32.5) == 7
+        assert index.levels(-115.5, 32.5) == 0
+        assert index.has_level(-115, 32, 3)
+        assert not index.has_level(-180, -90, 2)
+
+
+def test_out_of_range_coordinates(index_file):
+    path, _ = index_file
+    with BinaryIndex(str(path)) as index:
+        for lon, lat in ((180, 0), (-180.5, 0), (0, 90), (0, -90.1)):
+            with pytest.raises(ValueError):
+                index.levels(lon, lat)
+
+
+def test_to_grid_round_trips(index_file):
+    path, grid = index_file
+    with BinaryIndex(str(path)) as index:
+        assert index.to_grid() == grid
+
+
+def test_rejects_bad_magic(index_file):
+    path, _ = index_file
+    data = bytearray(path.read_bytes())
+    data[0:8] = b"NOTINDEX"
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        BinaryIndex(str(path))
+
+
+def test_rejects_truncated_file(index_file):
+    path, _ = index_file
+    path.write_bytes(path.read_bytes()[: HEADER.size + 10])
+    with pytest.raises(ValueError):
+        BinaryIndex(str(path))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import coverage_filter
+from coverage_filter import PolygonRegion, filter_coverage, parse_region
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+HOLE = [[3, 3], [3, 7], [7, 7], [7, 3], [3, 3]]
+# A concave outline with a hole, so rows cross several edges.
+STAR = [[-20, -10], [0, -2], [20, -10], [8, 4], [14, 20], [0, 9], [-14, 20], [-8, 4]]
+STAR_HOLE = [[-3, -1], [3, -1], [3, 3], [-3, 3]]
+
+
+def world_cells():
+    lons, lats = np.meshgrid(np.arange(-180, 180), np.arange(-90, 90), indexing="ij")
+    return lons.ravel(), lats.ravel()
+
+
+def even_odd(rings, x, y):
+    """Scalar even-odd point-in-polygon test."""
+    inside = False
+    for ring in rings:
+        for (ax, ay), (bx, by) in zip(ring, ring[1:] + ring[:1]):
+            if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                inside = not inside
+    return inside
+
+
+def kept(region):
+    lons, lats = world_cells()
+    mask = region.contains(lons, lats)
+    return set(zip(lons[mask].tolist(), lats[mask].tolist()))
+
+
+def test_hole_is_cut_out():
+    region = PolygonRegion([[SQUARE, HOLE]])
+    expected = {
+        (lon, lat)
+        for lon in range(10)
+        for lat in range(10)
+        if not (3 <= lon < 7 and 3 <= lat < 7)
+    }
+    assert kept(region) == expected
+
+
+def test_matches_scalar_reference():
+    region = PolygonRegion([[STAR, STAR_HOLE]])
+    expected = {
+        (lon, lat)
+        for lon in range(-25, 25)
+        for lat in range(-15, 25)
+        if even_odd([STAR, STAR_HOLE], lon + 0.5, lat + 0.5)
+    }
+    assert expected
+    assert kept(region) == expected
+
+
+@pytest.mark.parametrize("cells_per_block", [1, 7, 64])
+def test_blocks_give_the_same_result(monkeypatch, cells_per_block):
+    region = PolygonRegion([[STAR, STAR_HOLE]])
+    whole = kept(region)
+    edges = len(region.edges[0])
+    monkeypatch.setattr(coverage_filter, "MAX_CROSSINGS", edges * cells_per_block)
+    assert kept(region) == whole
+
+
+def test_multipolygon_geojson():
+    data = {
+        "type": "Feature",
+        "geometry": {
+            "type": "MultiPolygon",
+            "coordinates": [[SQUARE, HOLE], [[[50, 50], [52, 50], [52, 51]]]],
+        },
+    }
+    region = PolygonRegion.from_geojson(data)
+    cells = kept(region)
+    assert (0, 0) in cells and (5, 5) not in cells
+    assert (51, 50) in cells
+    assert len(cells) == 84 + 1
+
+
+def test_filter_coverage_drops_empty_levels():
+    coverage = {1: {(0, 0), (5, 5), (-120, 35)}, 2: {(5, 5)}, 3: set()}
+    assert filter_coverage(coverage, PolygonRegion([[SQUARE, HOLE]])) == {1: {(0, 0)}}
+
+
+def test_parse_region_box_overlaps_cells():
+    region = parse_region("-1.5,0,1,2")
+    assert kept(region) == {(lon, lat) for lon in (-2, -1, 0) for lat in (0, 1)}
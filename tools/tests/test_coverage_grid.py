@@ -0,0 +1,58 @@
+import pytest
+
+import create_index
+from coverage_grid import CoverageGrid, format_index, parse_index
+
+# Corners and a cell with every level bit set
+CELLS = [(-180, -90, 1), (179, -90, 2), (-180, 89, 4), (179, 89, 3), (-115, 32, 7)]
+
+
+def marked_grid():
+    grid = CoverageGrid()
+    grid.mark(*zip(*CELLS))
+    return grid
+
+
+def test_mark_indexes_lon_plus_180_lat_plus_90():
+    grid = marked_grid()
+    for lon, lat, mask in CELLS:
+        assert grid[lon + 180, lat + 90] == mask
+    assert int((grid.cells != 0).sum()) == len(CELLS)
+
+
+def test_mark_ors_level_bits():
+    grid = CoverageGrid()
+    grid.mark([-115, -115], [32, 32], [1, 2])
+    grid.mark([-115], [32], [4])
+    assert grid[65, 122] == 7
+
+
+def test_index_file_round_trips(tmp_path):
+    grid = marked_grid()
+    index_file = tmp_path / "index"
+    assert create_index.write_index_file(str(index_file), 1, 1234, grid)
+
+    version, timestamp, loaded = create_index.read_index_file(str(index_file))
+
+    assert (version, timestamp) == ("1", "1234")
+    assert loaded == grid
+    for lon, lat, mask in CELLS:
+        assert loaded[lon + 180, lat + 90] == mask
+
+
+def test_text_layout_is_a_row_per_longitude():
+    lines = format_index(1, 0, marked_grid()).decode("ascii").split("\n")
+    assert lines[:2] == ["1", "0"]
+    rows = lines[2:-1]
+    assert len(rows) == 360 and all(len(row) == 180 for row in rows)
+    assert rows[0][0] == "1" and rows[0][179] == "4"
+    assert rows[359][0] == "2" and rows[359][179] == "3"
+    assert rows[-115 + 180][32 + 90] == "7"
+
+
+def test_parse_rejects_bad_rows():
+    data = format_index(1, 0, CoverageGrid())
+    with pytest.raises(ValueError):
+        parse_index(data[:-200])
+    with pytest.raises(ValueError):
+        parse_index(data[:-2] + b"x\n")
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+
+from coverage_grid import CoverageGrid
+from coverage_loader import GRID_LEVELS
+from coverage_query import CoverageQuery
+
+
+@pytest.fixture(scope="module")
+def grid():
+    rng = np.random.default_rng(0)
+    return CoverageGrid(rng.integers(0, 8, size=(360, 180), dtype=np.uint8))
+
+
+def brute_force(grid, min_lon, min_lat, max_lon, max_lat):
+    """Count covered cells by walking every cell the box overlaps."""
+    counts = dict.fromkeys(GRID_LEVELS, 0)
+    total = 0
+    for lon in range(-180, 180):
+        if not (lon < max_lon and lon + 1 > min_lon):
+            continue
+        for lat in range(-90, 90):
+            if not (lat < max_lat and lat + 1 > min_lat):
+                continue
+            total += 1
+            for level, bit in GRID_LEVELS.items():
+                if grid[lon + 180, lat + 90] & bit:
+                    counts[level] += 1
+    return counts, total
+
+
+def boxes():
+    rng = random.Random(0)
+    yield -180, -90, 180, 90
+    yield -10, -10, 10, 10
+    yield 179.5, 89.5, 180, 90
+    yield -200, -100, -170, -80
+    for _ in range(40):
+        lons = sorted(rng.uniform(-185, 185) for _ in range(2))
+        lats = sorted(rng.uniform(-95, 95) for _ in range(2))
+        yield lons[0], lats[0], lons[1], lats[1]
+    for _ in range(20):
+        lons = sorted(rng.sample(range(-180, 181), 2))
+        lats = sorted(rng.sample(range(-90, 91), 2))
+        yield lons[0], lats[0], lons[1], lats[1]
+
+
+@pytest.mark.parametrize("box", list(boxes()))
+def test_counts_match_brute_force(grid, box):
+    query = CoverageQuery.from_grid(grid)
+    expected, total = brute_force(grid, *box)
+
+    assert query.count(*box) == expected
+    assert query.cells_in_box(*box) == total
+    percents = query.percent(*box)
+    for level, count in expected.items():
+        assert percents[level] == pytest.approx(100.0 * count / total)
+
+
+def test_point_box_counts_its_cell(grid):
+    query = CoverageQuery.from_grid(grid)
+    for lon, lat in ((-180, -90), (179.5, 89.5), (-115, 32), (0.25, -0.75)):
+        assert query.cells_in_box(lon, lat, lon, lat) == 1
+        counts = query.count(lon, lat, lon, lat)
+        assert [level for level in query.levels if counts[level]] == query.point(
+            lon, lat
+        )
+
+
+def test_from_coverage_matches_from_grid(grid):
+    coverage = {
+        level: {
+            (lon - 180, lat - 90) for lon, lat in zip(*np.nonzero(grid.cells & bit))
+        }
+        for level, bit in GRID_LEVELS.items()
+    }
+    by_points = CoverageQuery.from_coverage(coverage)
+    by_grid = CoverageQuery.from_grid(grid)
+    for box in list(boxes())[:10]:
+        assert by_points.count(*box) == by_grid.count(*box)
+
+
+def test_rejects_inverted_box(grid):
+    with pytest.raises(ValueError):
+        CoverageQuery.from_grid(grid).count(10, 0, -10, 5)
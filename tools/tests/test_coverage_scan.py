@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import coverage_scan
+from coverage_scan import ScanCache, scan_coverage
+
+TILES = ["w115/n32.dt2", "w115/n33.dt1", "w116/n32.dt2", "e010/s05.dt1"]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "dted"
+    for tile in TILES:
+        path = root / tile
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return root
+
+
+@pytest.fixture
+def listed(monkeypatch):
+    """Record the directories that are actually listed."""
+    paths = []
+    list_directory = coverage_scan.list_directory
+
+    def record(path):
+        paths.append(os.path.basename(path))
+        return list_directory(path)
+
+    monkeypatch.setattr(coverage_scan, "list_directory", record)
+    return paths
+
+
+def touch(path):
+    # Bump the mtime explicitly; filesystem timestamps can be coarse.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def scan(tree, cache_file, threads=1):
+    cache = ScanCache(str(cache_file)).load()
+    return scan_coverage(str(tree), threads, cache), cache
+
+
+def test_only_the_changed_directory_is_rescanned(tree, tmp_path, listed):
+    cache_file = tmp_path / "cache.json"
+    first, cache = scan(tree, cache_file)
+    assert (cache.hits, cache.misses) == (0, 4)
+    assert first == {2: {(-115, 32), (-116, 32)}, 1: {(-115, 33), (10, -5)}}
+
+    (tree / "w116" / "n33.dt2").write_bytes(b"")
+    touch(tree / "w116")
+    listed.clear()
+    second, cache = scan(tree, cache_file, threads=4)
+
+    assert listed == ["w116"]
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert second[2] == first[2] | {(-116, 33)}
+    assert second[1] == first[1]
+
+
+def test_unchanged_scan_lists_nothing(tree, tmp_path, listed):
+    cache_file = tmp_path / "cache.json"
+    first, _ = scan(tree, cache_file)
+    saved = cache_file.stat().st_mtime_ns
+    listed.clear()
+
+    second, cache = scan(tree, cache_file)
+
+    assert listed == []
+    assert (cache.hits, cache.misses) == (4, 0)
+    assert second == first
+    assert cache_file.stat().st_mtime_ns == saved
+
+
+def test_removed_directory_is_dropped(tree, tmp_path):
+    cache_file = tmp_path / "cache.json"
+    scan(tree, cache_file)
+    shutil.rmtree(tree / "e010")
+    touch(tree)
+
+    coverage, cache = scan(tree, cache_file)
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert coverage == {2: {(-115, 32), (-116, 32)}, 1: {(-115, 33)}}
+    entries = json.loads(cache_file.read_text())["directories"]
+    assert str(tree / "e010") not in entries
+    assert len(entries) == 3
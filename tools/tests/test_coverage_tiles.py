@@ -0,0 +1,20 @@
+import os
+
+from coverage_tiles import build_pyramid
+
+COVERAGE = {0: {(-115, 40), (-114, 40)}, 2: {(-115, 40)}}
+
+
+def zoom_levels(output_dir):
+    return sorted(int(name) for name in os.listdir(output_dir) if name.isdigit())
+
+
+def test_rebuild_with_fewer_zooms_removes_the_others(tmp_path):
+    build_pyramid(COVERAGE, str(tmp_path), 0, 3, jobs=1)
+    assert zoom_levels(tmp_path) == [0, 1, 2, 3]
+
+    totals = build_pyramid(COVERAGE, str(tmp_path), 1, 2, jobs=1)
+
+    assert zoom_levels(tmp_path) == [1, 2]
+    assert totals["removed"] == 2
+    assert totals["written"] == 0
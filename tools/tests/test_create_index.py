@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import create_index
+from generate_dted import dted_bytes, generate_tree
+
+
+def build(input_dir, output_dir, **options):
+    create_index.main(
+        str(input_dir),
+        str(output_dir),
+        incremental=True,
+        progress_interval=0,
+        **options,
+    )
+
+
+def zipped_md5(path):
+    with zipfile.ZipFile(path) as zf:
+        return hashlib.md5(zf.read(zf.namelist()[0])).hexdigest()
+
+
+def test_incremental_recompresses_changed_tile_with_old_mtime(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    generate_tree(str(input_dir), [(-115, 40), (-115, 41)], 0, posts=31)
+    build(input_dir, output_dir)
+
+    # New content, but an mtime older than the zip from the first build.
+    tile = input_dir / "w115" / "n40.dt0"
+    tile.write_bytes(dted_bytes(-114, 40, 0, posts=31))
+    os.utime(tile, (1577836800, 1577836800))
+    build(input_dir, output_dir)
+
+    expected = hashlib.md5(tile.read_bytes()).hexdigest()
+    assert zipped_md5(output_dir / "w115" / "n40.dt0.zip") == expected
+    with open(f"{output_dir}.manifest.json") as f:
+        record = json.load(f)["tiles"]["w115/n40.dt0"]
+    assert record["sha256"] == hashlib.sha256(tile.read_bytes()).hexdigest()
+
+
+def test_incremental_keeps_unchanged_tiles(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    generate_tree(str(input_dir), [(-115, 40), (-115, 41)], 0, posts=31)
+    build(input_dir, output_dir)
+    zipped = output_dir / "w115" / "n41.dt0.zip"
+    before = zipped.stat().st_mtime_ns
+
+    (input_dir / "w115" / "n40.dt0").write_bytes(dted_bytes(-114, 40, 0, posts=31))
+    build(input_dir, output_dir)
+
+    assert zipped.stat().st_mtime_ns == before
+
+
+def counters(report_file):
+    with open(report_file) as f:
+        return json.load(f)["counters"]
+
+
+def test_first_incremental_run_reuses_fresh_zips(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    generate_tree(str(input_dir), [(-115, 40), (-115, 41)], 0, posts=31)
+    create_index.main(str(input_dir), str(output_dir), progress_interval=0)
+    assert not os.path.exists(f"{output_dir}.manifest.json")
+
+    report = tmp_path / "report.json"
+    build(input_dir, output_dir, report_file=str(report))
+    assert counters(report)["zips_reused"] == 2
+    assert counters(report)["tiles_zipped"] == 0
+
+    # Without a manifest record there is nothing to say the zip is stale,
+    # unless --force-compress asks for it.
+    os.remove(f"{output_dir}.manifest.json")
+    build(
+        input_dir,
+        output_dir,
+        report_file=str(report),
+        compression={"skip_fresh": False},
+    )
+    assert counters(report)["zips_reused"] == 0
+    assert counters(report)["tiles_zipped"] == 2
+
+
+def test_zip_level_preset_keeps_method():
+    import argparse
+
+    import zip_engine
+
+    parser = argparse.ArgumentParser()
+    zip_engine.add_arguments(parser)
+    options = zip_engine.options_from_args(
+        parser.parse_args(["--zip-method", "bzip2", "--zip-level", "max"])
+    )
+    assert (options["method"], options["level"]) == ("bzip2", 9)
+
+
+def indexed(output_dir):
+    from coverage_loader import load_coverage
+
+    return load_coverage(str(output_dir / "index.zip"))
+
+
+def test_incremental_drops_changed_tile_that_fails_validation(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    generate_tree(str(input_dir), [(-115, 40), (-115, 41)], 1, posts=31)
+    build(input_dir, output_dir, validate=True)
+    assert indexed(output_dir) == {1: {(-115, 40), (-115, 41)}}
+
+    tile = input_dir / "w115" / "n40.dt1"
+    data = bytearray(tile.read_bytes())
+    data[-10] ^= 0xFF
+    tile.write_bytes(bytes(data))
+    build(input_dir, output_dir, validate=True)
+
+    assert indexed(output_dir) == {1: {(-115, 41)}}
+    assert not (output_dir / "w115" / "n40.dt1.zip").exists()
+    with open(f"{output_dir}.manifest.json") as f:
+        assert list(json.load(f)["tiles"]) == ["w115/n41.dt1"]
+
+
+def test_incremental_removes_output_of_deleted_longitude(tmp_path):
+    input_dir = tmp_path / "in"
+    output_dir = tmp_path / "out"
+    generate_tree(str(input_dir), [(-115, 40), (-114, 40)], 1, posts=31)
+    build(input_dir, output_dir)
+    assert (output_dir / "w114" / "index.html").exists()
+
+    for tile in (input_dir / "w114").iterdir():
+        tile.unlink()
+    (input_dir / "w114").rmdir()
+    build(input_dir, output_dir)
+
+    assert not (output_dir / "w114").exists()
+    assert (output_dir / "w115" / "n40.dt1.zip").exists()
+    assert indexed(output_dir) == {1: {(-115, 40)}}
@@ -0,0 +1,74 @@
+import hashlib
+import random
+
+import pytest
+import requests
+
+import download_test_server
+from download_engine import download_file
+
+SIZE = 200 * 1024
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "served"
+    root.mkdir()
+    (root / "tile.zip").write_bytes(random.Random(0).randbytes(SIZE))
+    server = download_test_server.serve(str(root))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_complete_file_is_checked_on_the_pooled_connection(server, tmp_path):
+    url = download_test_server.url_for(server, "tile.zip")
+    data = (tmp_path / "served" / "tile.zip").read_bytes()
+    checksum = "sha256:" + hashlib.sha256(data).hexdigest()
+    with requests.Session() as session:
+        first = download_file(
+            url, str(tmp_path), "tile.zip", session, checksum=checksum, progress=None
+        )
+        # A dropped connection only shows when the next request opens another.
+        for _ in range(2):
+            again = download_file(
+                url,
+                str(tmp_path),
+                "tile.zip",
+                session,
+                checksum=checksum,
+                progress=None,
+            )
+
+        assert not first.skipped
+        assert again.skipped and again.received == 0
+        assert server.connections == 1
+
+
+def test_changed_file_is_downloaded_again(server, tmp_path):
+    url = download_test_server.url_for(server, "tile.zip")
+    (tmp_path / "tile.zip").write_bytes(b"older and shorter")
+
+    transfer = download_file(url, str(tmp_path), "tile.zip", progress=None)
+
+    assert not transfer.skipped
+    assert (tmp_path / "tile.zip").read_bytes() == (
+        tmp_path / "served" / "tile.zip"
+    ).read_bytes()
+
+
+def test_complete_file_with_wrong_checksum_is_replaced(server, tmp_path):
+    url = download_test_server.url_for(server, "tile.zip")
+    data = (tmp_path / "served" / "tile.zip").read_bytes()
+    (tmp_path / "tile.zip").write_bytes(bytes(SIZE))
+
+    transfer = download_file(
+        url,
+        str(tmp_path),
+        "tile.zip",
+        checksum="sha256:" + hashlib.sha256(data).hexdigest(),
+        progress=None,
+    )
+
+    assert not transfer.skipped
+    assert (tmp_path / "tile.zip").read_bytes() == data
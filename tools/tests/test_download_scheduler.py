@@ -0,0 +1,127 @@
+import hashlib
+import random
+from functools import partial
+
+import pytest
+
+import download_test_server
+from download_engine import PART_SUFFIX, download_file
+from download_scheduler import DownloadScheduler, RetryPolicy
+
+SIZE = 300 * 1024
+
+
+@pytest.fixture
+def served(tmp_path):
+    root = tmp_path / "served"
+    root.mkdir()
+    rng = random.Random(0)
+    files = {}
+    for index in range(4):
+        name = f"n{index:02d}.dt2.zip"
+        data = rng.randbytes(SIZE)
+        (root / name).write_bytes(data)
+        files[name] = data
+    return root, files
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    path = tmp_path / "out"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def serve(served):
+    servers = []
+
+    def start(**faults):
+        server = download_test_server.serve(str(served[0]), **faults)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run(server, files, output_dir, retries=3, **options):
+    scheduler = DownloadScheduler(
+        str(output_dir),
+        workers=3,
+        policy=RetryPolicy(retries=retries, base_delay=0.01, max_delay=0.05),
+        download=partial(download_file, chunk_size=16 * 1024, progress=None),
+        rng=random.Random(0),
+    )
+    for name in files:
+        scheduler.submit(download_test_server.url_for(server, name), **options)
+    return scheduler.join()
+
+
+def assert_downloaded(files, output_dir):
+    for name, data in files.items():
+        assert (output_dir / name).read_bytes() == data
+        assert not (output_dir / (name + PART_SUFFIX)).exists()
+
+
+def test_retries_injected_errors(served, serve, output_dir):
+    _, files = served
+    report = run(serve(errors=2), files, output_dir)
+
+    assert report.ok
+    assert all(item.attempts == 3 for item in report.succeeded)
+    assert_downloaded(files, output_dir)
+
+
+def test_gives_up_after_retry_budget(served, serve, output_dir):
+    _, files = served
+    report = run(serve(errors=3), files, output_dir, retries=1)
+
+    assert not report.succeeded
+    assert sorted(item.url.rsplit("/", 1)[1] for item in report.failed) == sorted(files)
+    assert all(item.error.status == 503 for item in report.failed)
+
+
+def test_dropped_transfer_resumes_from_part(served, serve, output_dir):
+    _, files = served
+    checksum = {
+        name: "sha256:" + hashlib.sha256(data).hexdigest()
+        for name, data in files.items()
+    }
+    server = serve(fail_after=100 * 1024)
+    scheduler = DownloadScheduler(
+        str(output_dir),
+        workers=3,
+        policy=RetryPolicy(retries=2, base_delay=0.01, max_delay=0.05),
+        download=partial(download_file, chunk_size=16 * 1024, progress=None),
+    )
+    for name in files:
+        scheduler.submit(
+            download_test_server.url_for(server, name),
+            filename=name,
+            checksum=checksum[name],
+        )
+    report = scheduler.join()
+
+    assert report.ok
+    for item in report.succeeded:
+        assert item.attempts == 2
+        assert item.transfer.resumed_from > 0
+        assert item.transfer.received == SIZE - item.transfer.resumed_from
+    assert_downloaded(files, output_dir)
+
+
+def test_existing_part_is_resumed(served, serve, output_dir):
+    _, files = served
+    name, data = next(iter(files.items()))
+    (output_dir / (name + PART_SUFFIX)).write_bytes(data[:123456])
+
+    report = run(serve(), {name: data}, output_dir, filename=name)
+
+    assert report.ok
+    [item] = report.succeeded
+    assert item.transfer.resumed_from == 123456
+    assert item.transfer.received == SIZE - 123456
+    assert_downloaded({name: data}, output_dir)
@@ -0,0 +1,32 @@
+import pytest
+
+from dted_reader import validate_tile
+from generate_dted import dted_bytes, generate_tree, tile_name
+
+
+@pytest.mark.parametrize("level", [0, 1, 2])
+@pytest.mark.parametrize("posts", [2, 50, 121])
+@pytest.mark.parametrize("lat", [40, 55, 82])
+def test_capped_generated_tiles_validate(tmp_path, level, posts, lat):
+    generate_tree(str(tmp_path), [(-115, lat)], level, posts)
+    path = tmp_path / tile_name(-115, lat, level)
+    assert validate_tile(str(path), -115, lat, level) == []
+
+
+def test_spacing_off_the_standard_grid_is_rejected(tmp_path):
+    data = bytearray(dted_bytes(-115, 40, 2, posts=121))
+    # 300 tenths of an arc-second is a multiple of DTED2's 10; 305 is not.
+    data[24:28] = b"0305"
+    path = tmp_path / "n40.dt2"
+    path.write_bytes(bytes(data))
+    problems = validate_tile(str(path), -115, 40, 2)
+    assert any("post spacing" in problem for problem in problems)
+
+
+def test_bad_checksum_is_rejected(tmp_path):
+    data = bytearray(dted_bytes(-115, 40, 0, posts=31))
+    data[-1] ^= 0xFF
+    path = tmp_path / "n40.dt0"
+    path.write_bytes(bytes(data))
+    problems = validate_tile(str(path), -115, 40, 0)
+    assert any("checksums" in problem for problem in problems)
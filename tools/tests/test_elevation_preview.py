@@ -0,0 +1,13 @@
+from coverage_filter import quadrant
+from elevation_preview import preview_bounds
+
+
+def test_region_bounds_are_clipped_to_the_tiles():
+    cells = [(-120, 35), (-118, 37)]
+    assert preview_bounds(cells) == (-120, 35, -117, 38)
+    assert preview_bounds(cells, quadrant("W").bounds) == (-120, 35, -117, 38)
+
+
+def test_tiles_are_clipped_to_region_bounds():
+    cells = [(-1, 10), (3, 12)]
+    assert preview_bounds(cells, (0.5, 0, 10, 90)) == (0, 10, 4, 13)
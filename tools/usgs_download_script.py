@@ -12,6 +12,10 @@ import argparse
 from shapely.geometry import shape
 import us
 
+import download_poller
+import download_scheduler
+import m2m_client
+
 
 def get_api_key():
     """Get USGS API key from environment or prompt user."""
@@ -21,20 +25,14 @@ def get_api_key():
     return api_key
 
 
-def get_usgs_token(api_url, username, password):
-    """Authenticate with USGS M2M API and get token."""
-    payload = {"username": username, "token": password}
-    response = requests.post(f"{api_url}/login-token", json=payload)
-    response.raise_for_status()
-    return response.json()["data"]
+def get_usgs_token(client, username, password):
+    """Authenticate with USGS M2M API; the client sends the token from now on."""
+    return client.login_token(username, password)
 
 
-def search_datasets(api_url, token, dataset_names=None):
+def search_datasets(client, dataset_names=None):
     """Search for specific datasets or list all available datasets."""
-    headers = {"X-Auth-Token": token}
-    response = requests.get(f"{api_url}/dataset-search", headers=headers)
-    response.raise_for_status()
-    datasets = response.json()["data"]
+    datasets = client.get("dataset-search")
 
     if dataset_names:
         return [ds for ds in datasets if ds["datasetAlias"] in dataset_names]
@@ -68,24 +66,27 @@ def get_state_boundary(state_name):
     return geojson["features"][0]["geometry"]
 
 
-def search_scenes(api_url, token, dataset_id, state_geometry):
+def search_scenes(client, dataset_id, state_geometry):
     """Search for scenes covering the state."""
-    headers = {"X-Auth-Token": token}
     payload = {
         "datasetName": dataset_id,
         "spatialFilter": {"filterType": "geojson", "geoJson": state_geometry},
         "maxResults": 50000,  # Adjust as needed
     }
 
-    response = requests.post(f"{api_url}/scene-search", json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()["data"]["results"]
+    return client.post("scene-search", payload)["results"]
 
 
-def download_scenes(api_url, token, dataset_id, scene_ids, download_dir):
-    """Request download URLs for selected scenes and download them."""
-    headers = {"X-Auth-Token": token}
+def download_scenes(
+    client, dataset_id, scene_ids, download_dir, scheduler=None, poller=None
+):
+    """Request download URLs for selected scenes and download them.
 
+    Preparation is polled by ``poller`` (a download_poller.DownloadPoller)
+    and each file starts as soon as its URL is available. With a
+    ``scheduler`` (see download_scheduler.scheduler_from_args) the files are
+    queued on it and downloaded concurrently; the caller joins it.
+    """
     # Create the download directory if it doesn't exist
     os.makedirs(download_dir, exist_ok=True)
 
@@ -93,60 +94,45 @@ def download_scenes(api_url, token, dataset_id, scene_ids, download_dir):
     payload = {"datasetName": dataset_id, "entityIds": scene_ids}
 
     print(f"Requesting download URLs for {len(scene_ids)} scenes...")
-    print(f"{api_url}/download-request")
+    print(f"{client.api_url}/download-request")
     print(payload)
-    print(headers)
-    response = requests.post(
-        f"{api_url}/download-request", json=payload, headers=headers
-    )
-    response.raise_for_status()
+    requested_at = time.monotonic()
+    data = client.post("download-request", payload)
 
     # Get the download ID
-    download_id = response.json()["data"]["downloadId"]
-
-    # Check download status until ready
-    download_ready = False
-    print("Waiting for download preparation...")
-    while not download_ready:
-        status_response = requests.get(
-            f"{api_url}/download-retrieve/{download_id}", headers=headers
-        )
-        status_response.raise_for_status()
-        status_data = status_response.json()["data"]
-
-        if status_data["status"] == "available":
-            download_ready = True
-        elif status_data["status"] == "failed":
-            print("Download preparation failed")
-            return
-        else:
-            print(f"Download status: {status_data['status']}, waiting 10 seconds...")
-            time.sleep(10)
-
-    # Get download URLs
-    print("Download ready, retrieving URLs...")
-    download_response = requests.get(
-        f"{api_url}/download-retrieve/{download_id}", headers=headers
-    )
-    download_response.raise_for_status()
-    download_urls = download_response.json()["data"]["availableDownloads"]
-
-    # Download files
-    print(f"Starting download of {len(download_urls)} files to {download_dir}")
-    for i, download_item in enumerate(download_urls):
-        url = download_item["url"]
+    download_id = data["downloadId"]
+    status = None
+
+    def retrieve():
+        nonlocal status
+        status_data = client.get(f"download-retrieve/{download_id}")
+        status = status_data["status"]
+        ready = [
+            (item.get("downloadId", item["url"]), item["url"])
+            for item in status_data.get("availableDownloads") or []
+        ]
+        return ready, status in ("available", "failed")
+
+    def fetch(url):
         filename = os.path.basename(url.split("?")[0])
-        filepath = os.path.join(download_dir, filename)
-
-        print(f"Downloading file {i+1}/{len(download_urls)}: {filename}")
-        file_response = requests.get(url, stream=True)
-        file_response.raise_for_status()
+        if scheduler is not None:
+            print(f"Queueing {filename} for {download_dir}")
+            scheduler.submit(url, output_dir=download_dir, filename=filename)
+        else:
+            print(f"Downloading {filename}")
+            # Reuses the session's pooled connection to the download server
+            client.download(url, download_dir, filename=filename)
 
-        with open(filepath, "wb") as f:
-            for chunk in file_response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    # Poll until the download is prepared, starting files as they appear
+    print("Waiting for download preparation...")
+    poller = poller or download_poller.DownloadPoller()
+    ready = poller.poll(retrieve, fetch, started=requested_at)
+    if status == "failed":
+        print("Download preparation failed")
+        return
 
-    print(f"Download completed: {len(download_urls)} files saved to {download_dir}")
+    if scheduler is None:
+        print(f"Download completed: {len(ready)} files saved to {download_dir}")
 
 
 def main():
@@ -165,6 +151,10 @@ def main():
         default="./usgs_elevation_data",
         help="Output directory for downloaded files",
     )
+    # The files of a request come from one server, so let every worker use it
+    download_scheduler.add_arguments(parser, workers=4, per_host=4)
+    download_poller.add_arguments(parser)
+    m2m_client.add_arguments(parser)
     args = parser.parse_args()
 
     # USGS M2M API URL
@@ -189,15 +179,23 @@ def main():
     if args.dataset.lower() == "all" or args.dataset.lower() == "dted":
         dataset_aliases.extend(["DTED Level 0", "DTED Level 1", "DTED Level 2"])
 
+    # One pooled session for every API call and download
+    client = m2m_client.client_from_args(args, api_url, args.workers)
+    # Files download concurrently in chunks, skipping ones already complete,
+    # with the overall throughput and time left printed as they go.
+    scheduler = download_scheduler.scheduler_from_args(
+        args, args.output, client.download
+    )
+    poller = download_poller.poller_from_args(args)
     try:
         # Get authentication token
         print("Authenticating with USGS M2M API...")
-        token = get_usgs_token(api_url, username, password)
+        get_usgs_token(client, username, password)
         print("Authentication successful")
 
         # Get dataset information
         print("Searching for datasets...")
-        datasets = search_datasets(api_url, token, dataset_aliases)
+        datasets = search_datasets(client, dataset_aliases)
 
         if not datasets:
             print(f"No datasets found matching: {dataset_aliases}")
@@ -213,7 +211,7 @@ def main():
 
             # Search for scenes
             print(f"Searching for scenes in {args.state}...")
-            scenes = search_scenes(api_url, token, dataset_id, state_geometry)
+            scenes = search_scenes(client, dataset_id, state_geometry)
 
             if not scenes:
                 print(f"No scenes found for {dataset_id} in {args.state}")
@@ -225,10 +223,21 @@ def main():
             scene_ids = [scene["entityId"] for scene in scenes]
 
             # Download scenes
-            download_scenes(api_url, token, dataset_id, scene_ids, dataset_output_dir)
+            download_scenes(
+                client, dataset_id, scene_ids, dataset_output_dir, scheduler, poller
+            )
+
+        print("Downloading files...")
 
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        # Files already queued finish (and are reported) even after an
+        # error, before the session they download on is closed.
+        print(scheduler.join())
+        if poller.stats.polls:
+            print(poller.stats)
+        client.close()
 
     print("Script execution completed")
 
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+zip_engine.py
+
+Compression of raw DTED tiles into single-member ``.dtN.zip`` archives.
+
+ZipCompressor runs zip_file() on a thread pool; zlib, bz2 and lzma release
+the GIL while compressing, so threads scale across cores without the cost of
+extra processes. Outputs that are already newer than their input are kept
+instead of being compressed again, and every archive is written to a
+temporary name first, so an interrupted run never leaves a partial zip that
+would later look up to date.
+
+Usage:
+
+    python zip_engine.py <input file> [<input file> ...] [options]
+"""
+
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+COMPRESSION_METHODS = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "store": zipfile.ZIP_STORED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+# Named compression levels: fast for iterating on a build, max for a release.
+# They set only the level, so they combine with any --zip-method.
+PRESETS = {"fast": 1, "default": 6, "max": 9}
+
+
+def zip_file(input_file, output_file, compression=zipfile.ZIP_DEFLATED, level=None):
+    tmp_file = f"{output_file}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_file, "w", compression, compresslevel=level) as zf:
+            zf.write(input_file, os.path.basename(input_file))
+        os.replace(tmp_file, output_file)
+        return output_file
+    except Exception as e:
+        print(f"Error zipping the file: {input_file} - {e}")
+        for path in (tmp_file, output_file):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as delete_error:
+                    print(f"Failed to delete the output file {path} - {delete_error}")
+        return None
+
+
+@dataclass
+class CompressionResult:
+    input_file: str
+    output_file: str
+    input_bytes: int = 0
+    output_bytes: int = 0
+    seconds: float = 0.0
+    reused: bool = False
+    ok: bool = True
+
+
+def output_is_fresh(input_file, output_file):
+    """Return True if ``output_file`` exists and is newer than ``input_file``."""
+    try:
+        return os.stat(output_file).st_mtime_ns > os.stat(input_file).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+class ZipCompressor:
+    """Compress files on a thread pool and keep run totals."""
+
+    def __init__(self, method="deflate", level=None, threads=1, skip_fresh=True):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression method: {method}")
+        self.method = method
+        self.compression = COMPRESSION_METHODS[method]
+        self.level = level
+        self.skip_fresh = skip_fresh
+        self.threads = max(1, threads)
+        self._executor = None
+        if self.threads > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads)
+        self._lock = threading.Lock()
+        self.files = 0
+        self.reused = 0
+        self.failed = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+        self._start = time.perf_counter()
+
+    def compress(self, input_file, output_file, force=False):
+        """Compress one file and return a CompressionResult.
+
+        With ``force`` the file is compressed even if its output is fresh.
+        """
+        result = CompressionResult(input_file, output_file)
+        if self.skip_fresh and not force and output_is_fresh(input_file, output_file):
+            result.reused = True
+            result.input_bytes = os.path.getsize(input_file)
+            result.output_bytes = os.path.getsize(output_file)
+        else:
+            start = time.perf_counter()
+            result.ok = bool(
+                zip_file(input_file, output_file, self.compression, self.level)
+            )
+            result.seconds = time.perf_counter() - start
+            if result.ok:
+                result.input_bytes = os.path.getsize(input_file)
+                result.output_bytes = os.path.getsize(output_file)
+
+        with self._lock:
+            if not result.ok:
+                self.failed += 1
+            elif result.reused:
+                self.reused += 1
+            else:
+                self.files += 1
+                self.input_bytes += result.input_bytes
+                self.output_bytes += result.output_bytes
+                self.seconds += result.seconds
+        return result
+
+    def submit(self, input_file, output_file, force=False):
+        """Queue a file; returns a Future of its CompressionResult."""
+        if self._executor is not None:
+            return self._executor.submit(self.compress, input_file, output_file, force)
+        future = Future()
+        future.set_result(self.compress(input_file, output_file, force))
+        return future
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def report(self):
+        """Return the run totals, compression ratio and throughput."""
+        wall_time = time.perf_counter() - self._start
+        return {
+            "method": self.method,
+            "level": self.level,
+            "threads": self.threads,
+            "files": self.files,
+            "reused": self.reused,
+            "failed": self.failed,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "ratio": (
+                round(self.input_bytes / self.output_bytes, 3)
+                if self.output_bytes
+                else None
+            ),
+            "seconds": round(self.seconds, 6),
+            "throughput_mb_s": (
+                round(self.input_bytes / self.seconds / 1e6, 3)
+                if self.seconds
+                else None
+            ),
+            "wall_time": round(wall_time, 6),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def format_report(report):
+    ratio = f"{report['ratio']:.2f}x" if report["ratio"] else "n/a"
+    throughput = (
+        f"{report['throughput_mb_s']:.1f} MB/s" if report["throughput_mb_s"] else "n/a"
+    )
+    return (
+        f"Compression ({report['method']}, level {report['level']}, "
+        f"{report['threads']} threads): {report['files']} files, "
+        f"{report['reused']} up to date, {report['failed']} failed, "
+        f"ratio {ratio}, {throughput}"
+    )
+
+
+def add_arguments(parser):
+    """Add the compression options shared by the command line tools."""
+    parser.add_argument(
+        "--zip-method",
+        choices=sorted(COMPRESSION_METHODS),
+        default="deflate",
+        help="Compression method for raw tiles (default: deflate)",
+    )
+    parser.add_argument(
+        "--zip-level",
+        help="Compression level 0-9, or one of "
+        f"{', '.join(f'{name} ({level})' for name, level in PRESETS.items())}",
+    )
+    parser.add_argument(
+        "--zip-threads",
+        type=int,
+        default=0,
+        help="Compression threads (default: 0, one per CPU)",
+    )
+    parser.add_argument(
+        "--force-compress",
+        action="store_true",
+        help="Compress raw tiles even when the zip is newer than the tile",
+    )
+
+
+def options_from_args(args, processes=1):
+    """Return ZipCompressor keyword arguments for parsed ``args``."""
+    method, level = args.zip_method, args.zip_level
+    if level in PRESETS:
+        level = PRESETS[level]
+    elif level is not None:
+        level = int(level)
+    threads = args.zip_threads or max(1, (os.cpu_count() or 1) // max(processes, 1))
+    return {
+        "method": method,
+        "level": level,
+        "threads": threads,
+        "skip_fresh": not args.force_compress,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Compress raw DTED tiles into .dtN.zip archives next to them."
+    )
+    parser.add_argument("files", nargs="+", help="Raw DTED tiles")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with ZipCompressor(**options_from_args(args)) as compressor:
+        futures = [compressor.submit(path, f"{path}.zip") for path in args.files]
+        for future in futures:
+            future.result()
+        print(format_report(compressor.report()))